@@ -0,0 +1,82 @@
+import os
+from typing import Any, Dict, NamedTuple, Optional
+
+import streamlit as st
+from agents import Agent, ModelSettings, RunConfig
+from agents.models import get_default_model, get_default_model_settings
+
+from config import AGENT_MODELS
+
+
+class AgentModel(NamedTuple):
+    """Model tier for one agent role; ``None`` fields keep the SDK default."""
+
+    model: Optional[str]
+    max_tokens: Optional[int]
+    temperature: Optional[float]
+
+
+def _override(name: str) -> Optional[str]:
+    """Per-deployment override from secrets, then the environment."""
+    try:
+        value = st.secrets.get(name) if hasattr(st, "secrets") else None
+    except Exception:  # no secrets.toml
+        value = None
+    value = value if value not in (None, "") else os.getenv(name)
+    return str(value) if value not in (None, "") else None
+
+
+def _number(name: str, raw: Optional[str], cast):
+    if raw is None:
+        return None
+    try:
+        return cast(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {raw!r}") from None
+
+
+def resolve(role: str) -> AgentModel:
+    """Effective tier for *role*: ``AGENT_MODELS`` overlaid with overrides.
+
+    Overrides are ``AGENT_MODEL_<ROLE>``, ``AGENT_MAX_TOKENS_<ROLE>`` and
+    ``AGENT_TEMPERATURE_<ROLE>`` (e.g. ``AGENT_MODEL_END_MONITOR``) in
+    Streamlit secrets or the environment.
+    """
+    base: Dict[str, Any] = AGENT_MODELS.get(role) or {}
+    key = role.upper()
+    model = _override(f"AGENT_MODEL_{key}") or base.get("model")
+    max_tokens = _number(f"AGENT_MAX_TOKENS_{key}", _override(f"AGENT_MAX_TOKENS_{key}"), int)
+    temperature = _number(f"AGENT_TEMPERATURE_{key}", _override(f"AGENT_TEMPERATURE_{key}"), float)
+    return AgentModel(
+        model=model or None,
+        max_tokens=max_tokens if max_tokens is not None else base.get("max_tokens"),
+        temperature=temperature if temperature is not None else base.get("temperature"),
+    )
+
+
+def tiers() -> Dict[str, AgentModel]:
+    """Effective tier for every configured role (shown on the admin page)."""
+    return {role: resolve(role) for role in AGENT_MODELS}
+
+
+def agent_options(role: str) -> Dict[str, Any]:
+    """``model`` and ``model_settings`` keyword arguments for ``Agent(...)``.
+
+    Settings start from the SDK defaults for the chosen model (e.g. reasoning
+    settings for GPT-5 models), so only configured values change anything.
+    """
+    tier = resolve(role)
+    settings = get_default_model_settings(tier.model).resolve(
+        ModelSettings(max_tokens=tier.max_tokens, temperature=tier.temperature)
+    )
+    return {"model": tier.model, "model_settings": settings}
+
+
+def effective_model(agent: Agent, run_config: Optional[RunConfig] = None) -> str:
+    """Name of the model a run of *agent* will use (for metrics and traces)."""
+    # A model on the run config wins over the agent's, as in the SDK
+    if run_config is not None and isinstance(run_config.model, str) and run_config.model:
+        return run_config.model
+    if isinstance(agent.model, str) and agent.model:
+        return agent.model
+    return get_default_model()
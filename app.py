@@ -1,11 +1,13 @@
 import os
 import streamlit as st
-from agents import set_default_openai_key
 
 from views.start_page import show as show_start
 from views.chat_page import show as show_chat
 from views.feedback_page import show as show_feedback
+from views.admin_page import admin_password, show as show_admin
 from state import build_defaults, ensure_defaults
+import metrics
+import tracing_local
 
 
 # Basic page setup and styles
@@ -17,8 +19,15 @@ st.set_page_config(
 )
 
 
+# Agent runs and render steps are traced to a local JSONL file only
+tracing_local.install()
+# Process-wide metrics endpoint (started once; shared by all sessions), only
+# if METRICS_PORT is set
+metrics.serve()
+
 # Initialize session state via centralized defaults
 defaults = ensure_defaults(build_defaults())
+metrics.sessions.touch(st.session_state.session_id)
 
 # If the user provided an API key, prefer it; otherwise, use server key only after auth.
 # Prefer Streamlit Secrets on Community Cloud, fallback to env vars locally.
@@ -32,23 +41,27 @@ auth_required = bool(
     (st.secrets.get("AUTH_PASSWORD") if hasattr(st, "secrets") else None)
     or os.getenv("AUTH_PASSWORD")
 )
+# The chosen key is kept per session; model_api passes the matching pooled
+# client explicitly to every Runner call instead of mutating global defaults.
 api_key = st.session_state.get("api_key")
-try:
-    if api_key:
-        # Avoid enabling tracing by default when using user-provided keys.
-        set_default_openai_key(api_key, use_for_tracing=False)
-    elif server_key and (not auth_required or st.session_state.get("authenticated")):
-        set_default_openai_key(server_key, use_for_tracing=False)
-except Exception:
-    # Silently ignore; downstream calls will error visibly if key is invalid.
-    pass
-
-
-# Simple router
+if api_key:
+    st.session_state.active_api_key = api_key
+elif server_key and (not auth_required or st.session_state.get("authenticated")):
+    st.session_state.active_api_key = server_key
+else:
+    st.session_state.active_api_key = ""
+
+
+# Simple router; the admin view (trace viewer) is opened with ?page=admin,
+# and only exists when ADMIN_PASSWORD is configured
+if st.query_params.get("page") == "admin" and admin_password():
+    st.session_state.page = "admin"
 page = st.session_state.get("page", "start")
 if page == "start":
     show_start(defaults)
 elif page == "chat":
     show_chat(defaults)
+elif page == "admin":
+    show_admin(defaults)
 else:
     show_feedback(defaults)
@@ -1,37 +1,183 @@
 import asyncio
+import atexit
+import concurrent.futures
+import queue
 import threading
-from typing import Any, Coroutine, TypeVar
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional, TypeVar
 
 T = TypeVar("T")
 
-def run_async(coro: Coroutine[Any, Any, T]) -> T:
-    """Run *coro* regardless of existing event loop state.
 
-    If an event loop is already running, run the coroutine in a new loop.
-    Otherwise, use the current loop. This avoids ``asyncio.run`` which
-    fails when called from a running loop.
+class _LoopThread:
+    """A process-wide event loop running in one long-lived daemon thread.
+
+    Every coroutine submitted from sync code runs on this loop, so clients
+    bound to a loop (HTTP connection pools, TLS sessions) are reused across
+    calls instead of being thrown away with a throw-away loop.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                ready = threading.Event()
+                loop = asyncio.new_event_loop()
+
+                def _serve() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._loop = loop
+                self._thread = threading.Thread(target=_serve, name="async-utils-loop", daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+
+        async def _cancel_pending() -> None:
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.shutdown_asyncgens()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_cancel_pending(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+
+_background = _LoopThread()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background loop, starting it on first use."""
+    return _background.loop
+
+
+def shutdown(timeout: float = 5.0) -> None:
+    """Cancel outstanding work and stop the background loop.
+
+    Called automatically at interpreter exit; the loop is restarted lazily if
+    used again afterwards.
     """
+    _background.shutdown(timeout)
+
+
+atexit.register(shutdown)
+
+
+def _with_timeout(coro: Coroutine[Any, Any, T], timeout: Optional[float]) -> Coroutine[Any, Any, T]:
+    return coro if timeout is None else asyncio.wait_for(coro, timeout)
+
+
+def _run_in_new_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """Run *coro* on a throw-away loop in a helper thread (legacy path)."""
+    result: dict[str, Any] = {}
+
+    def _run() -> None:
+        inner_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(inner_loop)
+        try:
+            result["value"] = inner_loop.run_until_complete(coro)
+        except BaseException as exc:
+            result["error"] = exc
+        finally:
+            inner_loop.close()
+
+    thread = threading.Thread(target=_run)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def submit_async(
+    coro: Coroutine[Any, Any, T], timeout: Optional[float] = None
+) -> "concurrent.futures.Future[T]":
+    """Schedule *coro* on the background loop and return a future.
+
+    The caller is not blocked; use ``future.result()`` or ``future.done()`` to
+    collect the outcome later. With *timeout* the coroutine is cancelled and
+    the future fails with ``TimeoutError`` after that many seconds.
+    """
+    return asyncio.run_coroutine_threadsafe(_with_timeout(coro, timeout), get_loop())
+
+
+def run_async(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """Run *coro* to completion from synchronous code and return its result.
+
+    The coroutine runs on the shared background loop regardless of whether
+    the calling thread already has a running loop. When called from the
+    background loop thread itself (nested use), a throw-away loop is used to
+    avoid deadlocking. With *timeout*, ``TimeoutError`` is raised and the
+    coroutine is cancelled after that many seconds.
+    """
+    if _background.in_loop_thread():
+        return _run_in_new_loop(_with_timeout(coro, timeout))
+    return submit_async(coro, timeout).result()
+
+
+_DONE = object()
+
+
+def iter_async(agen: AsyncIterator[T]) -> Iterator[T]:
+    """Iterate an async iterator from synchronous code.
+
+    The async iterator runs on the shared background loop and each item is
+    handed back through a queue as soon as it is produced, so sync callers
+    (Streamlit scripts) can render items while the producer is still
+    running. Exceptions raised by the producer are re-raised in the caller;
+    closing the sync iterator early cancels the producer.
+    """
+    items: "queue.Queue[Any]" = queue.Queue()
+
+    async def _pump() -> None:
+        try:
+            async for item in agen:
+                items.put(item)
+        except BaseException as exc:  # propagate to the consumer
+            items.put(_Raise(exc))
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+        finally:
+            items.put(_DONE)
+
+    future = submit_async(_pump())
     try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-    if loop.is_running():
-        result: dict[str, T] = {}
-
-        def _run() -> None:
-            inner_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(inner_loop)
-            try:
-                task = inner_loop.create_task(coro)
-                result["value"] = inner_loop.run_until_complete(task)
-            finally:
-                inner_loop.close()
-
-        thread = threading.Thread(target=_run)
-        thread.start()
-        thread.join()
-        return result["value"]
-    else:
-        return loop.run_until_complete(coro)
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Raise):
+                raise item.exc
+            yield item
+    finally:
+        if not future.done():
+            future.cancel()
+
+
+class _Raise:
+    def __init__(self, exc: BaseException) -> None:
+        self.exc = exc
@@ -0,0 +1,93 @@
+"""Microbenchmark: shared background loop vs. a new loop per call.
+
+Compares ``async_utils.run_async`` (persistent loop thread) against the
+previous behaviour of spawning a thread with a fresh event loop for every
+coroutine (``_run_in_new_loop``). A second case keeps a TCP connection to a
+local echo server open on the loop, which is only possible when the loop
+outlives a single call; the per-call variant has to reconnect every time.
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+from async_utils import _run_in_new_loop, run_async
+
+
+async def _noop() -> int:
+    await asyncio.sleep(0)
+    return 1
+
+
+def _echo_server() -> int:
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def _serve_client(conn: socket.socket) -> None:
+        with conn:
+            while data := conn.recv(1024):
+                conn.sendall(data)
+
+    def _accept() -> None:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=_serve_client, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=_accept, daemon=True).start()
+    return server.getsockname()[1]
+
+
+_pooled: dict = {}
+
+
+async def _request(port: int, reuse: bool) -> bytes:
+    conn = _pooled.get(port) if reuse else None
+    if conn is None:
+        conn = await asyncio.open_connection("127.0.0.1", port)
+        if reuse:
+            _pooled[port] = conn
+    reader, writer = conn
+    writer.write(b"ping")
+    await writer.drain()
+    data = await reader.readexactly(4)
+    if not reuse:
+        writer.close()
+        await writer.wait_closed()
+    return data
+
+
+def _time(fn, n: int) -> list:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:38s} median {statistics.median(samples):9.1f} us   p95 {p95:9.1f} us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=500)
+    args = parser.parse_args()
+    port = _echo_server()
+
+    threads_before = threading.active_count()
+    _report("no-op, new loop per call", _time(lambda: _run_in_new_loop(_noop()), args.n))
+    _report("no-op, shared background loop", _time(lambda: run_async(_noop()), args.n))
+    _report("echo, new loop + connection per call", _time(lambda: _run_in_new_loop(_request(port, False)), args.n))
+    _report("echo, shared loop + kept connection", _time(lambda: run_async(_request(port, True)), args.n))
+    print(f"threads before/after: {threads_before}/{threading.active_count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Offline latency benchmark for the call_model pipeline.
+
+Drives ``model_api.call_model`` (or ``stream_model`` with ``--stream``)
+through the bootstrap and N trainee turns per scenario against
+``FakeRunner``, so only orchestration cost and the configured agent
+latencies are measured. Reports:
+
+* round-trips per scenario and per agent, per orchestration mode
+  (``--mode both`` compares handoffs and fast and prints the difference),
+* wall time per stage (director, customer fallback, end monitor, and the
+  local overhead around them),
+* p50/p95/p99 for the bootstrap, the time until the reply is visible and
+  the full turn including the end decision.
+
+Example: ``python -m benchmarks.bench_call_model --shape scene_only --turns 5 --mode both``
+"""
+
+import argparse
+import logging
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import streamlit as st
+
+from benchmarks.fake_backend import CUSTOMER, DIRECTOR, FAST_DIRECTOR, HANDOFF, MONITOR, STAGES, FakeRunner
+from model_api import call_model, resolve_end_decision, set_orchestration_mode, stream_model
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _reset_session(difficulty: str) -> None:
+    st.session_state.clear()
+    st.session_state.update(
+        {
+            "history": [],
+            "turns": 0,
+            "difficulty": difficulty,
+            "user_name": "Ola",
+            "max_turns": 6,
+            "last_meta": {},
+        }
+    )
+
+
+def _call(compiled: str, stream: bool) -> List[Dict]:
+    if not stream:
+        return call_model(compiled)
+    model_stream = stream_model(compiled)
+    for msg in model_stream:
+        for _ in msg.chunks:
+            pass
+    return model_stream.messages
+
+
+def run_scenario(runner: FakeRunner, turns: int, stream: bool, timings: Dict[str, List[float]]) -> None:
+    _reset_session("Medium")
+    start = time.perf_counter()
+    opening = _call("Bruker: Ola | Runde: 0/6 | Vanskelighetsgrad: Medium. Start scenen.", stream)
+    timings["bootstrap"].append(time.perf_counter() - start)
+    st.session_state.history.extend(opening)
+
+    for turn in range(1, turns + 1):
+        st.session_state.history.append({"name": "Ola", "role": "employee", "content": "Beklager!"})
+        st.session_state.turns = turn
+        start = time.perf_counter()
+        reply = _call(f"Historikk: ... Runde: {turn}/6 | Vanskelighetsgrad: Medium.", stream)
+        timings["reply"].append(time.perf_counter() - start)
+        resolve_end_decision(timeout=None)
+        timings["turn"].append(time.perf_counter() - start)
+        st.session_state.history.extend(reply)
+
+
+def run_mode(args: argparse.Namespace, mode: str) -> Dict[str, object]:
+    """Run all scenarios with the director for *mode*; print and return stats."""
+    set_orchestration_mode(mode)
+    runner = FakeRunner(
+        latency={
+            DIRECTOR: args.director,
+            FAST_DIRECTOR: args.director,
+            HANDOFF: args.handoff,
+            CUSTOMER: args.customer,
+            MONITOR: args.monitor,
+        },
+        shape=args.shape,
+        jitter=args.jitter,
+        seed=1,
+        handoffs=args.handoffs,
+    )
+    timings: Dict[str, List[float]] = defaultdict(list)
+    wall_start = time.perf_counter()
+    with runner.installed():
+        for _ in range(args.scenarios):
+            run_scenario(runner, args.turns, args.stream, timings)
+    wall = time.perf_counter() - wall_start
+
+    per_agent = Counter(call.agent for call in runner.calls)
+    stage_time: Dict[str, float] = defaultdict(float)
+    for call in runner.calls:
+        stage_time[STAGES.get(call.agent, call.agent)] += call.duration
+    measured = sum(timings["bootstrap"]) + sum(timings["turn"])
+    # Background monitor time overlaps nothing in this sequential driver, so
+    # whatever is not spent inside an agent call is local overhead.
+    stage_time["overhead"] = max(0.0, measured - sum(stage_time.values()))
+
+    print(f"orchestration={mode} mode={'stream' if args.stream else 'call'} shape={args.shape} "
+          f"scenarios={args.scenarios} turns={args.turns}")
+    print(f"round-trips: {len(runner.calls)} total, "
+          f"{len(runner.calls) / args.scenarios:.1f} per scenario "
+          f"({', '.join(f'{STAGES.get(a, a)}={n}' for a, n in per_agent.items())})")
+    print("wall time per stage:")
+    for stage, seconds in stage_time.items():
+        print(f"  {stage:18s} {seconds:8.2f} s")
+    print("latency (ms):        p50      p95      p99")
+    for name in ("bootstrap", "reply", "turn"):
+        samples = timings[name]
+        print(f"  {name:12s} {percentile(samples, 50) * 1000:8.1f} "
+              f"{percentile(samples, 95) * 1000:8.1f} {percentile(samples, 99) * 1000:8.1f}")
+    print(f"total wall time: {wall:.2f} s")
+    return {"round_trips": len(runner.calls), "timings": timings}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--shape", choices=["full", "scene_only", "explicit_end"], default="full")
+    parser.add_argument("--stream", action="store_true", help="use stream_model instead of call_model")
+    parser.add_argument("--mode", choices=["handoffs", "fast", "both"], default="both",
+                        help="director orchestration mode(s) to run")
+    parser.add_argument("--handoffs", type=int, default=1, help="handoffs per director run in handoffs mode")
+    parser.add_argument("--director", type=float, default=0.8, help="director latency (s)")
+    parser.add_argument("--handoff", type=float, default=0.6, help="latency per handoff round-trip (s)")
+    parser.add_argument("--customer", type=float, default=0.5, help="customer fallback latency (s)")
+    parser.add_argument("--monitor", type=float, default=0.4, help="end monitor latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative latency jitter")
+    args = parser.parse_args()
+    # Bare-mode session_state access warns on every call otherwise
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+    modes = ["handoffs", "fast"] if args.mode == "both" else [args.mode]
+    results = {}
+    for mode in modes:
+        results[mode] = run_mode(args, mode)
+        print()
+    if len(results) == 2:
+        slow, fast = results["handoffs"], results["fast"]
+        director_runs = args.scenarios * (args.turns + 1)
+        saved = slow["round_trips"] - fast["round_trips"]
+        print(f"fast vs handoffs: {saved} round-trips saved "
+              f"({saved / director_runs:.1f} per director run)")
+        for name in ("bootstrap", "reply", "turn"):
+            before = percentile(slow["timings"][name], 50) * 1000
+            after = percentile(fast["timings"][name], 50) * 1000
+            print(f"  {name:12s} p50 {before:8.1f} -> {after:8.1f} ms ({after - before:+.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark output decoding over a corpus of malformed agent outputs.
+
+Compares the single-pass ``output_decoder.decode_scenario_output`` with the
+previous regex + ``json.loads`` + ``ast.literal_eval`` + nested model
+construction path (reproduced below without its Streamlit dependency), and
+reports which recovery path the decoder used for each corpus entry.
+
+The corpus lives in ``benchmarks/data/malformed_outputs.jsonl`` (one
+``{"output": ...}`` object per line); append real failures to it as they
+show up in logs.
+"""
+
+import argparse
+import ast
+import json
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from output_decoder import decode_scenario_output
+from schemas import ScenarioMessage, ScenarioOutput
+
+CORPUS = Path(__file__).resolve().parent / "data" / "malformed_outputs.jsonl"
+
+
+def legacy_coerce(val) -> ScenarioOutput:
+    try:
+        if isinstance(val, ScenarioOutput):
+            return val
+        if isinstance(val, dict):
+            return ScenarioOutput(**val)
+        if isinstance(val, str):
+            cleaned = val.strip()
+            cleaned = re.sub(r"^```\w*\n|```$", "", cleaned)
+            cleaned = cleaned.strip().strip("`")
+            data = None
+            try:
+                data = json.loads(cleaned)
+            except Exception:
+                try:
+                    data = ast.literal_eval(cleaned)
+                except Exception:
+                    data = None
+            if isinstance(data, dict):
+                if {"name", "role", "content"} <= set(data.keys()):
+                    return ScenarioOutput(meldinger=[ScenarioMessage(**data)], sjekkliste=[])
+                return ScenarioOutput(**data)
+            if isinstance(data, list):
+                try:
+                    msgs = [ScenarioMessage(**m) for m in data if isinstance(m, dict)]
+                    return ScenarioOutput(meldinger=msgs, sjekkliste=[])
+                except Exception:
+                    pass
+        return ScenarioOutput(
+            meldinger=[ScenarioMessage(name="Kunde", role="customer", content=str(val))], sjekkliste=[]
+        )
+    except Exception:
+        return ScenarioOutput(meldinger=[], sjekkliste=[])
+
+
+def _bench(fn, corpus, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in corpus:
+            fn(item)
+    return (time.perf_counter() - start) / (rounds * len(corpus)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+    corpus = [json.loads(line)["output"] for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    paths = Counter()
+    recovered = 0
+    for item in corpus:
+        result = decode_scenario_output(item)
+        legacy = legacy_coerce(item)
+        paths[result.path] += 1
+        if result.output.meldinger and result.output != legacy:
+            recovered += 1
+        print(f"{result.path:16s} {len(result.output.meldinger)} msg  legacy {len(legacy.meldinger)} msg  {item[:50]!r}")
+
+    print()
+    print("paths:", dict(paths))
+    print(f"entries decoded differently from legacy: {recovered}/{len(corpus)}")
+    print(f"legacy  {_bench(legacy_coerce, corpus, args.rounds):8.2f} us/output")
+    print(f"decoder {_bench(decode_scenario_output, corpus, args.rounds):8.2f} us/output")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Prompt-cache hit rate of the director input over a whole session.
+
+Plays one scenario of N turns through ``prompt_builder.build_prompt`` (the
+stable-prefix layout with ``CONTEXT_FOLD_STEP``) and through the previous
+layout (round counter in the header, window sliding by one message per
+turn), prefixing each prompt with the director instructions as the API
+request does. ``FakeOpenAIServer``'s ``PrefixCache`` decides how many input
+tokens an upstream prompt cache would have served. Only the director calls
+of the session itself are counted, so the hit rate comes from the layout
+and not from other sessions sharing the instructions.
+
+Example: ``python -m benchmarks.bench_prompt_cache --turns 40``
+"""
+
+import argparse
+from typing import Callable, Dict, List
+
+from benchmarks.fake_openai_server import PrefixCache, _usage
+from config import CONTEXT_FOLD_STEP, CONTEXT_MESSAGES
+from context_window import RollingContext
+from model_api import scenario_agent
+from prompt_builder import build_prompt
+from transcript import Transcript, messages_json
+
+REPLY = "Beklager så mye, jeg lager en ny kaffe til deg med havremelk med en gang."
+ANSWER = "Det er tredje gang denne uken! Jeg har dårlig tid, og nå står jeg her igjen og venter."
+
+
+def legacy_prompt(user_text: str, history, rolling: RollingContext, turns: int, max_turns: int) -> str:
+    rolling.update(history)
+    summary = rolling.summary()
+    earlier = f"Sammendrag av tidligere historikk (eldre meldinger, i rekkefølge):\n{summary}\n\n" if summary else ""
+    return (
+        earlier
+        + "Historikk (JSON-liste av meldinger med name/role/content):\n"
+        f"{messages_json(history[rolling.summarized :])}\n\n"
+        f"Bruker: Ola | Runde: {turns}/{max_turns} | Vanskelighetsgrad: Medium. "
+        "Ikke inkluder brukerens melding i output; kun system og andre aktører.\n"
+        "Brukerens siste svar: " + user_text
+    )
+
+
+def current_prompt(user_text: str, history, rolling: RollingContext, turns: int, max_turns: int) -> str:
+    prompt, _ = build_prompt(
+        user_text, history, rolling, user_name="Ola", difficulty="Medium", turns=turns, max_turns=max_turns
+    )
+    return prompt
+
+
+def play(layout: Callable, rolling: RollingContext, turns: int) -> Dict[str, float]:
+    instructions = str(scenario_agent.instructions)
+    cache = PrefixCache()
+    history = Transcript(
+        [
+            {"name": "Scene", "role": "system", "content": "Morgenrush på Sit Kafe. Lang kø ved kassa og søl på disken."},
+            {"name": "Kari", "role": "customer", "content": "Jeg bestilte havremelk, dette er feil!"},
+        ]
+    )
+    input_tokens = cached = 0
+    hits: List[float] = []
+    for turn in range(1, turns + 1):
+        history.append({"name": "Ola", "role": "employee", "content": f"{REPLY} ({turn})"})
+        request = instructions + layout(REPLY, history, rolling, turn, turns)
+        tokens = _usage(request, "")[0]
+        hit = cache.cached_tokens(request)
+        input_tokens += tokens
+        cached += hit
+        hits.append(hit / tokens)
+        history.append({"name": "Kari", "role": "customer", "content": f"{ANSWER} ({turn})"})
+    return {"input": input_tokens, "cached": cached, "turns_hit": sum(1 for h in hits if h > 0)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+
+    rows = [
+        ("legacy", play(legacy_prompt, RollingContext(window=CONTEXT_MESSAGES), args.turns)),
+        (
+            "stable prefix",
+            play(current_prompt, RollingContext(window=CONTEXT_MESSAGES, fold_step=CONTEXT_FOLD_STEP), args.turns),
+        ),
+    ]
+    print(f"{args.turns} director turns, window {CONTEXT_MESSAGES}, fold step {CONTEXT_FOLD_STEP}")
+    print(f"{'layout':<14} {'input tok':>10} {'cached':>8} {'hit rate':>9} {'turns hit':>10}")
+    for name, r in rows:
+        print(
+            f"{name:<14} {r['input']:>10} {r['cached']:>8} {r['cached'] / r['input']:>8.0%} "
+            f"{r['turns_hit']:>6}/{args.turns}"
+        )
+
+
+if __name__ == "__main__":
+    main()
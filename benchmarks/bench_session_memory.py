@@ -0,0 +1,122 @@
+"""Memory per session for the chat history at 6, 24 and 100 turns.
+
+Builds what a session keeps for its transcript after N trainee turns (the
+opening plus, per turn, the trainee's reply and the director's messages):
+the history, the per-message view-models and the pinned persona names.
+Compares the previous representation (a list of ``{"name", "role",
+"content"}`` dicts, one ``MessageView`` per message, ``_fixed_name_*``
+session keys) with ``transcript.Transcript``, and times building the
+history JSON for the prompt (``json.dumps`` of every message per turn vs
+the cached per-message JSON).
+
+Model strings arrive as fresh objects from JSON decoding, so every message
+gets fresh copies of its strings, as in the app. Sizes are measured with
+``tracemalloc`` and include the message content and, for the transcript,
+the cached JSON of the messages in the prompt window (CONTEXT_MESSAGES).
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from transcript import Message, Transcript, messages_json
+from ui_components import MessageView
+
+PERSONAS = [("Kari", "customer"), ("Jon", "employee"), ("Nora", "bystander")]
+USER = ("Ola", "employee")
+
+
+def _fresh(text: str) -> str:
+    # A new str object with the same value, like json.loads produces
+    return json.loads(json.dumps(text))
+
+
+def _turns(turns: int, seed: int = 7) -> List[Tuple[str, str, str]]:
+    rng = random.Random(seed)
+    words = "beklager kaffen var kald jeg ordner en ny med en gang takk for at du sier fra".split()
+
+    def _text(n: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+
+    messages = [("Scene", "system", _text(60)), ("Kari", "customer", _text(30))]
+    for _ in range(turns):
+        messages.append((USER[0], USER[1], _text(20)))
+        for _ in range(rng.randint(1, 2)):
+            name, role = rng.choice(PERSONAS)
+            messages.append((name, role, _text(rng.randint(15, 40))))
+    return messages
+
+
+def _view(name: str, role: str) -> MessageView:
+    return MessageView(None, "assistant", "😠", f"{name} ({role})")
+
+
+def legacy_session(messages):
+    history = [{"name": _fresh(n), "role": _fresh(r), "content": _fresh(c)} for n, r, c in messages]
+    views = [_view(m["name"], m["role"]) for m in history]
+    fixed = {f"_fixed_name_{m['role']}": m["name"] for m in history}
+    return history, views, fixed
+
+
+def compact_session(messages):
+    history = Transcript()
+    history.extend({"name": _fresh(n), "role": _fresh(r), "content": _fresh(c)} for n, r, c in messages)
+    views = []
+    for m in history:
+        key = (m.role, m.name)
+        view = history.views.get(key)
+        if view is None:
+            view = history.views[key] = _view(m.name, m.role)
+        history.names.setdefault(f"_fixed_name_{m.role}", m.name)
+        views.append(view)
+    messages_json(history[-24:])  # the prompt window keeps its JSON cached
+    history.release_json(len(history) - 24)
+    return history, views
+
+
+def _measure(build: Callable, messages) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    state = build(messages)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del state
+    return size
+
+
+def _json_time(history, dumps: Callable, window: int = 24, rounds: int = 50) -> float:
+    """Mean µs to serialize the recent window once per turn over a whole run."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for end in range(1, len(history) + 1):
+            dumps(history[max(0, end - window) : end])
+    return (time.perf_counter() - start) / rounds / len(history) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[6, 24, 100])
+    args = parser.parse_args()
+
+    print(f"{'turns':>5} {'msgs':>5} {'legacy B':>10} {'compact B':>10} {'saved':>7} {'json µs':>16}")
+    for turns in args.turns:
+        messages = _turns(turns)
+        legacy = _measure(legacy_session, messages)
+        compact = _measure(compact_session, messages)
+        history = [{"name": n, "role": r, "content": c} for n, r, c in messages]
+        transcript = Transcript(history)
+        before = _json_time(history, lambda ms: json.dumps(ms, ensure_ascii=False))
+        after = _json_time(transcript, messages_json)
+        assert messages_json(transcript) == json.dumps(history, ensure_ascii=False)
+        print(
+            f"{turns:>5} {len(messages):>5} {legacy:>10,} {compact:>10,} "
+            f"{1 - compact / legacy:>6.0%} {before:>7.1f} -> {after:>5.1f}"
+        )
+    print(f"message object: {Message.__slots__} (no per-message dict)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Turn latency with the end monitor on vs. off the critical path.
+
+``Runner.run`` is replaced by ``benchmarks.fake_backend.FakeRunner``, which
+sleeps for a fixed latency per agent, so the numbers only reflect
+orchestration. Each turn is played the way the chat page plays a background
+turn (``submit_turn``, ``apply``, ``finish_turn``). "input accepted" is the
+time until the turn is finished and the trainee can answer again; "decision"
+is the time until the end monitor's decision has been applied as well.
+Before the monitor was taken off the input path the trainee waited for the
+"decision" mark.
+"""
+
+import argparse
+import statistics
+import time
+
+import streamlit as st
+
+from benchmarks.fake_backend import DIRECTOR, MONITOR, FakeRunner
+from engine import ScenarioSession
+from model_api import submit_turn
+
+
+def _turn(session: ScenarioSession) -> tuple:
+    start = time.perf_counter()
+    session.begin_turn("Beklager, jeg ordner det.")
+    job = submit_turn(session.build_input("Beklager, jeg ordner det."), stream=False)
+    job.wait()
+    messages = session.apply(job.result())
+    session.finish_turn(messages, session.resolve_end(timeout=0))
+    accepted = time.perf_counter() - start
+    session.resolve_end(timeout=None)
+    return accepted, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--scenario-latency", type=float, default=0.8)
+    parser.add_argument("--monitor-latency", type=float, default=0.6)
+    args = parser.parse_args()
+
+    runner = FakeRunner(latency={DIRECTOR: args.scenario_latency, MONITOR: args.monitor_latency})
+    st.session_state.clear()
+    # Never ends on turns, so every turn is measured the same way
+    session = ScenarioSession("Ola", max_turns=args.turns + 1, state=st.session_state)
+    session.history.append({"name": "Scene", "role": "system", "content": "Kø."})
+
+    accepted, decisions = [], []
+    with runner.installed():
+        for _ in range(args.turns):
+            input_back, decision = _turn(session)
+            accepted.append(input_back)
+            decisions.append(decision)
+
+    print(f"turns: {args.turns}")
+    print(f"input accepted  median {statistics.median(accepted) * 1000:8.1f} ms")
+    print(f"decision ready  median {statistics.median(decisions) * 1000:8.1f} ms")
+    saved = statistics.median(decisions) - statistics.median(accepted)
+    print(f"critical path saved per turn: {saved * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Local stand-in for ``agents.Runner`` with injectable latency and outputs.
+
+``FakeRunner`` answers ``Runner.run`` and ``Runner.run_streamed`` for the
+agents in ``model_api`` without any network access. Each agent gets a
+latency (seconds, optionally with jitter) and an output shape; every call is
+recorded so benchmarks can count round-trips and time each stage::
+
+    runner = FakeRunner(latency={"Scenarioleder": 0.8}, shape="scene_only")
+    with runner.installed():
+        call_model(...)
+    runner.calls  # [CallRecord(agent="Scenarioleder", ...), ...]
+
+With ``handoffs=N`` a director that declares handoffs (the handoff-mode
+``scenario_agent``) pays N extra round-trips per run, recorded as
+``HANDOFF`` calls; the fast-mode director has none, so the two
+orchestration modes can be compared.
+"""
+
+import asyncio
+import json
+import random
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import model_api
+
+DIRECTOR = "Scenarioleder"
+FAST_DIRECTOR = "Scenarioleder (rask)"
+HANDOFF = "handoff"
+CUSTOMER = "Kunde Agent"
+MONITOR = "Avslutningsvakt"
+
+# Human-readable stage name per agent
+STAGES = {
+    DIRECTOR: "director",
+    FAST_DIRECTOR: "director",
+    HANDOFF: "handoff",
+    CUSTOMER: "customer_fallback",
+    MONITOR: "end_monitor",
+}
+
+DEFAULT_LATENCY = {DIRECTOR: 0.8, FAST_DIRECTOR: 0.8, HANDOFF: 0.6, CUSTOMER: 0.5, MONITOR: 0.4}
+
+
+class CallRecord(NamedTuple):
+    agent: str
+    started: float
+    duration: float
+    streamed: bool
+
+
+def _director_output(shape: str, turn: int) -> Dict[str, Any]:
+    if turn == 0:
+        scene = {"name": "Scene", "role": "system", "content": "Morgenrush på Sit Kafe. Lang kø ved kassa."}
+        customer = {"name": "Kari", "role": "customer", "content": "Jeg bestilte havremelk, dette er feil!"}
+        # "scene_only" reproduces models that skip the customer on the first
+        # turn, which makes call_model run the _gen_customer fallback.
+        return {"meldinger": [scene] if shape == "scene_only" else [scene, customer]}
+    out: Dict[str, Any] = {
+        "oppdrag": {"beskrivelse": "Få kunden til å føle seg hørt."},
+        "sjekkliste": ["Bekreft problemet", "Tilby løsning"],
+        "meldinger": [{"name": "Kari", "role": "customer", "content": f"Greit, men hva gjør du nå? ({turn})"}],
+    }
+    if shape == "explicit_end":
+        out["scenarioresultat"] = {"name": "Scenarioresultat", "role": "system", "content": "Løst."}
+        out["tilbakemelding"] = {"name": "Tilbakemelding", "role": "system", "content": "God ro."}
+    return out
+
+
+def default_output(agent_name: str, agent_input: Any, context: Optional[Dict], shape: str) -> Any:
+    turn = int((context or {}).get("turn_count", "0") or 0)
+    if agent_name == MONITOR:
+        return model_api.EndDecision(should_end=False)
+    if agent_name == CUSTOMER:
+        return json.dumps({"name": "Kari", "role": "customer", "content": "Dette er ikke greit."})
+    return json.dumps(_director_output(shape, turn), ensure_ascii=False)
+
+
+class _FakeStream:
+    def __init__(self, runner: "FakeRunner", agent, agent_input, context) -> None:
+        self._runner = runner
+        self._agent = agent
+        self._input = agent_input
+        self._context = context
+        self.final_output = None
+        self.raw_responses: List[Any] = []
+
+    async def stream_events(self):
+        name = self._agent.name
+        started = time.perf_counter()
+        text = self._runner.output_for(name, self._input, self._context)
+        text = text if isinstance(text, str) else json.dumps(text, ensure_ascii=False)
+        handoffs = self._runner.handoffs_for(self._agent)
+        if handoffs:
+            # The director only decides whom to hand off to; the last
+            # target's output is what streams
+            await asyncio.sleep(self._runner.latency_for(name))
+            self._runner.record(name, started, streamed=True)
+            for _ in range(handoffs - 1):
+                hop = time.perf_counter()
+                await asyncio.sleep(self._runner.latency_for(HANDOFF))
+                self._runner.record(HANDOFF, hop, streamed=True)
+            name, started = HANDOFF, time.perf_counter()
+        total = self._runner.latency_for(name)
+        # Spend ~40% before the first token, then stream the rest evenly
+        await asyncio.sleep(total * 0.4)
+        yield SimpleNamespace(type="agent_updated_stream_event", new_agent=self._agent)
+        chunks = [text[i : i + 12] for i in range(0, len(text), 12)] or [""]
+        for chunk in chunks:
+            await asyncio.sleep(total * 0.6 / len(chunks))
+            yield SimpleNamespace(
+                type="raw_response_event",
+                data=SimpleNamespace(type="response.output_text.delta", delta=chunk),
+            )
+        self.final_output = text
+        self.raw_responses = [None] * (1 + handoffs)
+        self._runner.record(name, started, streamed=True)
+
+    def cancel(self) -> None:
+        pass
+
+
+class FakeRunner:
+    """Configurable fake for ``agents.Runner`` (see module docstring).
+
+    *latency* maps agent names to seconds (or a callable returning seconds);
+    *shape* selects the director output (``full``, ``scene_only`` or
+    ``explicit_end``); *output* overrides outputs entirely with a callable
+    ``(agent_name, input, context) -> final_output``; *handoffs* is the
+    number of handoff round-trips per run of an agent with handoffs.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Dict[str, Any]] = None,
+        shape: str = "full",
+        output: Optional[Callable[[str, Any, Optional[Dict]], Any]] = None,
+        jitter: float = 0.0,
+        seed: Optional[int] = None,
+        handoffs: int = 0,
+    ) -> None:
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.shape = shape
+        self._output = output
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self.handoffs = handoffs
+        self.calls: List[CallRecord] = []
+
+    def latency_for(self, agent_name: str) -> float:
+        value = self.latency.get(agent_name, 0.3)
+        base = value() if callable(value) else float(value)
+        if self.jitter:
+            base *= 1 + self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, base)
+
+    def handoffs_for(self, agent) -> int:
+        return self.handoffs if getattr(agent, "handoffs", None) else 0
+
+    def output_for(self, agent_name: str, agent_input: Any, context: Optional[Dict]) -> Any:
+        if self._output is not None:
+            return self._output(agent_name, agent_input, context)
+        return default_output(agent_name, agent_input, context, self.shape)
+
+    def record(self, agent_name: str, started: float, streamed: bool = False) -> None:
+        self.calls.append(CallRecord(agent_name, started, time.perf_counter() - started, streamed))
+
+    async def run(self, agent, agent_input, context=None, **kwargs):
+        started = time.perf_counter()
+        await asyncio.sleep(self.latency_for(agent.name))
+        self.record(agent.name, started)
+        handoffs = self.handoffs_for(agent)
+        for _ in range(handoffs):
+            hop = time.perf_counter()
+            await asyncio.sleep(self.latency_for(HANDOFF))
+            self.record(HANDOFF, hop)
+        final_output = self.output_for(agent.name, agent_input, context)
+        return SimpleNamespace(final_output=final_output, raw_responses=[None] * (1 + handoffs), last_agent=agent)
+
+    def run_streamed(self, agent, agent_input, context=None, **kwargs):
+        return _FakeStream(self, agent, agent_input, context)
+
+    def reset(self) -> None:
+        self.calls = []
+
+    @contextmanager
+    def installed(self) -> Iterator["FakeRunner"]:
+        """Patch ``model_api.Runner`` with this fake for the duration."""
+        original = model_api.Runner
+        model_api.Runner = self
+        try:
+            yield self
+        finally:
+            model_api.Runner = original
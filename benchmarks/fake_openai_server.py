@@ -0,0 +1,375 @@
+"""Local OpenAI-compatible HTTP stand-in with configurable latency.
+
+Serves ``POST /v1/responses`` and ``POST /v1/chat/completions`` (both plain
+and ``stream: true`` server-sent events) plus ``GET /v1/models``. The answer
+is chosen from the request's instructions so every agent in ``model_api``
+gets a schema-valid output; the latency applies per request and is split
+between time-to-first-token and the streamed body. Usage reports cached
+input tokens from a simulated prefix cache (``PrefixCache``), so prompt
+layouts can be compared for their cache hit rate.
+
+Point the app at it with ``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1`` and
+any ``OPENAI_API_KEY``. Run standalone with
+``python -m benchmarks.fake_openai_server --port 8765 --latency 0.8``.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_TURN = re.compile(r"Runde:\s*(\d+)")
+_ids = itertools.count(1)
+
+
+def _text_of(value: Any) -> str:
+    """Flatten instructions/input/messages into one searchable string."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return " ".join(_text_of(v) for v in value)
+    if isinstance(value, dict):
+        return " ".join(_text_of(v) for k, v in value.items() if k in ("content", "text", "input"))
+    return ""
+
+
+def answer_for(instructions: str, user_input: str) -> str:
+    """Pick a plausible agent output based on which agent is asking."""
+    match = _TURN.search(user_input)
+    turn = int(match.group(1)) if match else 1
+    if "should_end" in instructions:
+        return json.dumps({"should_end": False, "result": None, "feedback": None})
+    if "scenarieleder" in instructions.lower():
+        if turn == 0:
+            messages = [
+                {"name": "Scene", "role": "system", "content": "Morgenrush på Sit Kafe. Lang kø ved kassa."},
+                {"name": "Kari", "role": "customer", "content": "Jeg bestilte havremelk, dette er feil!"},
+            ]
+        else:
+            messages = [{"name": "Kari", "role": "customer", "content": f"Og hva gjør du med det nå? ({turn})"}]
+        out = {
+            "oppdrag": {"beskrivelse": "Få kunden til å føle seg hørt."} if turn else None,
+            "sjekkliste": ["Bekreft problemet", "Tilby løsning"] if turn else [],
+            "meldinger": messages,
+            "scenarioresultat": None,
+            "tilbakemelding": None,
+        }
+        return json.dumps(out, ensure_ascii=False)
+    if "Skriv kun replikken" in instructions:  # simulated trainee (simulate.py)
+        return "Beklager, jeg ordner en ny drikk til deg med en gang."
+    if "name: 'Scene'" in instructions:
+        return json.dumps({"name": "Scene", "role": "system", "content": "Morgenrush på Sit Kafe."})
+    return json.dumps({"name": "Kari", "role": "customer", "content": "Dette er ikke greit."}, ensure_ascii=False)
+
+
+def _usage(prompt: str, text: str) -> Tuple[int, int]:
+    return max(1, len(prompt) // 4), max(1, len(text) // 4)
+
+
+class PrefixCache:
+    """Mimics upstream prompt caching on the request text (4 chars per token).
+
+    A request's longest previously seen prefix counts as cached once it is
+    at least *min_tokens* long, in steps of *block_tokens*, like the OpenAI
+    prompt cache.
+    """
+
+    def __init__(self, min_tokens: int = 1024, block_tokens: int = 128) -> None:
+        self.min_chars = min_tokens * 4
+        self.block_chars = block_tokens * 4
+        self._seen: set = set()
+        self._lock = threading.Lock()
+
+    def cached_tokens(self, prompt: str) -> int:
+        """Cached tokens for *prompt*; remembers its prefixes for later requests."""
+        ends = range(self.min_chars, len(prompt) + 1, self.block_chars)
+        keys = [hash(prompt[:end]) for end in ends]
+        with self._lock:
+            hits = [end for end, key in zip(ends, keys) if key in self._seen]
+            self._seen.update(keys)
+        return max(hits, default=0) // 4
+
+
+def _response_body(model: str, text: str, prompt: str, cached: int = 0) -> Dict[str, Any]:
+    n = next(_ids)
+    in_tok, out_tok = _usage(prompt, text)
+    return {
+        "id": f"resp_{n}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": "completed",
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": [
+            {
+                "type": "message",
+                "id": f"msg_{n}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "usage": {
+            "input_tokens": in_tok,
+            "output_tokens": out_tok,
+            "total_tokens": in_tok + out_tok,
+            "input_tokens_details": {"cached_tokens": min(cached, in_tok)},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        },
+    }
+
+
+def _response_events(body: Dict[str, Any], chunks: List[str]) -> Iterator[Dict[str, Any]]:
+    item = body["output"][0]
+    seq = itertools.count()
+    pending = {**body, "status": "in_progress", "output": []}
+    yield {"type": "response.created", "response": pending, "sequence_number": next(seq)}
+    yield {
+        "type": "response.output_item.added",
+        "output_index": 0,
+        "item": {**item, "status": "in_progress", "content": []},
+        "sequence_number": next(seq),
+    }
+    yield {
+        "type": "response.content_part.added",
+        "item_id": item["id"],
+        "output_index": 0,
+        "content_index": 0,
+        "part": {"type": "output_text", "text": "", "annotations": []},
+        "sequence_number": next(seq),
+    }
+    for chunk in chunks:
+        yield {
+            "type": "response.output_text.delta",
+            "item_id": item["id"],
+            "output_index": 0,
+            "content_index": 0,
+            "delta": chunk,
+            "logprobs": [],
+            "sequence_number": next(seq),
+        }
+    yield {"type": "response.output_item.done", "output_index": 0, "item": item, "sequence_number": next(seq)}
+    yield {"type": "response.completed", "response": body, "sequence_number": next(seq)}
+
+
+def _chat_body(model: str, text: str, prompt: str, cached: int = 0) -> Dict[str, Any]:
+    in_tok, out_tok = _usage(prompt, text)
+    return {
+        "id": f"chatcmpl_{next(_ids)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": in_tok,
+            "completion_tokens": out_tok,
+            "total_tokens": in_tok + out_tok,
+            "prompt_tokens_details": {"cached_tokens": min(cached, in_tok)},
+        },
+    }
+
+
+def _chat_events(body: Dict[str, Any], chunks: List[str]) -> Iterator[Dict[str, Any]]:
+    base = {k: body[k] for k in ("id", "created", "model")}
+    for i, chunk in enumerate(chunks):
+        delta = {"content": chunk, **({"role": "assistant"} if i == 0 else {})}
+        yield {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+    yield {
+        **base,
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        "usage": body["usage"],
+    }
+
+
+def _is_delta(event: Dict[str, Any]) -> bool:
+    if event.get("type") == "response.output_text.delta":
+        return True
+    choices = event.get("choices") or [{}]
+    return bool(choices[0].get("delta", {}).get("content"))
+
+
+class FakeOpenAIServer:
+    """Threaded fake server; use as a context manager or call start/stop.
+
+    *latency* is the total seconds per request; *ttft* the share of it spent
+    before the first streamed byte; *jitter* a relative ± spread.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.8,
+        ttft: float = 0.4,
+        jitter: float = 0.0,
+        chunk_chars: int = 16,
+    ) -> None:
+        self.latency = latency
+        self.ttft = ttft
+        self.jitter = jitter
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.cache = PrefixCache()
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self._rng = random.Random(1)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _delay(self) -> float:
+        delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay *= 1 + self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _count_tokens(self, input_tokens: int, cached: int) -> None:
+        with self._lock:
+            self.input_tokens += input_tokens
+            self.cached_tokens += min(cached, input_tokens)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:  # keep benchmark output clean
+                pass
+
+            def _json(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                if self.path.rstrip("/").endswith("/models"):
+                    self._json(200, {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "local"}]})
+                else:
+                    self._json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    req = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._json(400, {"error": {"message": "invalid JSON"}})
+                    return
+                path = self.path.rstrip("/")
+                if path.endswith("/responses"):
+                    instructions = str(req.get("instructions") or "")
+                    prompt = _text_of(req.get("input"))
+                    build, events = _response_body, _response_events
+                elif path.endswith("/chat/completions"):
+                    messages = req.get("messages") or []
+                    instructions = _text_of([m for m in messages if m.get("role") in ("system", "developer")])
+                    prompt = _text_of([m for m in messages if m.get("role") not in ("system", "developer")])
+                    build, events = _chat_body, _chat_events
+                else:
+                    self._json(404, {"error": {"message": "not found"}})
+                    return
+
+                server._enter()
+                try:
+                    delay = server._delay()
+                    text = answer_for(instructions, prompt)
+                    cached = server.cache.cached_tokens(instructions + prompt)
+                    body = build(str(req.get("model") or "fake"), text, instructions + prompt, cached)
+                    server._count_tokens(_usage(instructions + prompt, text)[0], cached)
+                    if not req.get("stream"):
+                        time.sleep(delay)
+                        self._json(200, body)
+                        return
+                    n = server.chunk_chars
+                    chunks = [text[i : i + n] for i in range(0, len(text), n)] or [""]
+                    time.sleep(delay * server.ttft)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Cache-Control", "no-cache")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    step = delay * (1 - server.ttft) / max(1, len(chunks))
+                    for event in events(body, chunks):
+                        if step and _is_delta(event):
+                            time.sleep(step)
+                        name = event.get("type")
+                        prefix = f"event: {name}\n" if name else ""
+                        self.wfile.write(f"{prefix}data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    if build is _chat_body:
+                        self.wfile.write(b"data: [DONE]\n\n")
+                    self.close_connection = True
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    server._leave()
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.8, help="seconds per request")
+    parser.add_argument("--ttft", type=float, default=0.4, help="share of latency before first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative latency jitter")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency, args.ttft, args.jitter)
+    print(f"fake OpenAI server on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Multi-session load test for app.py against a local OpenAI stand-in.
+
+Starts ``FakeOpenAIServer`` with the requested latency, points the OpenAI
+client at it through ``OPENAI_BASE_URL`` and drives many simulated trainees
+through ``app.py`` with ``streamlit.testing.v1.AppTest``: fill in the start
+form, start the scenario (bootstrap) and answer N turns. With background
+turns the driver reruns the script until each turn job is done, as the
+polling chat area does in a browser (at a quarter of ``JOB_POLL_SEC``, so
+latency is not inflated by the poll interval). All sessions share
+one process, like a single Streamlit server, so module-level state (the
+client pool, the opening pool, the async loop) is shared as in production.
+
+Reports sessions/sec, bootstrap and turn latency under load (p50/p95/p99),
+the fake server's request count, peak concurrency and (simulated) prompt
+cache hit rate, and the process's thread count and resident memory over
+the run.
+
+AppTest keeps one mock Runtime per process; when many tests tear down at the
+same time a script thread can log "Runtime hasn't been created" after its
+run has finished. Those are counted as teardown races instead of printed,
+since they do not affect the measured session.
+
+Example: ``python -m benchmarks.load_test --sessions 40 --concurrency 20 --latency 0.8``
+"""
+
+import argparse
+import logging
+import os
+import resource
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from benchmarks.bench_call_model import percentile
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from config import JOB_POLL_SEC
+
+APP_PATH = str(Path(__file__).resolve().parents[1] / "app.py")
+
+
+class SessionResult(NamedTuple):
+    started: float
+    finished: float
+    bootstrap: float
+    turns: List[float]
+    error: Optional[str]
+
+
+class _TeardownRaces:
+    """``threading.excepthook`` that swallows AppTest's Runtime teardown race."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._previous = threading.excepthook
+
+    def __call__(self, args) -> None:
+        if isinstance(args.exc_value, RuntimeError) and "Runtime hasn't been created" in str(args.exc_value):
+            self.count += 1
+            return
+        self._previous(args)
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is the peak, in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _Sampler(threading.Thread):
+    """Samples thread count and RSS in the background."""
+
+    def __init__(self, interval: float = 0.2) -> None:
+        super().__init__(name="load-sampler", daemon=True)
+        self.interval = interval
+        self.threads: List[int] = []
+        self.rss: List[float] = []
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.is_set():
+            self.threads.append(threading.active_count())
+            self.rss.append(_rss_mb())
+            self._done.wait(self.interval)
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def _await_job(at, timeout: float) -> None:
+    """Rerun like the polling chat area until the session's turn job is done."""
+    deadline = time.perf_counter() + timeout
+    while at.session_state["turn_job"] is not None and time.perf_counter() < deadline:
+        time.sleep(JOB_POLL_SEC / 4)
+        at.run()
+
+
+def run_session(name: str, turns: int, timeout: float) -> SessionResult:
+    from streamlit.testing.v1 import AppTest
+
+    started = time.perf_counter()
+    bootstrap, turn_times, error = 0.0, [], None
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        at.run()
+        at.text_input[0].input(name)
+        start_button = next(b for b in at.button if b.label == "Start scenario")
+        t0 = time.perf_counter()
+        start_button.click().run()
+        _await_job(at, timeout)
+        bootstrap = time.perf_counter() - t0
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        for _ in range(turns):
+            if not at.chat_input:
+                break  # scenario ended early
+            t0 = time.perf_counter()
+            at.chat_input[0].set_value("Beklager, jeg ordner en ny drikk med en gang.").run()
+            _await_job(at, timeout)
+            turn_times.append(time.perf_counter() - t0)
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+    except Exception as exc:  # report, don't abort the whole run
+        error = f"{type(exc).__name__}: {exc}"
+    return SessionResult(started, time.perf_counter(), bootstrap, turn_times, error)
+
+
+def _row(label: str, samples: List[float]) -> str:
+    if not samples:
+        return f"  {label:12s} {'-':>8s}"
+    return (
+        f"  {label:12s} {percentile(samples, 50) * 1000:8.0f} {percentile(samples, 95) * 1000:8.0f} "
+        f"{percentile(samples, 99) * 1000:8.0f} {max(samples) * 1000:8.0f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="simulated trainees in total")
+    parser.add_argument("--concurrency", type=int, default=10, help="sessions running at once")
+    parser.add_argument("--turns", type=int, default=3, help="trainee turns per session")
+    parser.add_argument("--latency", type=float, default=0.8, help="fake model latency per request (s)")
+    parser.add_argument("--ttft", type=float, default=0.4, help="share of latency before first token")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative latency jitter")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per script run timeout (s)")
+    args = parser.parse_args()
+
+    races = threading.excepthook = _TeardownRaces()
+    server = FakeOpenAIServer(latency=args.latency, ttft=args.ttft, jitter=args.jitter).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-load-test")
+    # Nothing to export to; keeps the SDK from trying to reach the real API
+    os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+
+    # One unmeasured session pays for imports and first-run caches
+    warmup = run_session("Oppvarming", 1, args.timeout)
+    if warmup.error:
+        raise SystemExit(f"warm-up session failed: {warmup.error}")
+    server.requests = server.peak_in_flight = server.input_tokens = server.cached_tokens = 0
+    # Set after the warm-up: Streamlit configures its loggers on import
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+    sampler = _Sampler()
+    rss_before = _rss_mb()
+    sampler.start()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="session") as pool:
+        futures = [pool.submit(run_session, f"Trainee{i}", args.turns, args.timeout) for i in range(args.sessions)]
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - wall_start
+    sampler.stop()
+    server.stop()
+
+    ok = [r for r in results if not r.error]
+    failed = [r for r in results if r.error]
+    bootstraps = [r.bootstrap for r in ok]
+    turns = [t for r in ok for t in r.turns]
+    durations = [r.finished - r.started for r in ok]
+
+    print(f"sessions={args.sessions} concurrency={args.concurrency} turns={args.turns} "
+          f"latency={args.latency}s jitter={args.jitter}")
+    print(f"completed {len(ok)}/{len(results)} in {wall:.1f} s -> {len(ok) / wall:.2f} sessions/s, "
+          f"{len(turns) / wall:.2f} turns/s")
+    if durations:
+        print(f"session duration median {statistics.median(durations):.1f} s")
+    print("latency (ms):       p50      p95      p99      max")
+    print(_row("bootstrap", bootstraps))
+    print(_row("turn", turns))
+    print(f"model requests: {server.requests} (peak in flight {server.peak_in_flight})")
+    if server.input_tokens:
+        print(
+            f"prompt cache: {server.cached_tokens / server.input_tokens:.0%} of "
+            f"{server.input_tokens} input tokens cached (simulated)"
+        )
+    if sampler.threads:
+        print(f"threads: peak {max(sampler.threads)}, mean {statistics.mean(sampler.threads):.0f}")
+        print(f"memory: rss {rss_before:.0f} MB before, peak {max(sampler.rss):.0f} MB")
+    if races.count:
+        print(f"AppTest teardown races ignored: {races.count}")
+    for r in failed[:5]:
+        print(f"  failed: {r.error}")
+
+
+if __name__ == "__main__":
+    main()
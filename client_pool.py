@@ -0,0 +1,96 @@
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from agents import OpenAIProvider, RunConfig
+from openai import AsyncOpenAI
+
+from async_utils import run_async
+from config import CLIENT_POOL_MAX_KEYS
+
+
+class _PooledClient:
+    __slots__ = ("client", "run_config")
+
+    def __init__(self, client: AsyncOpenAI, run_config: RunConfig) -> None:
+        self.client = client
+        self.run_config = run_config
+
+
+_lock = threading.Lock()
+_pool: "OrderedDict[str, _PooledClient]" = OrderedDict()
+
+
+def key_id(api_key: str) -> str:
+    """Stable, non-reversible identifier for *api_key* (safe to log)."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def _create(api_key: str) -> _PooledClient:
+    # One AsyncOpenAI per key keeps its own httpx pool with keep-alive
+    # connections; all calls run on the shared async_utils loop, so the pool
+    # stays valid for the lifetime of the process. The key id in the trace
+    # metadata selects the key's rate limiter (rate_limit.limiter_for).
+    client = AsyncOpenAI(api_key=api_key)
+    run_config = RunConfig(
+        model_provider=OpenAIProvider(openai_client=client), trace_metadata={"key_id": key_id(api_key)}
+    )
+    return _PooledClient(client, run_config)
+
+
+def get_client(api_key: str) -> AsyncOpenAI:
+    """Return the shared client for *api_key*, creating it on first use."""
+    return _get(api_key).client
+
+
+def get_run_config(api_key: Optional[str]) -> Optional[RunConfig]:
+    """Return a ``RunConfig`` bound to the pooled client for *api_key*.
+
+    ``None`` (no key configured) leaves the SDK defaults in place, so calls
+    fail visibly just as before when no key is available.
+    """
+    if not api_key:
+        return None
+    return _get(api_key).run_config
+
+
+def _get(api_key: str) -> _PooledClient:
+    kid = key_id(api_key)
+    with _lock:
+        pooled = _pool.get(kid)
+        if pooled is None:
+            pooled = _create(api_key)
+            _pool[kid] = pooled
+            # Drop the least recently used key; in-flight calls keep their
+            # reference, so the client is not closed underneath them.
+            while len(_pool) > CLIENT_POOL_MAX_KEYS:
+                _pool.popitem(last=False)
+        else:
+            _pool.move_to_end(kid)
+    return pooled
+
+
+def pool_size() -> int:
+    with _lock:
+        return len(_pool)
+
+
+def _close(pooled: _PooledClient) -> None:
+    try:
+        run_async(pooled.client.close(), timeout=5)
+    except Exception:
+        pass
+
+
+def close_all() -> None:
+    """Close every pooled client (called automatically at exit)."""
+    with _lock:
+        pooled = list(_pool.values())
+        _pool.clear()
+    for p in pooled:
+        _close(p)
+
+
+atexit.register(close_all)
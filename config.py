@@ -1,8 +1,108 @@
 # Tuning constants
 CONTEXT_MESSAGES = 24
+# Messages folded into the summary at once when the window overflows; the
+# prompt prefix (summary + start of the history) then stays cacheable for
+# the next few turns instead of shifting every turn
+CONTEXT_FOLD_STEP = 8
+# Rolling summary of messages older than CONTEXT_MESSAGES: total cap and
+# per-message note length (characters)
+SUMMARY_MAX_CHARS = 1200
+SUMMARY_LINE_CHARS = 140
+# Upper bound for the director input per turn (estimated tokens, excluding
+# the agent instructions)
+PROMPT_TOKEN_BUDGET = 3000
+# Messages rendered per page of a long transcript ("Vis eldre meldinger")
+CHAT_PAGE_SIZE = 30
 MAX_TURNS = 6
 # Minimum perceived typing duration for UI polish
 MIN_STREAM_TIME_SEC = 0.8
+# Stream model tokens live into the chat (Runner.run_streamed); False replays
+# the finished output in chunks instead
+STREAM_MODEL_OUTPUT = True
+# Director orchestration: "handoffs" delegates each message to a persona agent
+# (one extra model round-trip per handoff); "fast" lets the director write all
+# messages in a single structured call. Switchable at runtime on the admin page
+ORCHESTRATION_MODE = "handoffs"
+# Model tier per agent role; None keeps the SDK default model/setting. Each
+# value can be overridden per deployment via secrets or env, e.g.
+# AGENT_MODEL_END_MONITOR="gpt-4.1-mini", AGENT_MAX_TOKENS_CUSTOMER=300,
+# AGENT_TEMPERATURE_DIRECTOR=0.7. max_tokens also counts reasoning tokens on
+# reasoning models, so keep it generous there
+AGENT_MODELS = {
+    "director": {"model": None, "max_tokens": None, "temperature": None},
+    "scene": {"model": None, "max_tokens": None, "temperature": None},
+    "customer": {"model": None, "max_tokens": None, "temperature": None},
+    "bystander": {"model": None, "max_tokens": None, "temperature": None},
+    "colleague": {"model": None, "max_tokens": None, "temperature": None},
+    "end_monitor": {"model": None, "max_tokens": None, "temperature": None},
+    # Simulated trainee of the headless batch runs (simulate.py --trainee llm)
+    "trainee": {"model": None, "max_tokens": None, "temperature": None},
+}
+# Run turns as jobs on the shared async loop while the chat area polls for
+# them, so model calls never hold a Streamlit script thread; False runs them
+# inline in the script thread
+BACKGROUND_TURNS = True
+# Turn jobs running at once (process-wide); further jobs wait in FIFO order
+TURN_JOB_CONCURRENCY = 32
+# How often a chat area with a running job polls it (seconds)
+JOB_POLL_SEC = 0.4
+# Upper bound for waiting on the background end-monitor decision after the
+# reply has been rendered (seconds)
+END_DECISION_TIMEOUT_SEC = 30.0
+# Agent call resilience per stage (seconds): "deadline" bounds the whole
+# stage including retries, "attempt_timeout" a single try, "attempts" counts
+# tries (1 = no retry) and "hedge" fires a duplicate request once a try runs
+# longer than the stage's recent HEDGE_QUANTILE latency. Streamed director
+# output is only retried before its first token and never hedged
+AGENT_CALL_POLICY = {
+    "director": {"deadline": 90.0, "attempt_timeout": 45.0, "attempts": 2, "hedge": False},
+    "customer": {"deadline": 30.0, "attempt_timeout": 15.0, "attempts": 2, "hedge": True},
+    "end_monitor": {"deadline": 30.0, "attempt_timeout": 20.0, "attempts": 2, "hedge": False},
+    # The simulated trainee in simulate.py --trainee llm
+    "trainee": {"deadline": 30.0, "attempt_timeout": 15.0, "attempts": 2, "hedge": False},
+}
+# Base of the jittered exponential backoff between retries (seconds)
+RETRY_BACKOFF_SEC = 0.5
+# Hedge after this latency quantile, once a stage has enough samples
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+# Admission control per API key (a whole class shares the server key): model
+# requests and tokens per minute, matching the organisation's upstream limits;
+# None disables that budget. Requests beyond the budget wait in a FIFO line
+# (trainees see their place) instead of failing with 429
+RATE_LIMIT_RPM = 500
+RATE_LIMIT_TPM = 200_000
+# Output tokens reserved per request on top of the estimated input; the real
+# usage is settled afterwards
+RATE_LIMIT_OUTPUT_TOKENS = 1000
+# Pause after an upstream 429 without a retry-after header (seconds)
+RATE_LIMIT_COOLDOWN_SEC = 10.0
+# Sessions kept in the usage ledger (token use and latency per agent call);
+# the least recently active are dropped first
+LEDGER_MAX_SESSIONS = 1000
+# Maximum number of distinct API keys with a pooled OpenAI client
+CLIENT_POOL_MAX_KEYS = 64
+# Ready openings (Scene + Kunde) kept per difficulty and API key; 0 disables
+OPENING_POOL_SIZE = 2
+# Local span tracing: each turn's agent runs, handoffs, guardrails and render
+# steps are appended as one JSON line here (nothing is exported); None disables
+TRACE_LOG_PATH = "logs/traces.jsonl"
+# Record/replay of agent runs (replay.py): "record" appends every run's output,
+# usage and latency to REPLAY_PATH; "replay" answers from there without the
+# API (a call without a recording fails); None calls the API as usual.
+# AGENT_REPLAY / AGENT_REPLAY_PATH in the environment override both
+REPLAY_MODE = None
+REPLAY_PATH = "logs/replay.jsonl"
+# Replay with each run's recorded latency instead of instantly
+# (AGENT_REPLAY_TIMING=original)
+REPLAY_ORIGINAL_TIMING = False
+# Process-wide metrics in Prometheus text format at http://HOST:PORT/metrics
+# (also shown on the admin page); None disables the endpoint, so no port is
+# opened unless METRICS_PORT is set here or in the environment (e.g. 9464)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None
+# A session counts as active if it ran a script within this many seconds
+ACTIVE_SESSION_WINDOW_SEC = 300.0
 
 # UI theme constants (aligned to palette #0fa3b1, #b5e2fa, #f9f7f3, #eddea4, #f7a072)
 PERSONA_THEME = {
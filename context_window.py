@@ -0,0 +1,95 @@
+import re
+from typing import Dict, List, Sequence
+
+from config import CONTEXT_MESSAGES, ROLE_LABEL_NB, SUMMARY_LINE_CHARS, SUMMARY_MAX_CHARS
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    head = _SENTENCE_END.split(text, 1)[0]
+    if len(head) > limit:
+        head = head[: limit - 1].rstrip() + "…"
+    return head
+
+
+class RollingContext:
+    """Recent history verbatim plus a running summary of older messages.
+
+    The summary is only touched when messages slide out of the window: each
+    dropped message is folded in once as a short one-line note, while the
+    opening scene and the first customer complaint are kept as anchors so
+    the model keeps the same order and the same complaint. The summary is
+    capped at ``max_chars``; the oldest notes are dropped first.
+
+    With ``fold_step`` > 1 an overflowing window folds that many messages at
+    once, so the summary and the start of the verbatim history (the prompt
+    prefix) stay unchanged for the next few turns instead of sliding every
+    turn.
+    """
+
+    def __init__(
+        self,
+        window: int = CONTEXT_MESSAGES,
+        max_chars: int = SUMMARY_MAX_CHARS,
+        line_chars: int = SUMMARY_LINE_CHARS,
+        fold_step: int = 1,
+    ) -> None:
+        self.window = window
+        self.fold_step = max(1, min(fold_step, window))
+        self.max_chars = max_chars
+        self.line_chars = line_chars
+        self.anchors: List[str] = []
+        self.notes: List[str] = []
+        self.omitted = 0
+        self.summarized = 0
+
+    def recent(self, history: Sequence[Dict]) -> List[Dict]:
+        self.update(history)
+        return list(history[self.summarized :])
+
+    def update(self, history: Sequence[Dict]) -> bool:
+        """Fold messages that fell out of the window; True if the summary changed."""
+        if self.summarized > len(history):
+            # History was reset (new scenario); start over
+            self.__init__(self.window, self.max_chars, self.line_chars, self.fold_step)
+        if len(history) - self.summarized <= self.window:
+            return False
+        return self.advance(history, len(history) - self.window + self.fold_step - 1)
+
+    def advance(self, history: Sequence[Dict], cutoff: int) -> bool:
+        """Fold everything before *cutoff* into the summary (never moves back)."""
+        cutoff = min(max(0, cutoff), len(history))
+        if cutoff <= self.summarized:
+            return False
+        for msg in history[self.summarized : cutoff]:
+            self._fold(msg)
+        self.summarized = cutoff
+        self._trim()
+        return True
+
+    def summary(self) -> str:
+        lines = list(self.anchors)
+        if self.omitted:
+            lines.append(f"({self.omitted} eldre replikker utelatt)")
+        lines.extend(self.notes)
+        return "\n".join(lines)
+
+    def _fold(self, msg: Dict) -> None:
+        role = msg.get("role", "")
+        name = msg.get("name", "") or role
+        content = msg.get("content", "")
+        if role == "system" and not any(a.startswith("Scene:") for a in self.anchors):
+            self.anchors.append("Scene: " + _first_sentence(content, self.line_chars * 2))
+            return
+        if role == "customer" and not any(a.startswith("Klage") for a in self.anchors):
+            self.anchors.append(f"Klage fra {name}: " + _first_sentence(content, self.line_chars * 2))
+            return
+        label = ROLE_LABEL_NB.get(role, role)
+        self.notes.append(f"- {name} ({label}): " + _first_sentence(content, self.line_chars))
+
+    def _trim(self) -> None:
+        while self.notes and len(self.summary()) > self.max_chars:
+            self.notes.pop(0)
+            self.omitted += 1
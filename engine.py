@@ -0,0 +1,293 @@
+"""Scenario orchestration without Streamlit.
+
+``ScenarioSession`` owns one scenario's history, turn count and end state and
+plays it with ``await session.start()`` and ``await session.step(text)``, so
+it can be driven from asyncio code, threads (via ``async_utils.run_async``)
+or other front ends. Whatever loop awaits them, the director calls run on
+``async_utils``' shared loop, like the end monitor, since both use the pooled
+clients bound to it. The chat page uses the same session over
+``st.session_state`` with the synchronous half (``begin_turn``, ``apply``,
+``resolve_end``, ``finish_turn``, ``check_end``) around its streamed and
+background turns; there the trainee answers again without waiting for the
+end monitor, whose decision is applied once it arrives.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, MutableMapping, NamedTuple, Optional
+
+from agents import RunConfig
+
+from async_utils import submit_async
+from config import CONTEXT_FOLD_STEP, CONTEXT_MESSAGES, END_DECISION_TIMEOUT_SEC, MAX_TURNS
+from context_window import RollingContext
+from metrics import TURNS_COMPLETED, TURNS_STARTED
+from model_api import (
+    TurnOutcome,
+    collect_end_decision,
+    decision_meta,
+    director_turn,
+    scenario_ctx,
+)
+from prompt_builder import build_prompt
+from resilience import AgentCallFailed
+from transcript import Transcript
+
+END_COMMANDS = ("end scenario", "avslutt scenario")
+END_NAMES = ("Scenario-resultat", "Scenarioresultat", "Tilbakemelding")
+
+MANUAL_END_META = {
+    "scenarioresultat": {
+        "name": "Scenarioresultat",
+        "role": "system",
+        "content": "Scenarioet ble avsluttet av brukeren.",
+    },
+    "tilbakemelding": {
+        "name": "Tilbakemelding",
+        "role": "system",
+        "content": "Du avsluttet øvelsen manuelt. Reflekter kort over hva som fungerte og hva du vil forbedre neste gang.",
+    },
+}
+
+
+def ended_by_director(messages: List[Dict], meta: Optional[Dict]) -> bool:
+    """True if the director's turn carries a result and feedback."""
+    if meta and meta.get("scenarioresultat") and meta.get("tilbakemelding"):
+        return True
+    return any(m.get("name", "") in END_NAMES for m in messages)
+
+
+async def _on_shared_loop(coro):
+    """Await *coro* on the shared loop, which owns the pooled HTTP clients."""
+    return await asyncio.wrap_future(submit_async(coro))
+
+
+class TurnResult(NamedTuple):
+    """One played turn: the new messages and the scenario's end state."""
+
+    messages: List[Dict]
+    ended: bool
+    # "director", "monitor", "max_turns" or "trainee" (end command); None while running
+    ended_by: Optional[str]
+    prompt_tokens: int
+    # Seconds spent in the director call
+    seconds: float
+
+
+class ScenarioSession:
+    """One scenario run: history, turns, meta and end state.
+
+    State is kept in *state* under the same keys as the app's session state
+    (``history``, ``turns``, ``ended``, ``last_meta``, ``pending_end``,
+    ``rolling_context``, ``prompt_tokens``): a fresh dict by default, or
+    ``st.session_state`` for the chat page. The session never imports
+    Streamlit itself.
+    """
+
+    def __init__(
+        self,
+        user_name: str = "Ansatt",
+        difficulty: str = "Medium",
+        max_turns: int = MAX_TURNS,
+        *,
+        run_config: Optional[RunConfig] = None,
+        mode: Optional[str] = None,
+        session_id: str = "",
+        scenario_id: str = "",
+        state: Optional[MutableMapping] = None,
+    ) -> None:
+        self.user_name = user_name or "Ansatt"
+        self.difficulty = difficulty
+        self.max_turns = max_turns
+        self.run_config = run_config
+        self.mode = mode
+        self.session_id = session_id
+        self.scenario_id = scenario_id
+        self.state = {} if state is None else state
+        for key, default in (
+            ("history", Transcript),
+            ("turns", int),
+            ("ended", bool),
+            ("last_meta", dict),
+            ("pending_end", lambda: None),
+            ("rolling_context", lambda: None),
+            ("prompt_tokens", list),
+        ):
+            if key not in self.state:
+                self.state[key] = default()
+
+    @property
+    def history(self) -> Transcript:
+        return self.state["history"]
+
+    @property
+    def turns(self) -> int:
+        return self.state["turns"]
+
+    @property
+    def ended(self) -> bool:
+        return self.state["ended"]
+
+    @property
+    def last_meta(self) -> Dict:
+        return self.state["last_meta"]
+
+    def ctx(self) -> Dict[str, str]:
+        return scenario_ctx(
+            self.difficulty, self.user_name, self.turns, self.max_turns, self.session_id, self.scenario_id
+        )
+
+    def rolling(self) -> RollingContext:
+        rolling = self.state["rolling_context"]
+        if rolling is None:
+            rolling = self.state["rolling_context"] = RollingContext(
+                window=CONTEXT_MESSAGES, fold_step=CONTEXT_FOLD_STEP
+            )
+        return rolling
+
+    # -- synchronous steps (also used by the Streamlit adapter) --------------
+
+    def build_input(self, user_text: str) -> str:
+        """The director input for this turn; records its size per turn."""
+        prompt, tokens = build_prompt(
+            user_text,
+            self.history,
+            self.rolling(),
+            user_name=self.user_name,
+            difficulty=self.difficulty,
+            turns=self.turns,
+            max_turns=self.max_turns,
+        )
+        self.state["prompt_tokens"].append({"turn": self.turns, "tokens": tokens})
+        return prompt
+
+    def opening_input(self) -> str:
+        return self.build_input("Start scenen.")
+
+    def begin_turn(self, user_text: str) -> bool:
+        """Add the trainee's reply and count the turn.
+
+        Returns False (and ends the scenario) for an end command such as
+        "avslutt scenario"; then no director turn follows.
+        """
+        self.history.append({"name": self.user_name, "role": "employee", "content": user_text})
+        # A decision still pending for the previous reply is stale now
+        self.state["pending_end"] = None
+        if user_text.strip().lower() in END_COMMANDS:
+            self.state["last_meta"] = {key: dict(value) for key, value in MANUAL_END_META.items()}
+            self.state["ended"] = True
+            return False
+        self.state["turns"] += 1
+        TURNS_STARTED.inc()
+        return True
+
+    def undo_turn(self) -> None:
+        """Take back the trainee's reply after a failed director call."""
+        self.history.pop()
+        self.state["turns"] -= 1
+        if self.state["prompt_tokens"]:
+            self.state["prompt_tokens"].pop()
+
+    def apply(self, outcome: TurnOutcome) -> List[Dict]:
+        """Store a director turn's meta and pending end decision; add its messages."""
+        self.state["last_meta"] = outcome.meta
+        self.state["pending_end"] = outcome.pending_end
+        self.history.extend(outcome.messages)
+        return outcome.messages
+
+    def resolve_end(self, timeout: Optional[float] = 0) -> bool:
+        """Apply the end monitor's decision if it arrived within *timeout*.
+
+        True if the monitor ended the scenario (``last_meta`` then holds its
+        result and feedback).
+        """
+        pending = self.state["pending_end"]
+        if not pending:
+            return False
+        arrived, decision = collect_end_decision(pending, timeout)
+        if not arrived:
+            return False
+        self.state["pending_end"] = None
+        if decision and decision.should_end:
+            self.state["last_meta"] = decision_meta(pending, decision)
+            return True
+        return False
+
+    def finish_turn(self, messages: List[Dict], by_monitor: bool = False) -> Optional[str]:
+        """Count an answered turn and decide whether the scenario ended.
+
+        Returns what ended it, or None if the trainee answers next.
+        """
+        TURNS_COMPLETED.inc()
+        if by_monitor:
+            ended_by = "monitor"
+        elif ended_by_director(messages, self.last_meta):
+            ended_by = "director"
+        elif self.turns >= self.max_turns:
+            ended_by = "max_turns"
+        else:
+            return None
+        self.state["ended"] = True
+        return ended_by
+
+    def check_end(self) -> bool:
+        """Apply an end decision that arrived after the turn was finished.
+
+        True if the monitor ended the scenario; a pending decision is only
+        checked, never waited for.
+        """
+        if self.ended or not self.resolve_end(timeout=0):
+            return False
+        self.state["ended"] = True
+        return True
+
+    # -- async API -----------------------------------------------------------
+
+    async def start(self, opening: Optional[List[Dict]] = None) -> TurnResult:
+        """Play the opening; *opening* uses pre-generated messages instead.
+
+        A pre-generated opening sends no prompt, so none is recorded for it.
+        """
+        if opening is not None:
+            self.apply(TurnOutcome(opening, {}, None))
+            return TurnResult(opening, False, None, 0, 0.0)
+        compiled = self.opening_input()
+        tokens = self.state["prompt_tokens"][-1]["tokens"]
+        started = time.perf_counter()
+        try:
+            outcome = await _on_shared_loop(director_turn(compiled, self.ctx(), True, self.run_config, self.mode))
+        except AgentCallFailed:
+            self.state["prompt_tokens"].clear()
+            raise
+        messages = self.apply(outcome)
+        return TurnResult(messages, False, None, tokens, time.perf_counter() - started)
+
+    async def step(self, user_text: str) -> TurnResult:
+        """Play one trainee turn: the director's reply and the end decision.
+
+        Unlike the chat page, which lets the trainee answer while the end
+        monitor runs, this waits up to ``END_DECISION_TIMEOUT_SEC`` for it:
+        a scripted or simulated trainee replies at once, so a decision that
+        arrived later would always be stale. A failed director call
+        (``AgentCallFailed``) undoes the turn before re-raising, so the same
+        reply can be sent again.
+        """
+        if not self.begin_turn(user_text):
+            return TurnResult([], True, "trainee", 0, 0.0)
+        compiled = self.build_input(user_text)
+        tokens = self.state["prompt_tokens"][-1]["tokens"]
+        started = time.perf_counter()
+        try:
+            outcome = await _on_shared_loop(director_turn(compiled, self.ctx(), False, self.run_config, self.mode))
+        except AgentCallFailed:
+            self.undo_turn()
+            raise
+        seconds = time.perf_counter() - started
+        messages = self.apply(outcome)
+        if outcome.pending_end:
+            # asyncio.wait leaves a late monitor running; resolve_end picks it up later
+            decision = asyncio.wrap_future(outcome.pending_end["future"])
+            await asyncio.wait([decision], timeout=END_DECISION_TIMEOUT_SEC)
+        by_monitor = self.resolve_end(timeout=0)
+        ended_by = self.finish_turn(messages, by_monitor)
+        return TurnResult(messages, ended_by is not None, ended_by, tokens, seconds)
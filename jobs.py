@@ -0,0 +1,130 @@
+import asyncio
+import concurrent.futures
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from async_utils import submit_async
+from config import TURN_JOB_CONCURRENCY
+from metrics import JOB_WAIT_SECONDS, JOBS
+
+
+class Job:
+    """Background work submitted by one session, polled from its script runs.
+
+    ``progress()`` holds the messages produced so far (name, role and the
+    content streamed up to now), so a polling fragment can show them while
+    the job is still running.
+    """
+
+    def __init__(self, job_id: int, kind: str) -> None:
+        self.id = job_id
+        self.kind = kind
+        self.status = "queued"
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.future: Optional["concurrent.futures.Future[Any]"] = None
+        self._lock = threading.Lock()
+        self._progress: List[Dict[str, str]] = []
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self.future is not None:
+            concurrent.futures.wait([self.future], timeout=timeout)
+        return self.done()
+
+    def result(self) -> Any:
+        """The job's return value; re-raises its exception. Only when done."""
+        return self.future.result(timeout=0)
+
+    def progress(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [dict(m) for m in self._progress]
+
+    def start_message(self, name: str, role: str) -> None:
+        with self._lock:
+            self._progress.append({"name": name, "role": role, "content": ""})
+
+    def add_text(self, text: str) -> None:
+        with self._lock:
+            if self._progress:
+                self._progress[-1]["content"] += text
+
+    def set_progress(self, messages: List[Dict[str, str]]) -> None:
+        with self._lock:
+            self._progress = [dict(m) for m in messages]
+
+
+class JobQueue:
+    """Process-wide FIFO of async jobs on the shared loop, bounded concurrency.
+
+    At most *concurrency* jobs run at once; the rest wait in submission
+    order. Submitting never blocks the calling (script) thread.
+    """
+
+    def __init__(self, concurrency: int = TURN_JOB_CONCURRENCY) -> None:
+        self.concurrency = max(1, concurrency)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._waiting: "OrderedDict[int, Job]" = OrderedDict()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def submit(self, kind: str, work: Callable[[Job], Awaitable[Any]]) -> Job:
+        """Queue ``work(job)``; its result or exception ends up in ``job.future``."""
+        job = Job(next(self._ids), kind)
+        with self._lock:
+            self._waiting[job.id] = job
+        JOBS.inc(state="queued")
+        job.future = submit_async(self._run(job, work))
+        return job
+
+    def position(self, job: Job) -> int:
+        """1-based place in the waiting line, or 0 once the job has started."""
+        with self._lock:
+            for index, job_id in enumerate(self._waiting, start=1):
+                if job_id == job.id:
+                    return index
+        return 0
+
+    def waiting(self) -> int:
+        with self._lock:
+            return len(self._waiting)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[Any]]) -> Any:
+        try:
+            async with self._get_semaphore():
+                with self._lock:
+                    self._waiting.pop(job.id, None)
+                job.status = "running"
+                job.started = time.monotonic()
+                JOBS.dec(state="queued")
+                JOB_WAIT_SECONDS.observe(job.started - job.submitted, kind=job.kind)
+                with JOBS.track(state="running"):
+                    try:
+                        result = await work(job)
+                    except BaseException:
+                        job.status = "failed"
+                        raise
+                job.status = "done"
+                return result
+        finally:
+            job.finished = time.monotonic()
+            with self._lock:
+                if self._waiting.pop(job.id, None) is not None:
+                    JOBS.dec(state="queued")  # cancelled while waiting
+
+
+turn_jobs = JobQueue()
@@ -0,0 +1,377 @@
+import abc
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import ACTIVE_SESSION_WINDOW_SEC, METRICS_HOST, METRICS_PORT
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers a fast end-monitor call up to a slow director run
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[str]:
+        """The metric's sample lines in Prometheus text format."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        """Sum over all label sets."""
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0.0)]
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; ``track()`` counts work in progress."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function = function
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels: str) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        """Sum over all label sets."""
+        with self._lock:
+            return sum(self._values.values())
+
+    def track(self, **labels: str) -> "_InFlight":
+        return _InFlight(self, labels)
+
+    def samples(self) -> Iterable[str]:
+        if self._function is not None:
+            yield f"{self.name} {_fmt(self.value())}"
+            return
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0.0)]
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+class _InFlight:
+    __slots__ = ("gauge", "labels")
+
+    def __init__(self, gauge: Gauge, labels: Dict[str, str]) -> None:
+        self.gauge = gauge
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.gauge.inc(**self.labels)
+
+    def __exit__(self, *exc) -> None:
+        self.gauge.dec(**self.labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; ``time()`` observes a block's duration."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last) and [sum]
+        self._data: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._data.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            data = self._data.get(self._key(labels))
+            return sum(data[0]) if data else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._data.items())
+        for key, (counts, total) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = f'le="{_fmt(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {running}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {running}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class _Sessions:
+    """Sessions seen within ``ACTIVE_SESSION_WINDOW_SEC`` (no disconnect hook)."""
+
+    def __init__(self, window: float = ACTIVE_SESSION_WINDOW_SEC) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._last_seen: Dict[str, float] = {}
+
+    def touch(self, session_id: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._last_seen[session_id] = now
+            if len(self._last_seen) > 1024:
+                self._prune(now)
+
+    def active(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            return len(self._last_seen)
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window
+        for sid in [s for s, t in self._last_seen.items() if t < cutoff]:
+            del self._last_seen[sid]
+
+
+sessions = _Sessions()
+
+TURNS_STARTED = Counter("krise_turns_started_total", "Trainee turns submitted.")
+TURNS_COMPLETED = Counter("krise_turns_completed_total", "Trainee turns answered and rendered.")
+OPENINGS = Counter("krise_openings_total", "Scenario openings shown, by source.", ["source"])
+CALL_MODEL_SECONDS = Histogram(
+    "krise_call_model_seconds",
+    "Director call until cleaned messages are ready.",
+    ["mode", "orchestration"],
+)
+AGENT_RUN_SECONDS = Histogram("krise_agent_run_seconds", "Single agent run duration.", ["agent"])
+AGENT_RUNS = Counter(
+    "krise_agent_runs_total", "Agent runs, by agent, effective model and outcome.", ["agent", "model", "outcome"]
+)
+MODEL_RESPONSES = Counter(
+    "krise_model_responses_total",
+    "Model round-trips per agent run, including handoff targets.",
+    ["agent", "model"],
+)
+MODEL_INPUT_TOKENS = Counter(
+    "krise_model_input_tokens_total", "Input tokens sent to the model, by agent and model.", ["agent", "model"]
+)
+MODEL_CACHED_INPUT_TOKENS = Counter(
+    "krise_model_cached_input_tokens_total",
+    "Input tokens served from the upstream prompt cache, by agent and model.",
+    ["agent", "model"],
+)
+MODEL_CALLS_IN_FLIGHT = Gauge("krise_model_calls_in_flight", "Agent runs currently in progress.", ["agent"])
+AGENT_RETRIES = Counter("krise_agent_retries_total", "Agent call retries, by stage and reason.", ["stage", "reason"])
+AGENT_HEDGES = Counter(
+    "krise_agent_hedges_total", "Hedged duplicate agent requests, by stage and winner.", ["stage", "winner"]
+)
+AGENT_CALL_FAILURES = Counter(
+    "krise_agent_call_failures_total", "Agent calls that failed after all retries, by stage and reason.", ["stage", "reason"]
+)
+JOBS = Gauge("krise_turn_jobs", "Background turn jobs, by state (queued or running).", ["state"])
+JOB_WAIT_SECONDS = Histogram("krise_turn_job_wait_seconds", "Time a turn job waited in the queue.", ["kind"])
+RATE_LIMIT_WAITING = Gauge("krise_rate_limit_waiting", "Model requests waiting for admission.")
+RATE_LIMIT_WAIT_SECONDS = Histogram("krise_rate_limit_wait_seconds", "Time a model request waited for admission.")
+RATE_LIMIT_THROTTLES = Counter("krise_rate_limit_throttles_total", "Upstream 429 responses fed back into admission.")
+END_MONITOR_CALLS = Counter("krise_end_monitor_calls_total", "End-monitor decisions, by result.", ["decision"])
+COERCION_FALLBACKS = Counter(
+    "krise_coercion_fallbacks_total", "Director outputs that needed a recovery path to decode.", ["path"]
+)
+BOOTSTRAP_FALLBACKS = Counter(
+    "krise_bootstrap_customer_fallbacks_total", "Openings without a customer line (_gen_customer used)."
+)
+ACTIVE_SESSIONS = Gauge(
+    "krise_active_sessions",
+    f"Sessions with activity in the last {int(ACTIVE_SESSION_WINDOW_SEC)} s.",
+    function=sessions.active,
+)
+
+REGISTRY: List[_Metric] = [
+    TURNS_STARTED,
+    TURNS_COMPLETED,
+    OPENINGS,
+    CALL_MODEL_SECONDS,
+    AGENT_RUN_SECONDS,
+    AGENT_RUNS,
+    MODEL_RESPONSES,
+    MODEL_INPUT_TOKENS,
+    MODEL_CACHED_INPUT_TOKENS,
+    MODEL_CALLS_IN_FLIGHT,
+    AGENT_RETRIES,
+    AGENT_HEDGES,
+    AGENT_CALL_FAILURES,
+    JOBS,
+    JOB_WAIT_SECONDS,
+    RATE_LIMIT_WAITING,
+    RATE_LIMIT_WAIT_SECONDS,
+    RATE_LIMIT_THROTTLES,
+    END_MONITOR_CALLS,
+    COERCION_FALLBACKS,
+    BOOTSTRAP_FALLBACKS,
+    ACTIVE_SESSIONS,
+]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+_bind_failed = False
+
+
+def metrics_port() -> Optional[int]:
+    """The ``/metrics`` port: ``METRICS_PORT`` in the environment, else the config (None: off)."""
+    value = os.getenv("METRICS_PORT")
+    return int(value) if value else METRICS_PORT
+
+
+def serve(host: str = METRICS_HOST, port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """Expose ``/metrics`` on *host*:*port* once per process (idempotent).
+
+    *port* defaults to ``metrics_port()``, so nothing listens unless a port
+    is set explicitly. Returns ``None`` when disabled or when the port is
+    taken (e.g. a second server process on the same machine); the admin page
+    still works then.
+    """
+    global _server, _bind_failed
+    port = port if port is not None else metrics_port()
+    if port is None:
+        return None
+    with _server_lock:
+        if _server is None and not _bind_failed:
+            try:
+                _server = ThreadingHTTPServer((host, port), _Handler)
+            except OSError:
+                _bind_failed = True
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
@@ -1,48 +1,51 @@
+import asyncio
+import concurrent.futures
 import json
-import re
 import time
-from typing import List, Dict, Optional, Literal
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, List, Dict, NamedTuple, Optional, Tuple
 
+import openai
 import streamlit as st
-from pydantic import BaseModel, Field
-
-from async_utils import run_async
+from pydantic import BaseModel
+
+import rate_limit
+import replay
+import resilience
+from agent_models import agent_options, effective_model
+from async_utils import iter_async, run_async, submit_async
+from config import (
+    MAX_TURNS,
+    ORCHESTRATION_MODE,
+    RATE_LIMIT_OUTPUT_TOKENS,
+    STREAM_MODEL_OUTPUT,
+)
+from client_pool import get_run_config
+from metrics import (
+    AGENT_RUN_SECONDS,
+    AGENT_RUNS,
+    BOOTSTRAP_FALLBACKS,
+    CALL_MODEL_SECONDS,
+    COERCION_FALLBACKS,
+    END_MONITOR_CALLS,
+    MODEL_CACHED_INPUT_TOKENS,
+    MODEL_CALLS_IN_FLIGHT,
+    MODEL_INPUT_TOKENS,
+    MODEL_RESPONSES,
+)
+from jobs import Job, turn_jobs
+from output_decoder import decode_scenario_output
+from prompt_builder import estimate_tokens, opening_prompt
+from schemas import ScenarioMessage, ScenarioOutput
+from stream_parser import MessageStreamExtractor
+from tracing_local import span, turn_trace
+from usage_ledger import ledger, usage_of
 
 # Agents framework
-from agents import Agent, GuardrailFunctionOutput, InputGuardrail, Runner
+from agents import Agent, GuardrailFunctionOutput, InputGuardrail, RunConfig, Runner
 from agents.extensions.handoff_prompt import prompt_with_handoff_instructions
 
 
-class Oppdrag(BaseModel):
-    beskrivelse: Optional[str] = Field(default=None, description="Kort oppsummering (maks fire setninger)")
-
-
-class ScenarioMessage(BaseModel):
-    name: str
-    role: Literal["system", "customer", "employee", "student", "bystander"]
-    content: str
-
-
-class ScenarioResult(BaseModel):
-    name: Literal["Scenarioresultat"]
-    role: Literal["system"]
-    content: str
-
-
-class ScenarioFeedback(BaseModel):
-    name: Literal["Tilbakemelding"]
-    role: Literal["system"]
-    content: str
-
-
-class ScenarioOutput(BaseModel):
-    oppdrag: Optional[Oppdrag] = None
-    sjekkliste: Optional[List[str]] = None
-    meldinger: List[ScenarioMessage]
-    scenarioresultat: Optional[ScenarioResult] = None
-    tilbakemelding: Optional[ScenarioFeedback] = None
-
-
 # Guardrail to ensure scenario inputs stay on topic
 def check_training_context(
     context, agent, compiled_input: str | List[Dict]
@@ -74,78 +77,146 @@ def check_training_context(
     return GuardrailFunctionOutput(output_info="ok", tripwire_triggered=False)
 
 
+# Persona writing rules, shared by the persona agents (handoff mode) and the
+# single-call director (fast mode) so both produce the same voices.
+SCENE_RULES = (
+    "Skriv på norsk (Bokmål), uten meta-tekst, ingen kodeblokker. "
+    "Innhold: sett scenen på Sit Kafe her og nå (presens), med 1–2 konkrete og troverdige detaljer (f.eks. travle morgenminutter, lukt av kaffe, søl, lang kø, feil bestilling, allergi, betalingsproblem). "
+    "Ikke nevn spesifikke personnavn; bruk nøytrale betegnelser som 'kunden' og 'kollega'. "
+    "Ikke løs konflikten; kun etablér situasjonen kort."
+)
+CUSTOMER_RULES = (
+    "Sett 'name' til et realistisk norsk fornavn (f.eks. Kari, Anders, Nora, Ola, Mari, Jon, Ingrid). "
+    "Innhold: 1–4 setninger på norsk, konkret og relevant for scenen. "
+    "Inkluder minst én spesifikk detalj (bestilling, ventetid, pris, kvittering, søl, allergi, tidspunkt). "
+    "Kalibrer styrke etter 'difficulty' i konteksten: Lett = irritert men saklig; Medium = bestemt og utålmodig; Vanskelig = hevet stemme, avbryter og stiller krav (uten trusler). "
+    "Ikke løs situasjonen, ikke metakommentarer, ingen emojis."
+)
+BYSTANDER_RULES = (
+    "Sett 'name' til et realistisk norsk fornavn. 1–3 setninger, norsk. "
+    "Tone: observatør. Kommentér kort og troverdig på det som skjer, uten å ta over samtalen. "
+    "Medium: kan mildt støtte eller be om ro; Vanskelig: kan uttrykke utålmodighet eller legge press, men aldri bli truende eller grov. "
+    "Ingen metatekst, ingen løsninger på egne vegne."
+)
+COLLEAGUE_RULES = (
+    "Sett 'name' til et realistisk norsk fornavn som IKKE er lik 'user_name' i konteksten. 1–3 setninger, norsk. "
+    "Støtt den ansatte høflig: tilby konkret hjelp (sjekke kvittering, hente ny drikk, tilkalle leder), holde ro, avklare misforståelser. "
+    "Ikke overstyr kunden eller den ansatte, ikke løft saker du ikke har mandat til, ingen metatekst. Bare ved Medium/Vanskelig."
+)
+
+
 # Persona agents (configurable, available for handoff)
 scene_agent = Agent(
     name="Scene Agent",
     handoff_description="Genererer første 'Scene'-melding",
     instructions=prompt_with_handoff_instructions(
         "Output: nøyaktig ÉN meldingsobjekt (ikke liste), som JSON/dict, "
-        "med {name: 'Scene', role: 'system', content: <2–4 setninger>}. "
-        "Skriv på norsk (Bokmål), uten meta-tekst, ingen kodeblokker. "
-        "Innhold: sett scenen på Sit Kafe her og nå (presens), med 1–2 konkrete og troverdige detaljer (f.eks. travle morgenminutter, lukt av kaffe, søl, lang kø, feil bestilling, allergi, betalingsproblem). "
-        "Ikke nevn spesifikke personnavn; bruk nøytrale betegnelser som 'kunden' og 'kollega'. "
-        "Ikke løs konflikten; kun etablér situasjonen kort."
+        "med {name: 'Scene', role: 'system', content: <2–4 setninger>}. " + SCENE_RULES
     ),
+    **agent_options("scene"),
 )
 
 customer_agent = Agent(
     name="Kunde Agent",
     handoff_description="Skriver realistisk sint kundereplikk",
     instructions=prompt_with_handoff_instructions(
-        "Output: nøyaktig ÉN meldingsobjekt (ikke liste), som JSON/dict, for en kunde med role 'customer'. "
-        "Sett 'name' til et realistisk norsk fornavn (f.eks. Kari, Anders, Nora, Ola, Mari, Jon, Ingrid). "
-        "Innhold: 1–4 setninger på norsk, konkret og relevant for scenen. "
-        "Inkluder minst én spesifikk detalj (bestilling, ventetid, pris, kvittering, søl, allergi, tidspunkt). "
-        "Kalibrer styrke etter 'difficulty' i konteksten: Lett = irritert men saklig; Medium = bestemt og utålmodig; Vanskelig = hevet stemme, avbryter og stiller krav (uten trusler). "
-        "Ikke løs situasjonen, ikke metakommentarer, ingen emojis."
+        "Output: nøyaktig ÉN meldingsobjekt (ikke liste), som JSON/dict, for en kunde med role 'customer'. " + CUSTOMER_RULES
     ),
+    **agent_options("customer"),
 )
 
 bystander_agent = Agent(
     name="Forbipasserende Agent",
     handoff_description="Legger til sjeldne kommenterer fra forbipasserende",
     instructions=prompt_with_handoff_instructions(
-        "Output: nøyaktig ÉN meldingsobjekt (ikke liste) for en forbipasserende med role 'bystander'. "
-        "Sett 'name' til et realistisk norsk fornavn. 1–3 setninger, norsk. "
-        "Tone: observatør. Kommentér kort og troverdig på det som skjer, uten å ta over samtalen. "
-        "Medium: kan mildt støtte eller be om ro; Vanskelig: kan uttrykke utålmodighet eller legge press, men aldri bli truende eller grov. "
-        "Ingen metatekst, ingen løsninger på egne vegne."
+        "Output: nøyaktig ÉN meldingsobjekt (ikke liste) for en forbipasserende med role 'bystander'. " + BYSTANDER_RULES
     ),
+    **agent_options("bystander"),
 )
 
 colleague_agent = Agent(
     name="Kollega Agent",
     handoff_description="Gir støtte fra en kollega ved behov",
     instructions=prompt_with_handoff_instructions(
-        "Output: nøyaktig ÉN meldingsobjekt (ikke liste) fra en kollega med role 'employee'. "
-        "Sett 'name' til et realistisk norsk fornavn som IKKE er lik 'user_name' i konteksten. 1–3 setninger, norsk. "
-        "Støtt den ansatte høflig: tilby konkret hjelp (sjekke kvittering, hente ny drikk, tilkalle leder), holde ro, avklare misforståelser. "
-        "Ikke overstyr kunden eller den ansatte, ikke løft saker du ikke har mandat til, ingen metatekst. Bare ved Medium/Vanskelig."
+        "Output: nøyaktig ÉN meldingsobjekt (ikke liste) fra en kollega med role 'employee'. " + COLLEAGUE_RULES
     ),
+    **agent_options("colleague"),
 )
 
 
+_DIRECTOR_HEADER = (
+    "Du er scenarieleder for en kriseøvelse ved Sit Kafe. Svar alltid på norsk. Returner KUN et JSON/dict som samsvarer med Schema 'ScenarioOutput' "
+    "med feltene: oppdrag (valgfritt), sjekkliste (valgfritt), meldinger (påkrevd), scenarioresultat (valgfritt), tilbakemelding (valgfritt). "
+    "Ingen kodeblokker, ingen metatekst. Følg reglene:\n"
+)
+_DIRECTOR_FIRST_TURN = (
+    "- Første tur (turn_count == '0'): returner nøyaktig TO meldinger i denne rekkefølgen: (1) Scene {name:'Scene', role:'system'} og (2) sint kunde {role:'customer'}."
+)
+_DIRECTOR_RULES = (
+    "- Etter første tur: fortsett dialogen logisk basert på 'Brukerens siste svar' fra input. Produser normalt 1 melding (kunden). "
+    "  Hvis 'difficulty' er 'Medium' eller 'Vanskelig', kan du SOME ganger legge til ÉN ekstra kommentar fra forbipasserende ELLER kollega (aldri begge samtidig).\n"
+    "- Maks 4 setninger per melding. Bruk realistiske norske fornavn. Hvis det finnes 'user_name' i konteksten, kan kunden tiltale den ansatte ved dette navnet.\n"
+    "- Hold kontinuitet: behold samme sak og detaljer som tidligere. Ikke introduser ny informasjon som strider mot historikken.\n"
+    "- Oppdrag/sjekkliste (valgfritt): etter første tur kan du kort gi 'oppdrag.beskrivelse' (<=4 setninger) og 2–4 sjekklistepunkter for den ansatte (f.eks. 'Bekreft problemet', 'Hold rolig tone', 'Tilby konkret løsning').\n"
+    "- Slutt: senest innen 'max_turns' eller når konflikten er tydelig løst/feilet, fyll ut 'scenarioresultat' (1–2 setninger) og 'tilbakemelding' (1–3 setninger, konkret og hjelpsom). Ikke før.\n"
+)
+
 # Director agent composes the structured output
 scenario_agent = Agent(
     name="Scenarioleder",
     instructions=prompt_with_handoff_instructions(
-        "Du er scenarieleder for en kriseøvelse ved Sit Kafe. Svar alltid på norsk. Returner KUN et JSON/dict som samsvarer med Schema 'ScenarioOutput' "
-        "med feltene: oppdrag (valgfritt), sjekkliste (valgfritt), meldinger (påkrevd), scenarioresultat (valgfritt), tilbakemelding (valgfritt). "
-        "Ingen kodeblokker, ingen metatekst. Følg reglene:\n"
-        "- Første tur (turn_count == '0'): returner nøyaktig TO meldinger i denne rekkefølgen: (1) Scene {name:'Scene', role:'system'} og (2) sint kunde {role:'customer'}. Bruk handoffs til Scene/Kunde for disse.\n"
-        "- Etter første tur: fortsett dialogen logisk basert på 'Brukerens siste svar' fra input. Produser normalt 1 melding (kunden). "
-        "  Hvis 'difficulty' er 'Medium' eller 'Vanskelig', kan du SOME ganger legge til ÉN ekstra kommentar fra forbipasserende ELLER kollega (aldri begge samtidig).\n"
-        "- Maks 4 setninger per melding. Bruk realistiske norske fornavn. Hvis det finnes 'user_name' i konteksten, kan kunden tiltale den ansatte ved dette navnet.\n"
-        "- Hold kontinuitet: behold samme sak og detaljer som tidligere. Ikke introduser ny informasjon som strider mot historikken.\n"
-        "- Oppdrag/sjekkliste (valgfritt): etter første tur kan du kort gi 'oppdrag.beskrivelse' (<=4 setninger) og 2–4 sjekklistepunkter for den ansatte (f.eks. 'Bekreft problemet', 'Hold rolig tone', 'Tilby konkret løsning').\n"
-        "- Slutt: senest innen 'max_turns' eller når konflikten er tydelig løst/feilet, fyll ut 'scenarioresultat' (1–2 setninger) og 'tilbakemelding' (1–3 setninger, konkret og hjelpsom). Ikke før.\n"
-        "- Delegér for meldingsinnhold via handoffs til Scene/Kunde/Forbipasserende/Kollega ved behov."
+        _DIRECTOR_HEADER
+        + _DIRECTOR_FIRST_TURN
+        + " Bruk handoffs til Scene/Kunde for disse.\n"
+        + _DIRECTOR_RULES
+        + "- Delegér for meldingsinnhold via handoffs til Scene/Kunde/Forbipasserende/Kollega ved behov."
     ),
     handoffs=[scene_agent, customer_agent, bystander_agent, colleague_agent],
     input_guardrails=[InputGuardrail(guardrail_function=check_training_context)],
     output_type=ScenarioOutput,
+    **agent_options("director"),
+)
+
+# Fast mode: the same director writes every message itself in one structured
+# call; the persona rules are compiled into its prompt instead of handoffs.
+fast_scenario_agent = Agent(
+    name="Scenarioleder (rask)",
+    instructions=(
+        _DIRECTOR_HEADER
+        + _DIRECTOR_FIRST_TURN
+        + " Skriv begge selv.\n"
+        + _DIRECTOR_RULES
+        + "- Skriv alle meldinger selv (ingen delegering) og følg rollereglene:\n"
+        + "  * Scene (name 'Scene', role 'system', 2–4 setninger): " + SCENE_RULES + "\n"
+        + "  * Kunde (role 'customer'): " + CUSTOMER_RULES + "\n"
+        + "  * Forbipasserende (role 'bystander'): " + BYSTANDER_RULES + "\n"
+        + "  * Kollega (role 'employee'): " + COLLEAGUE_RULES
+    ),
+    input_guardrails=[InputGuardrail(guardrail_function=check_training_context)],
+    output_type=ScenarioOutput,
+    **agent_options("director"),
 )
 
+ORCHESTRATION_MODES = ("handoffs", "fast")
+_orchestration_mode = ORCHESTRATION_MODE
+
+
+def get_orchestration_mode() -> str:
+    return _orchestration_mode
+
+
+def set_orchestration_mode(mode: str) -> None:
+    """Switch the director for all sessions (e.g. fast mode during peaks)."""
+    global _orchestration_mode
+    if mode not in ORCHESTRATION_MODES:
+        raise ValueError(f"unknown orchestration mode: {mode!r}")
+    _orchestration_mode = mode
+
+
+def director_agent(mode: Optional[str] = None) -> Agent:
+    """The director for *mode* (default: the current process-wide mode)."""
+    return fast_scenario_agent if (mode or _orchestration_mode) == "fast" else scenario_agent
+
 
 class EndDecision(BaseModel):
     should_end: bool
@@ -163,218 +234,680 @@ end_monitor_agent = Agent(
         "Ellers: should_end=false. Ingen kodeblokker."
     ),
     output_type=EndDecision,
+    **agent_options("end_monitor"),
 )
 
 
-def coerce_scenario_output(val) -> ScenarioOutput:
+def coerce_scenario_output(val, initial: Optional[bool] = None) -> ScenarioOutput:
     """Coerce various return types into a ``ScenarioOutput`` instance.
 
     Accepts ``ScenarioOutput`` objects, raw dicts, JSON strings or plain text.
     On invalid input a minimal structured fallback is produced so callers can
-    rely on receiving a valid ``ScenarioOutput``.
+    rely on receiving a valid ``ScenarioOutput``. Plain text becomes a Scene
+    message on the initial turn and a customer line otherwise; pass *initial*
+    to decide that without reading session state (e.g. off the script thread).
     """
-    try:
-        if isinstance(val, ScenarioOutput):
-            return val
-        if isinstance(val, dict):
-            return ScenarioOutput(**val)
-        if isinstance(val, str):
-            cleaned = val.strip()
-            cleaned = re.sub(r"^```\w*\n|```$", "", cleaned)
-            cleaned = cleaned.strip().strip("`")
-            data = None
+    is_initial = _is_initial_turn() if initial is None else initial
+    name, role = ("Scene", "system") if is_initial else ("Kunde", "customer")
+    with span("coerce_scenario_output", initial=is_initial) as info:
+        decoded = decode_scenario_output(val, name, role)
+        if info is not None:
+            info["path"] = decoded.path
+    if decoded.is_fallback:
+        COERCION_FALLBACKS.inc(path=decoded.path)
+    return decoded.output
+
+
+def scenario_ctx(
+    difficulty: str,
+    user_name: str = "",
+    turns: int = 0,
+    max_turns: int = MAX_TURNS,
+    session_id: str = "",
+    scenario_id: str = "",
+) -> Dict[str, str]:
+    """The agent run context for one turn of a scenario."""
+    return {
+        "difficulty": str(difficulty),
+        "user_name": str(user_name),
+        "turn_count": str(turns),
+        "max_turns": str(max_turns),
+        # Not used by the agents; books the calls in the usage ledger
+        "session_id": str(session_id),
+        "scenario_id": str(scenario_id),
+    }
+
+
+def _session_ctx() -> Dict[str, str]:
+    """Snapshot the agent context from session state (script thread only)."""
+    return scenario_ctx(
+        st.session_state.get("difficulty", ""),
+        st.session_state.get("user_name", ""),
+        st.session_state.get("turns", 0),
+        st.session_state.get("max_turns", 6),
+        st.session_state.get("session_id", ""),
+        st.session_state.get("scenario_id", ""),
+    )
+
+
+def _session_run_config() -> Optional[RunConfig]:
+    """Run config bound to the pooled client for this session's API key."""
+    return get_run_config(st.session_state.get("active_api_key", ""))
+
+
+@contextmanager
+def _observe_agent(agent: Agent, run_config: Optional[RunConfig]) -> Iterator[str]:
+    """Count, time and track an agent run as in flight (process-wide metrics).
+
+    Yields the effective model, which labels the run and round-trip counters.
+    """
+    name = agent.name
+    model = effective_model(agent, run_config)
+    with MODEL_CALLS_IN_FLIGHT.track(agent=name), AGENT_RUN_SECONDS.time(agent=name):
+        try:
+            yield model
+        except BaseException:
+            AGENT_RUNS.inc(agent=name, model=model, outcome="error")
+            raise
+    AGENT_RUNS.inc(agent=name, model=model, outcome="ok")
+
+
+def _stage(agent: Agent) -> str:
+    """Resilience policy stage (config.AGENT_CALL_POLICY key) for *agent*."""
+    if agent is customer_agent:
+        return "customer"
+    if agent is end_monitor_agent:
+        return "end_monitor"
+    return "director"
+
+
+class _Admission:
+    """One agent call's way through its API key's rate limiter.
+
+    ``wait()`` queues for the first request before the stage's deadline
+    starts, so time spent in line is not counted against it; ``request()``
+    admits each try, where retries and hedges (real extra requests) queue
+    again. A 429 throttles the limiter and ``done()`` settles the real usage.
+    """
+
+    def __init__(self, agent: Agent, agent_input, run_config: Optional[RunConfig]) -> None:
+        self.limiter = rate_limit.limiter_for(run_config)
+        instructions = agent.instructions if isinstance(agent.instructions, str) else ""
+        # Estimated prompt size; also what a discarded try is booked with
+        self.input_tokens = estimate_tokens(instructions) + estimate_tokens(str(agent_input))
+        self.reserved = self.input_tokens + RATE_LIMIT_OUTPUT_TOKENS
+        self._ready = False
+
+    async def wait(self) -> None:
+        await self.limiter.acquire(self.reserved)
+        self._ready = True
+
+    async def request(self) -> None:
+        if self._ready:
+            self._ready = False
+        else:
+            await self.limiter.acquire(self.reserved)
+
+    def failed(self, exc: BaseException) -> None:
+        if isinstance(exc, openai.RateLimitError):
+            self.limiter.throttle(rate_limit.retry_after(exc))
+
+    def done(self, result) -> None:
+        responses, input_tokens, output_tokens, _ = usage_of(result)
+        self.limiter.settle(self.reserved, responses, input_tokens + output_tokens)
+
+
+class _AdmittedStream:
+    """A streamed run that reports its 429s and usage to its admission.
+
+    ``cancel()`` (a failed or timed-out try that ``RetryingStream`` drops)
+    books the abandoned request in the usage ledger through *on_abandon*.
+    """
+
+    def __init__(self, run, admission: _Admission, on_abandon: Callable[[BaseException], None]) -> None:
+        self._run = run
+        self._admission = admission
+        self._on_abandon = on_abandon
+        self._error: Optional[BaseException] = None
+
+    def __getattr__(self, name: str):
+        return getattr(self._run, name)
+
+    async def stream_events(self):
+        try:
+            async for event in self._run.stream_events():
+                yield event
+        except Exception as exc:
+            self._error = exc
+            self._admission.failed(exc)
+            raise
+        self._admission.done(self._run)
+
+    def cancel(self) -> None:
+        # No error seen by the stream itself: the try timed out
+        self._on_abandon(self._error or asyncio.TimeoutError())
+        self._run.cancel()
+
+
+async def _run_agent(
+    agent: Agent, agent_input, ctx: Dict[str, str], run_config: Optional[RunConfig], stage: Optional[str] = None
+):
+    """Run *agent* under its key's rate limit and its stage's deadline, retries and hedging.
+
+    *stage* overrides the ``AGENT_CALL_POLICY`` stage picked for the agent.
+
+    In replay mode the recorded run is returned instead (``replay``); in
+    record mode the finished run is recorded.
+    """
+    replayed = replay.store.lookup(agent.name, agent_input, ctx)
+    if replayed is not None:
+        await replayed.finished()
+        _record_call(agent.name, replay.MODEL, replayed, ctx, replayed.seconds)
+        return replayed
+    admission = _Admission(agent, agent_input, run_config)
+    await admission.wait()
+
+    async def _attempt():
+        await admission.request()
+        started = time.perf_counter()
+        with _observe_agent(agent, run_config) as model:
             try:
-                data = json.loads(cleaned)
-            except Exception:
-                try:
-                    import ast
-
-                    data = ast.literal_eval(cleaned)
-                except Exception:
-                    data = None
+                result = await Runner.run(agent, agent_input, context=ctx, run_config=run_config)
+            except BaseException as exc:  # also a timed-out or losing hedge try (cancelled)
+                if isinstance(exc, Exception):
+                    admission.failed(exc)
+                _book_discarded(agent.name, model, ctx, admission, exc)
+                raise
+        admission.done(result)
+        _record_call(agent.name, model, result, ctx, time.perf_counter() - started)
+        return result
+
+    started = time.perf_counter()
+    result = await resilience.call(stage or _stage(agent), _attempt)
+    replay.store.record(agent.name, agent_input, ctx, result, time.perf_counter() - started)
+    return result
+
+
+def _book_discarded(
+    agent_name: str, model: str, ctx: Dict[str, str], admission: _Admission, exc: BaseException
+) -> None:
+    """Book a try whose result is discarded in the usage ledger; it is billed all the same.
+
+    A hedge that lost the race is a ``hedge_loser``; a timed-out or
+    transiently failed try is a ``retry``. Rejected requests (429, 5xx) book
+    no tokens; otherwise the estimated prompt is booked, since the usage of an
+    unfinished request is never reported. Other errors (e.g. a triggered
+    guardrail) end the call and are not booked.
+    """
+    attempt = resilience.current_attempt.get()
+    if attempt is not None and attempt.lost:
+        kind = "hedge_loser"
+    elif isinstance(exc, asyncio.CancelledError) or resilience.retry_reason(exc):
+        kind = "retry"
+    else:
+        return
+    billed = 0 if isinstance(exc, openai.APIStatusError) else admission.input_tokens
+    ledger.record_usage(
+        ctx.get("session_id", ""), ctx.get("scenario_id", ""), agent_name, model, (1, billed, 0, 0), 0.0, kind
+    )
+
+
+def _record_call(agent_name: str, model: str, result, ctx: Dict[str, str], seconds: float) -> None:
+    """Book a finished agent run in the metrics and the usage ledger."""
+    responses, input_tokens, _, cached = usage_of(result)
+    # One raw response per model call, including those of handoff targets
+    MODEL_RESPONSES.inc(responses, agent=agent_name, model=model)
+    # Input tokens served from the upstream prompt cache (the hit rate)
+    if input_tokens:
+        MODEL_INPUT_TOKENS.inc(input_tokens, agent=agent_name, model=model)
+        MODEL_CACHED_INPUT_TOKENS.inc(cached, agent=agent_name, model=model)
+    ledger.record(ctx.get("session_id", ""), ctx.get("scenario_id", ""), agent_name, model, result, seconds)
+
+
+def _is_initial_turn() -> bool:
+    return st.session_state.get("turns", 0) == 0 and len(st.session_state.get("history", [])) == 0
+
+
+async def _gen_customer(
+    scene_text: str, ctx: Dict[str, str], run_config: Optional[RunConfig] = None
+) -> Optional[List[ScenarioMessage]]:
+    prompt = (
+        "Scenen som er satt:\n" + (scene_text or "Sit Kafe, en kunde er misfornøyd.") +
+        "\n\nSkriv den første kundereplikken som matcher scenen."
+    )
+    res = await _run_agent(customer_agent, prompt, ctx, run_config)
+    out_val = res.final_output
+    # Parse with the shared coercer and extract messages
+    try:
+        parsed = coerce_scenario_output(out_val, initial=False)
+        msgs = parsed.meldinger or []
+    except Exception:
+        msgs = []
+    # If coercion fails, wrap the text as a customer line
+    if not msgs:
+        if isinstance(out_val, str) and out_val.strip():
+            return [
+                ScenarioMessage(
+                    name="Kunde", role="customer", content=str(out_val).strip()
+                )
+            ]
+    return msgs
+
+
+async def _monitor(
+    out: ScenarioOutput, ctx: Dict[str, str], run_config: Optional[RunConfig] = None
+) -> EndDecision:
+    summary = {
+        "meldinger": [m.model_dump() for m in out.meldinger] if out.meldinger else [],
+        "scenarioresultat": (out.scenarioresultat.model_dump() if out.scenarioresultat else None),
+        "tilbakemelding": (out.tilbakemelding.model_dump() if out.tilbakemelding else None),
+    }
+    monitor_input = json.dumps(summary, ensure_ascii=False)
+    res = await _run_agent(end_monitor_agent, monitor_input, ctx, run_config)
+    out_val = res.final_output
+    if isinstance(out_val, EndDecision):
+        return out_val
+    if isinstance(out_val, dict):
+        try:
+            return EndDecision(**out_val)
+        except Exception:
+            return EndDecision(should_end=False)
+    if isinstance(out_val, str):
+        try:
+            data = json.loads(out_val)
             if isinstance(data, dict):
-                # Either a full ScenarioOutput or a single message object
-                if {"name", "role", "content"} <= set(data.keys()):
-                    msg = ScenarioMessage(**data)
-                    return ScenarioOutput(
-                        oppdrag=None,
-                        sjekkliste=[],
-                        meldinger=[msg],
-                        scenarioresultat=None,
-                        tilbakemelding=None,
-                    )
-                return ScenarioOutput(**data)
-            if isinstance(data, list):
-                try:
-                    msgs = [ScenarioMessage(**m) for m in data if isinstance(m, dict)]
-                    return ScenarioOutput(
-                        oppdrag=None,
-                        sjekkliste=[],
-                        meldinger=msgs,
-                        scenarioresultat=None,
-                        tilbakemelding=None,
-                    )
-                except Exception:
-                    pass
-
-        # Fallback: wrap plain text into a minimal structured object
-        is_initial_local = (
-            st.session_state.get("turns", 0) == 0
-            and len(st.session_state.get("history", [])) == 0
-        )
-        msg_role = "system" if is_initial_local else "customer"
-        msg_name = "Scene" if is_initial_local else "Kunde"
-        content = str(val)
-        return ScenarioOutput(
-            oppdrag=None,
-            sjekkliste=[],
-            meldinger=[
-                ScenarioMessage(name=msg_name, role=msg_role, content=content)
-            ],
-            scenarioresultat=None,
-            tilbakemelding=None,
-        )
+                return EndDecision(**data)
+        except Exception:
+            pass
+    return EndDecision(should_end=False)
+
+
+async def _bootstrap_messages(
+    out: ScenarioOutput, ctx: Dict[str, str], run_config: Optional[RunConfig] = None
+) -> List[ScenarioMessage]:
+    """Return the opening Scene + Kunde pair for the first turn."""
+    messages = list(out.meldinger or [])
+    # On the very first turn we expect two messages: Scene (system) then a customer.
+    # Some models may occasionally only return the scene. If so, synthesize the
+    # first customer reply using the dedicated customer_agent to keep UX consistent.
+    try:
+        has_customer = any(getattr(m, "role", "") == "customer" for m in messages)
+        if not has_customer:
+            BOOTSTRAP_FALLBACKS.inc()
+            scene_text = ""
+            for m in messages:
+                if getattr(m, "role", "") == "system" or str(getattr(m, "name", "")).strip().lower() in {"scene", "forteller"}:
+                    scene_text = m.content or ""
+                    break
+
+            new_msgs = await _gen_customer(scene_text, ctx, run_config)
+            if new_msgs:
+                messages.extend(new_msgs)
     except Exception:
-        # Final fallback: empty conversation step
-        return ScenarioOutput(
-            oppdrag=None,
-            sjekkliste=[],
-            meldinger=[],
-            scenarioresultat=None,
-            tilbakemelding=None,
-        )
+        # Graceful fallback: ensure at least a basic customer line exists
+        if not any(getattr(m, "role", "") == "customer" for m in messages):
+            messages.append(
+                ScenarioMessage(
+                    name="Kunde",
+                    role="customer",
+                    content=(
+                        "Hei, dette er ikke greit. Jeg har ventet lenge og bestillingen min ble feil."
+                    ),
+                )
+            )
+    # Keep only the first two messages for the bootstrap (Scene + Kunde)
+    return messages[:2]
 
 
-def call_model(compiled_input: str, stream_placeholder: Optional[object] = None) -> List[Dict]:
-    # Non-streaming model call (streaming is handled in the UI via st.write_stream)
-    start_time = time.time()
-
-    def _ctx() -> Dict[str, str]:
-        return {
-            "difficulty": str(st.session_state.get("difficulty", "")),
-            "user_name": str(st.session_state.get("user_name", "")),
-            "turn_count": str(st.session_state.get("turns", 0)),
-            "max_turns": str(st.session_state.get("max_turns", 6)),
-        }
+async def generate_opening(
+    difficulty: str, run_config: Optional[RunConfig] = None, session_id: str = ""
+) -> List[Dict]:
+    """Produce a ready Scene + Kunde opening without touching session state.
 
-    async def _run():
-        result = await Runner.run(scenario_agent, compiled_input, context=_ctx())
-        return result.final_output
+    Used to pre-warm openings; the prompt is the same opening input the chat
+    page sends. The calls are booked under *session_id* in the usage ledger.
+    """
+    ctx = scenario_ctx(difficulty, session_id=session_id)
+    compiled = opening_prompt(difficulty, MAX_TURNS)
+    result = await _run_agent(director_agent(), compiled, ctx, run_config)
+    out = coerce_scenario_output(result.final_output, initial=True)
+    messages = await _bootstrap_messages(out, ctx, run_config)
+    return [{"name": m.name, "role": m.role, "content": m.content} for m in messages]
 
-    raw_out = run_async(_run())
-    # Robustly coerce the agent output into ScenarioOutput
-    out: ScenarioOutput = coerce_scenario_output(raw_out)
 
-    # No artificial delay; UI handles streaming presentation
+class TurnOutcome(NamedTuple):
+    """Cleaned messages and meta of one director turn, not yet in session state."""
+
+    messages: List[Dict]
+    meta: Dict
+    pending_end: Optional[Dict]
 
-    # Build cleaned messages and optional meta
-    cleaned: List[Dict] = []
-    is_initial = (st.session_state.get("turns", 0) == 0 and len(st.session_state.get("history", [])) == 0)
+
+async def _turn_outcome(
+    raw_out, ctx: Dict[str, str], is_initial: bool, run_config: Optional[RunConfig] = None
+) -> TurnOutcome:
+    """Turn the raw director output into cleaned messages and meta.
+
+    Touches no session state, so it can run inside a background job.
+    """
+    # Robustly coerce the agent output into ScenarioOutput
+    out: ScenarioOutput = coerce_scenario_output(raw_out, initial=is_initial)
 
     # Save meta except on initial turn (keeps first turn minimal)
+    meta: Dict = {}
     if not is_initial:
-        st.session_state.last_meta = {
+        meta = {
             "oppdrag": (out.oppdrag.beskrivelse if out.oppdrag else None),
             "sjekkliste": out.sjekkliste or [],
-            "scenarioresultat": (out.scenarioresultat.dict() if out.scenarioresultat else None),
-            "tilbakemelding": (out.tilbakemelding.dict() if out.tilbakemelding else None),
+            "scenarioresultat": (out.scenarioresultat.model_dump() if out.scenarioresultat else None),
+            "tilbakemelding": (out.tilbakemelding.model_dump() if out.tilbakemelding else None),
         }
-    else:
-        st.session_state.last_meta = {}
 
     messages = out.meldinger or []
-    # On the very first turn we expect two messages: Scene (system) then a customer.
-    # Some models may occasionally only return the scene. If so, synthesize the
-    # first customer reply using the dedicated customer_agent to keep UX consistent.
     if is_initial:
-        try:
-            has_customer = any(getattr(m, "role", "") == "customer" for m in messages)
-            if not has_customer:
-                scene_text = ""
-                for m in messages:
-                    if getattr(m, "role", "") == "system" or str(getattr(m, "name", "")).strip().lower() in {"scene", "forteller"}:
-                        scene_text = m.content or ""
-                        break
-
-                async def _gen_customer() -> Optional[List[ScenarioMessage]]:
-                    prompt = (
-                        "Scenen som er satt:\n" + (scene_text or "Sit Kafe, en kunde er misfornøyd.") +
-                        "\n\nSkriv den første kundereplikken som matcher scenen."
-                    )
-                    res = await Runner.run(customer_agent, prompt, context=_ctx())
-                    out_val = res.final_output
-                    # Parse with the shared coercer and extract messages
-                    try:
-                        parsed = coerce_scenario_output(out_val)
-                        msgs = parsed.meldinger or []
-                    except Exception:
-                        msgs = []
-                    # If coercion fails, wrap the text as a customer line
-                    if not msgs:
-                        if isinstance(out_val, str) and out_val.strip():
-                            return [
-                                ScenarioMessage(
-                                    name="Kunde", role="customer", content=str(out_val).strip()
-                                )
-                            ]
-                    return msgs
-
-                new_msgs = run_async(_gen_customer())
-                if new_msgs:
-                    messages.extend(new_msgs)
-        except Exception:
-            # Graceful fallback: ensure at least a basic customer line exists
-            if not any(getattr(m, "role", "") == "customer" for m in messages):
-                messages.append(
-                    ScenarioMessage(
-                        name="Kunde",
-                        role="customer",
-                        content=(
-                            "Hei, dette er ikke greit. Jeg har ventet lenge og bestillingen min ble feil."
-                        ),
-                    )
-                )
-        # Keep only the first two messages for the bootstrap (Scene + Kunde)
-        messages = messages[:2]
+        messages = await _bootstrap_messages(out, ctx, run_config)
 
-    for m in messages:
-        cleaned.append({"name": m.name, "role": m.role, "content": m.content})
+    # Build cleaned messages
+    cleaned = [{"name": m.name, "role": m.role, "content": m.content} for m in messages]
 
-    # If no explicit end produced and not initial, let monitor decide
+    # If no explicit end produced and not initial, let the monitor decide in
+    # the background so the reply can be shown without waiting for it.
     has_explicit_end = bool(out.scenarioresultat and out.tilbakemelding)
+    pending_end = None
     if (not is_initial) and (not has_explicit_end):
-        async def _monitor() -> EndDecision:
-            summary = {
-                "meldinger": [m.dict() for m in out.meldinger] if out.meldinger else [],
-                "scenarioresultat": (out.scenarioresultat.dict() if out.scenarioresultat else None),
-                "tilbakemelding": (out.tilbakemelding.dict() if out.tilbakemelding else None),
-            }
-            monitor_input = json.dumps(summary, ensure_ascii=False)
-            res = await Runner.run(end_monitor_agent, monitor_input, context=_ctx())
-            out_val = res.final_output
-            if isinstance(out_val, EndDecision):
-                return out_val
-            if isinstance(out_val, dict):
-                try:
-                    return EndDecision(**out_val)
-                except Exception:
-                    return EndDecision(should_end=False)
-            if isinstance(out_val, str):
-                try:
-                    data = json.loads(out_val)
-                    if isinstance(data, dict):
-                        return EndDecision(**data)
-                except Exception:
-                    pass
-            return EndDecision(should_end=False)
+        pending_end = {
+            "future": submit_async(_monitor(out, ctx, run_config)),
+            "oppdrag": (out.oppdrag.beskrivelse if out.oppdrag else None),
+            "sjekkliste": out.sjekkliste or [],
+        }
+    return TurnOutcome(cleaned, meta, pending_end)
+
+
+def apply_turn(outcome: TurnOutcome) -> List[Dict]:
+    """Store a turn's meta and pending end decision; return its messages."""
+    st.session_state.last_meta = outcome.meta
+    st.session_state.pending_end = outcome.pending_end
+    return outcome.messages
+
 
-        decision: EndDecision = run_async(_monitor())
-        if decision and decision.should_end:
-            st.session_state.last_meta = {
-                "oppdrag": (out.oppdrag.beskrivelse if out.oppdrag else None),
-                "sjekkliste": out.sjekkliste or [],
-                "scenarioresultat": {"name": "Scenarioresultat", "role": "system", "content": decision.result or ""},
-                "tilbakemelding": {"name": "Tilbakemelding", "role": "system", "content": decision.feedback or ""},
-            }
+def _finalize_turn(
+    raw_out, ctx: Dict[str, str], is_initial: bool, run_config: Optional[RunConfig] = None
+) -> List[Dict]:
+    """Turn the raw director output into cleaned messages and update meta."""
+    return apply_turn(run_async(_turn_outcome(raw_out, ctx, is_initial, run_config)))
 
-    return cleaned
+
+def resolve_end_decision(timeout: Optional[float] = 0) -> bool:
+    """Apply the background end-monitor decision once it has arrived.
+
+    Waits up to *timeout* seconds (``None`` waits indefinitely, ``0`` only
+    checks). When the decision says the scenario should end, ``last_meta`` is
+    updated with its result and feedback. Returns True in that case; False if
+    the scenario continues or the decision is still pending.
+    """
+    pending = st.session_state.get("pending_end")
+    if not pending:
+        return False
+    arrived, decision = collect_end_decision(pending, timeout)
+    if not arrived:
+        return False
+    st.session_state.pending_end = None
+    if decision and decision.should_end:
+        st.session_state.last_meta = decision_meta(pending, decision)
+        return True
+    return False
+
+
+def collect_end_decision(pending: Dict, timeout: Optional[float] = 0) -> Tuple[bool, Optional[EndDecision]]:
+    """``(arrived, decision)`` of a pending end monitor, waiting up to *timeout*.
+
+    A failed monitor counts as arrived with a decision to continue.
+    """
+    try:
+        decision: EndDecision = pending["future"].result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        return False, None
+    except Exception:
+        END_MONITOR_CALLS.inc(decision="error")
+        return True, EndDecision(should_end=False)
+    END_MONITOR_CALLS.inc(decision="end" if decision and decision.should_end else "continue")
+    return True, decision
+
+
+def decision_meta(pending: Dict, decision: EndDecision) -> Dict:
+    """``last_meta`` for a scenario the end monitor decided to end."""
+    return {
+        "oppdrag": pending.get("oppdrag"),
+        "sjekkliste": pending.get("sjekkliste") or [],
+        "scenarioresultat": {"name": "Scenarioresultat", "role": "system", "content": decision.result or ""},
+        "tilbakemelding": {"name": "Tilbakemelding", "role": "system", "content": decision.feedback or ""},
+    }
+
+
+async def run_agent(
+    agent: Agent,
+    agent_input,
+    ctx: Dict[str, str],
+    run_config: Optional[RunConfig] = None,
+    stage: Optional[str] = None,
+):
+    """Run any agent like the app's own: rate limit, resilience, metrics and ledger.
+
+    *stage* selects its ``AGENT_CALL_POLICY`` entry (default: the director's).
+    """
+    return await _run_agent(agent, agent_input, ctx, run_config, stage)
+
+
+async def director_turn(
+    compiled_input: str,
+    ctx: Dict[str, str],
+    is_initial: bool,
+    run_config: Optional[RunConfig] = None,
+    mode: Optional[str] = None,
+) -> TurnOutcome:
+    """One non-streamed director turn without session state (headless runs)."""
+    mode = mode or get_orchestration_mode()
+    with CALL_MODEL_SECONDS.time(mode="call", orchestration=mode):
+        result = await _run_agent(director_agent(mode), compiled_input, ctx, run_config)
+        return await _turn_outcome(result.final_output, ctx, is_initial, run_config)
+
+
+def call_model(compiled_input: str, stream_placeholder: Optional[object] = None) -> List[Dict]:
+    # Non-streaming model call; see ``stream_model`` for live token streaming
+    ctx = _session_ctx()
+    is_initial = _is_initial_turn()
+    run_config = _session_run_config()
+    mode = get_orchestration_mode()
+
+    async def _run():
+        result = await _run_agent(director_agent(mode), compiled_input, ctx, run_config)
+        return result.final_output
+
+    with CALL_MODEL_SECONDS.time(mode="call", orchestration=mode):
+        raw_out = run_async(_run())
+        return _finalize_turn(raw_out, ctx, is_initial, run_config)
+
+
+class _FinalOutput:
+    def __init__(self, value) -> None:
+        self.value = value
+
+
+def _is_text_delta(event) -> bool:
+    return event.type == "raw_response_event" and getattr(event.data, "type", "") == "response.output_text.delta"
+
+
+async def _stream_scenario(
+    compiled_input: str,
+    ctx: Dict[str, str],
+    is_initial: bool,
+    run_config: Optional[RunConfig] = None,
+    director: Optional[Agent] = None,
+) -> AsyncIterator[object]:
+    """Run the director with ``Runner.run_streamed`` and yield message deltas.
+
+    Text deltas of the (partial) structured output are fed through a
+    ``MessageStreamExtractor``; the final output is yielded last wrapped in
+    ``_FinalOutput``. The run is retried (``resilience.RetryingStream``) only
+    until its first text delta.
+    """
+    default = ("Scene", "system") if is_initial else ("Kunde", "customer")
+    extractor = MessageStreamExtractor(*default)
+    director = director or director_agent()
+    replayed = replay.store.lookup(director.name, compiled_input, ctx)
+    admission = _Admission(director, compiled_input, run_config)
+    if replayed is None:
+        await admission.wait()
+
+    model = effective_model(director, run_config)
+
+    def _abandoned(exc: BaseException) -> None:
+        _book_discarded(director.name, model, ctx, admission, exc)
+
+    async def _start():
+        if replayed is not None:
+            return replayed
+        await admission.request()
+        run = Runner.run_streamed(director, compiled_input, context=ctx, run_config=run_config)
+        return _AdmittedStream(run, admission, _abandoned)
+
+    runs = resilience.RetryingStream(_stage(director), _start, is_output=_is_text_delta)
+    started = time.perf_counter()
+    with _observe_agent(director, run_config) as model:
+        async for event in runs.events():
+            if event.type == "agent_updated_stream_event":
+                # A handoff starts a fresh output document from the new agent
+                for delta in extractor.close():
+                    yield delta
+                extractor = MessageStreamExtractor(*default)
+            elif _is_text_delta(event):
+                for delta in extractor.feed(event.data.delta):
+                    yield delta
+    for delta in extractor.close():
+        yield delta
+    seconds = time.perf_counter() - started
+    if replayed is not None:
+        _record_call(director.name, replay.MODEL, replayed, ctx, seconds)
+    else:
+        _record_call(director.name, model, runs.result, ctx, seconds)
+        replay.store.record(director.name, compiled_input, ctx, runs.result, seconds)
+    yield _FinalOutput(runs.result.final_output)
+
+
+class StreamedMessage:
+    """A message whose content arrives as an iterator of text chunks."""
+
+    def __init__(self, name: str, role: str, chunks: Iterator[str]) -> None:
+        self.name = name
+        self.role = role
+        self.chunks = chunks
+
+
+class ModelStream:
+    """Streaming counterpart of ``call_model``.
+
+    Iterating yields one ``StreamedMessage`` per message as soon as its
+    content starts arriving; each message's ``chunks`` must be consumed (or is
+    drained) before the next one is produced. When iteration ends the final
+    output has been coerced exactly like ``call_model`` does and the cleaned
+    messages are available as ``messages``. Messages added during
+    finalization (e.g. the bootstrap customer fallback) are yielded whole.
+    """
+
+    def __init__(self, compiled_input: str) -> None:
+        self.started = time.perf_counter()
+        self.ctx = _session_ctx()
+        self.is_initial = _is_initial_turn()
+        self.run_config = _session_run_config()
+        self.mode = get_orchestration_mode()
+        self.messages: List[Dict] = []
+        self._final: Optional[_FinalOutput] = None
+        self._events = iter_async(
+            _stream_scenario(
+                compiled_input, self.ctx, self.is_initial, self.run_config, director_agent(self.mode)
+            )
+        )
+
+    def _chunks(self) -> Iterator[str]:
+        for event in self._events:
+            if isinstance(event, _FinalOutput):
+                self._final = event
+                return
+            if event.kind == "delta":
+                yield event.text
+            elif event.kind == "end":
+                return
+
+    def __iter__(self) -> Iterator[StreamedMessage]:
+        streamed = 0
+        for event in self._events:
+            if isinstance(event, _FinalOutput):
+                self._final = event
+                break
+            if event.kind != "start":
+                continue
+            msg = StreamedMessage(event.name, event.role, self._chunks())
+            yield msg
+            for _ in msg.chunks:
+                pass
+            streamed += 1
+            if self._final is not None:
+                break
+        raw_out = self._final.value if self._final is not None else ""
+        self.messages = _finalize_turn(raw_out, self.ctx, self.is_initial, self.run_config)
+        CALL_MODEL_SECONDS.observe(time.perf_counter() - self.started, mode="stream", orchestration=self.mode)
+        for m in self.messages[streamed:]:
+            yield StreamedMessage(m["name"], m["role"], iter([m["content"]]))
+
+
+def stream_model(compiled_input: str) -> ModelStream:
+    """Start a streamed director run for *compiled_input*."""
+    return ModelStream(compiled_input)
+
+
+def submit_turn(compiled_input: str, stream: bool = STREAM_MODEL_OUTPUT, **trace_metadata: Any) -> Job:
+    """Queue a director turn as a background job (``jobs.turn_jobs``).
+
+    Session values are captured here on the script thread; the job itself
+    never touches session state. The job opens its own turn trace, tagged
+    with *trace_metadata*, so the agent runs and the end monitor land in it;
+    call it outside any trace (one ending on the script thread would be
+    written before the queued job starts). While it runs, ``job.progress()`` holds the
+    messages streamed so far (with *stream*) and, once the reply is complete,
+    the cleaned messages. The job finishes with the reply; the end monitor
+    keeps running, and its decision is applied from ``pending_end`` once it
+    arrives. Its result is a ``TurnOutcome`` for ``apply_turn``.
+    """
+    ctx = _session_ctx()
+    is_initial = _is_initial_turn()
+    run_config = _session_run_config()
+    mode = get_orchestration_mode()
+    director = director_agent(mode)
+    workflow = "Kriseøvelse åpning" if is_initial else "Kriseøvelse tur"
+
+    async def _work(job: Job) -> TurnOutcome:
+        with turn_trace(
+            workflow, ctx["scenario_id"], turn=ctx["turn_count"], orchestration=mode, **trace_metadata
+        ):
+            return await _traced_work(job)
+
+    async def _traced_work(job: Job) -> TurnOutcome:
+        rate_limit.owner.set(job)  # task-local: shows the job's place in the admission line
+        with CALL_MODEL_SECONDS.time(mode="stream" if stream else "call", orchestration=mode):
+            if stream:
+                raw_out = ""
+                async for event in _stream_scenario(compiled_input, ctx, is_initial, run_config, director):
+                    if isinstance(event, _FinalOutput):
+                        raw_out = event.value
+                    elif event.kind == "start":
+                        job.start_message(event.name, event.role)
+                    elif event.kind == "delta":
+                        job.add_text(event.text)
+            else:
+                result = await _run_agent(director, compiled_input, ctx, run_config)
+                raw_out = result.final_output
+            outcome = await _turn_outcome(raw_out, ctx, is_initial, run_config)
+        job.set_progress(outcome.messages)
+        return outcome
+
+    return turn_jobs.submit("opening" if is_initial else "turn", _work)
@@ -0,0 +1,114 @@
+import threading
+from collections import Counter, deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from async_utils import submit_async
+from client_pool import get_run_config, key_id
+from config import OPENING_POOL_SIZE
+from model_api import generate_opening
+
+DIFFICULTIES = ("Lett", "Medium", "Vanskelig")
+
+Opening = List[Dict]
+
+
+class OpeningPool:
+    """Bounded per-difficulty pools of ready Scene + Kunde openings.
+
+    Openings are generated in the background on the shared async loop and
+    kept separately per API key, so a session is only ever served openings
+    paid for with its own key. ``take`` never blocks: it pops a ready opening
+    (a hit) or returns None (a miss) and schedules a refill either way.
+    Hits, misses and failures are counted per key as well. *generate* gets
+    the API key, the difficulty and the session id the calls are booked
+    under.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, str, str], Awaitable[Opening]],
+        size: int = OPENING_POOL_SIZE,
+    ) -> None:
+        self._generate = generate
+        self.size = size
+        self._lock = threading.Lock()
+        self._ready: Dict[Tuple[str, str], deque] = {}
+        self._inflight: Dict[Tuple[str, str], int] = {}
+        # "hits", "misses" and "failures" per key id
+        self._counts: Dict[str, Counter] = {}
+
+    def warm(self, api_key: str, difficulties=DIFFICULTIES, session_id: str = "") -> None:
+        """Top up the pools for *api_key* in the background."""
+        if not api_key or self.size <= 0:
+            return
+        for difficulty in difficulties:
+            self._refill(api_key, difficulty, session_id)
+
+    def take(self, api_key: str, difficulty: str, session_id: str = "") -> Optional[Opening]:
+        if not api_key or self.size <= 0:
+            return None
+        slot = (key_id(api_key), difficulty)
+        with self._lock:
+            ready = self._ready.get(slot)
+            opening = ready.popleft() if ready else None
+            self._count(slot[0], "misses" if opening is None else "hits")
+        self._refill(api_key, difficulty, session_id)
+        return opening
+
+    def _count(self, kid: str, event: str) -> None:
+        # Caller holds the lock
+        self._counts.setdefault(kid, Counter())[event] += 1
+
+    def _refill(self, api_key: str, difficulty: str, session_id: str) -> None:
+        slot = (key_id(api_key), difficulty)
+        with self._lock:
+            ready = self._ready.setdefault(slot, deque())
+            missing = self.size - len(ready) - self._inflight.get(slot, 0)
+            if missing <= 0:
+                return
+            self._inflight[slot] = self._inflight.get(slot, 0) + missing
+        for _ in range(missing):
+            future = submit_async(self._generate(api_key, difficulty, session_id))
+            future.add_done_callback(lambda f, slot=slot: self._store(slot, f))
+
+    def _store(self, slot: Tuple[str, str], future) -> None:
+        try:
+            opening = future.result()
+        except Exception:
+            opening = None
+        with self._lock:
+            self._inflight[slot] = max(0, self._inflight.get(slot, 0) - 1)
+            if opening:
+                ready = self._ready.setdefault(slot, deque())
+                if len(ready) < self.size:
+                    ready.append(opening)
+            else:
+                self._count(slot[0], "failures")
+
+    def stats(self, api_key: Optional[str] = None) -> Dict[str, object]:
+        """Ready counts per difficulty and hit rate, for *api_key* or summed over all keys."""
+        kid = key_id(api_key) if api_key else None
+        with self._lock:
+            sizes = {d: 0 for d in DIFFICULTIES}
+            for (slot_kid, difficulty), ready in self._ready.items():
+                if kid is None or slot_kid == kid:
+                    sizes[difficulty] = sizes.get(difficulty, 0) + len(ready)
+            counts = Counter()
+            for count_kid, key_counts in self._counts.items():
+                if kid is None or count_kid == kid:
+                    counts.update(key_counts)
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            "ready": sizes,
+            "hits": counts["hits"],
+            "misses": counts["misses"],
+            "failures": counts["failures"],
+            "hit_rate": (counts["hits"] / lookups) if lookups else 0.0,
+        }
+
+
+async def _generate(api_key: str, difficulty: str, session_id: str) -> Opening:
+    return await generate_opening(difficulty, get_run_config(api_key), session_id)
+
+
+pool = OpeningPool(_generate)
@@ -0,0 +1,123 @@
+import ast
+import json
+from typing import Any, List, NamedTuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from schemas import ScenarioMessage, ScenarioOutput
+
+# Compiled once; validation runs in pydantic-core without building models
+# through intermediate dicts.
+_OUTPUT = TypeAdapter(ScenarioOutput)
+_MESSAGE = TypeAdapter(ScenarioMessage)
+_MESSAGES = TypeAdapter(List[ScenarioMessage])
+_JSON = json.JSONDecoder()
+_MESSAGE_KEYS = frozenset(("name", "role", "content"))
+
+
+class DecodeResult(NamedTuple):
+    """Decoded output plus the recovery path that produced it.
+
+    ``path`` is one of ``model``, ``dict``, ``json``, ``fenced``,
+    ``garbage`` (text around the JSON), ``python_literal`` (single quotes etc.),
+    ``single_message``, ``message_list``, ``plain_text``, ``invalid`` or
+    ``empty``. Everything except ``model``, ``dict`` and ``json`` is a
+    fallback.
+    """
+
+    output: ScenarioOutput
+    path: str
+
+    @property
+    def is_fallback(self) -> bool:
+        return self.path not in ("model", "dict", "json")
+
+
+def _wrap(messages: List[ScenarioMessage]) -> ScenarioOutput:
+    return ScenarioOutput(oppdrag=None, sjekkliste=[], meldinger=messages)
+
+
+def _strip_fence(text: str) -> str:
+    if text.startswith("```"):
+        newline = text.find("\n")
+        text = text[newline + 1 :] if newline != -1 else text.lstrip("`")
+    text = text.rstrip()
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip().strip("`").strip()
+
+
+def _from_data(data: Any, path: str) -> DecodeResult:
+    if isinstance(data, dict):
+        if _MESSAGE_KEYS <= data.keys() and "meldinger" not in data:
+            return DecodeResult(_wrap([_MESSAGE.validate_python(data)]), "single_message")
+        return DecodeResult(_OUTPUT.validate_python(data), path)
+    if isinstance(data, list):
+        messages = _MESSAGES.validate_python([m for m in data if isinstance(m, dict)])
+        return DecodeResult(_wrap(messages), "message_list")
+    raise ValueError("not a structured output")
+
+
+def _parse(text: str):
+    """Parse *text* as JSON, tolerating surrounding garbage and Python literals."""
+    start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+    if start == -1:
+        raise ValueError("no JSON object")
+    try:
+        data, end = _JSON.raw_decode(text, start)
+        return data, ("garbage" if (start or text[end:].strip()) else None)
+    except ValueError:
+        pass
+    end = max(text.rfind("}"), text.rfind("]"))
+    return ast.literal_eval(text[start : end + 1]), "python_literal"
+
+
+def decode_scenario_output(
+    val: Any, fallback_name: str = "Kunde", fallback_role: str = "customer"
+) -> DecodeResult:
+    """Decode an agent's final output into ``ScenarioOutput`` in one pass.
+
+    The common case (a clean JSON document) is parsed and validated directly
+    by pydantic-core. Only when that fails are code fences, leading or
+    trailing garbage and single-quoted Python literals tolerated. Text that is
+    not structured at all, or whose embedded JSON yields no messages, becomes
+    one message from *fallback_name* / *fallback_role*. Never raises.
+    """
+    if isinstance(val, ScenarioOutput):
+        return DecodeResult(val, "model")
+    try:
+        if isinstance(val, (dict, list)):
+            return _from_data(val, "dict")
+        if isinstance(val, str):
+            try:
+                return DecodeResult(_OUTPUT.validate_json(val), "json")
+            except ValidationError:
+                pass
+            cleaned = val.strip()
+            fenced = cleaned.startswith("`")
+            if fenced:
+                cleaned = _strip_fence(cleaned)
+            try:
+                data, recovery = _parse(cleaned)
+            except (ValueError, SyntaxError):
+                data, recovery = None, None
+            if data is not None:
+                path = recovery or ("fenced" if fenced else "json")
+                # JSON recovered from inside other text (or a bare list) only
+                # counts if it yields messages; otherwise it was prose that
+                # happens to contain brackets, e.g. "Jeg bestilte [2] kaffe"
+                embedded = recovery is not None or isinstance(data, list)
+                try:
+                    result = _from_data(data, path)
+                except ValidationError:
+                    result = None
+                if result is not None and (result.output.meldinger or not embedded):
+                    return result
+                if result is None and not embedded and isinstance(data, dict):
+                    return DecodeResult(_wrap([]), "invalid")
+        if val is None or (isinstance(val, str) and not val.strip()):
+            return DecodeResult(_wrap([]), "empty")
+        message = ScenarioMessage(name=fallback_name, role=fallback_role, content=str(val))
+        return DecodeResult(_wrap([message]), "plain_text")
+    except Exception:
+        return DecodeResult(_wrap([]), "invalid")
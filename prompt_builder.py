@@ -0,0 +1,128 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import PROMPT_TOKEN_BUDGET
+from context_window import RollingContext
+from transcript import messages_json
+
+try:  # Optional: exact BPE counts when tiktoken is installed
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # pragma: no cover - depends on the environment
+    _ENCODING = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of *text* locally.
+
+    Uses tiktoken when available; otherwise roughly four UTF-8 bytes per
+    token, which slightly over-counts Norwegian text rather than under-counting.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid] + "…") <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + "…"
+
+
+def opening_prompt(difficulty: str, max_turns: int) -> str:
+    """The director input for an opening.
+
+    It leaves out the trainee's name, so pre-warmed openings (``opening_pool``)
+    and openings generated for the session read the same.
+    """
+    return f"Runde: 0/{max_turns} | Vanskelighetsgrad: {difficulty}. Start scenen."
+
+
+def build_prompt(
+    user_text: str,
+    history: Sequence[Dict],
+    rolling: RollingContext,
+    *,
+    user_name: str,
+    difficulty: str,
+    turns: int,
+    max_turns: int,
+    budget: Optional[int] = PROMPT_TOKEN_BUDGET,
+) -> Tuple[str, int]:
+    """Assemble the director input within *budget* tokens.
+
+    The prompt is laid out for upstream prompt caching: what stays the same
+    for the session comes first (the scenario setup, the rolling summary,
+    which only changes when messages are folded, and the append-only history
+    JSON), and what changes every turn (round counter, the trainee's reply)
+    comes last, so each turn's prompt extends the previous one's prefix.
+
+    The scenario header is always kept. Recent history is kept verbatim as
+    far as the budget allows; when it does not fit, the oldest recent
+    messages are folded into the rolling summary, and as a last resort the
+    trainee's reply is truncated. Returns the prompt and its estimated
+    token count.
+    """
+    rolling.update(history)
+    if not history[rolling.summarized :]:
+        prompt = opening_prompt(difficulty, max_turns)
+        return prompt, estimate_tokens(prompt)
+
+    reply = user_text.strip() or "Start scenen."
+    setup = (
+        f"Bruker: {user_name} | Vanskelighetsgrad: {difficulty} | Antall runder totalt: {max_turns}. "
+        "Ikke inkluder brukerens melding i output; kun system og andre aktører.\n\n"
+    )
+    suffix = f"\n\nRunde: {turns}/{max_turns}. Brukerens siste svar: "
+
+    def _assemble(recent: List[Dict], reply_text: str) -> str:
+        summary = rolling.summary()
+        earlier = (
+            f"Sammendrag av tidligere historikk (eldre meldinger, i rekkefølge):\n{summary}\n\n"
+            if summary
+            else ""
+        )
+        return (
+            setup
+            + earlier
+            + "Historikk (JSON-liste av meldinger med name/role/content):\n"
+            + messages_json(recent)
+            + suffix
+            + reply_text
+        )
+
+    prompt = _assemble(list(history[rolling.summarized :]), reply)
+    tokens = estimate_tokens(prompt)
+    if budget is None or tokens <= budget:
+        _release_json(history, rolling.summarized)
+        return prompt, tokens
+
+    # Keep at least the latest message verbatim; fold older ones into the summary
+    while tokens > budget and len(history) - rolling.summarized > 1:
+        rolling.advance(history, rolling.summarized + 1)
+        prompt = _assemble(list(history[rolling.summarized :]), reply)
+        tokens = estimate_tokens(prompt)
+    if tokens > budget:
+        room = estimate_tokens(reply) - (tokens - budget)
+        prompt = _assemble(list(history[rolling.summarized :]), _truncate_to_tokens(reply, room))
+        tokens = estimate_tokens(prompt)
+    _release_json(history, rolling.summarized)
+    return prompt, tokens
+
+
+def _release_json(history: Sequence[Dict], summarized: int) -> None:
+    # Summarized messages never appear verbatim again; free their cached JSON
+    release = getattr(history, "release_json", None)
+    if release is not None:
+        release(summarized)
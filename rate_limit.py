@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Optional
+
+from config import RATE_LIMIT_COOLDOWN_SEC, RATE_LIMIT_RPM, RATE_LIMIT_TPM
+from metrics import RATE_LIMIT_THROTTLES, RATE_LIMIT_WAIT_SECONDS, RATE_LIMIT_WAITING
+
+# Who is waiting for admission (e.g. the turn job); shown as queue position
+owner: ContextVar[Any] = ContextVar("rate_limit_owner", default=None)
+
+
+class TokenBucket:
+    """Budget of *per_minute* units, refilled continuously.
+
+    The level may go negative when a call used more than was reserved; later
+    callers then wait until the debt has been refilled.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until *amount* is available (0 if it is now)."""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    def drain(self) -> None:
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "owner", "turn")
+
+    def __init__(self, tokens: int, owner: Any) -> None:
+        self.tokens = tokens
+        self.owner = owner
+        self.turn = asyncio.Event()
+
+
+class RateLimiter:
+    """Fair FIFO admission of model requests under per-minute budgets.
+
+    Each request reserves one request and its estimated tokens; ``settle``
+    corrects the reservation once the real usage is known. Callers are
+    admitted strictly in arrival order, so one large request at the head
+    holds back smaller ones behind it rather than starving. A 429 from
+    upstream (``throttle``) empties both buckets and pauses admission.
+    Budgets of ``None`` are not enforced.
+    """
+
+    def __init__(
+        self,
+        requests_per_min: Optional[float] = RATE_LIMIT_RPM,
+        tokens_per_min: Optional[float] = RATE_LIMIT_TPM,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.requests = TokenBucket(requests_per_min, clock) if requests_per_min else None
+        self.tokens = TokenBucket(tokens_per_min, clock) if tokens_per_min else None
+        self._clock = clock
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._queue: Deque[_Waiter] = deque()
+
+    def _delay(self, tokens: int) -> float:
+        delay = self._paused_until - self._clock()
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait_time(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.wait_time(tokens))
+        return delay
+
+    async def acquire(self, tokens: int, who: Any = None) -> None:
+        """Wait in line until one request of about *tokens* fits the budgets."""
+        waiter = _Waiter(max(0, int(tokens)), who if who is not None else owner.get())
+        started = time.monotonic()
+        with self._lock:
+            self._queue.append(waiter)
+            if self._queue[0] is waiter:
+                waiter.turn.set()
+        RATE_LIMIT_WAITING.inc()
+        try:
+            await waiter.turn.wait()
+            while True:
+                with self._lock:
+                    delay = self._delay(waiter.tokens)
+                    if delay <= 0:
+                        if self.requests is not None:
+                            self.requests.take(1)
+                        if self.tokens is not None:
+                            self.tokens.take(waiter.tokens)
+                        break
+                # Re-check after the wait: a 429 meanwhile extends the pause
+                await asyncio.sleep(delay)
+        finally:
+            with self._lock:
+                was_head = self._queue[0] is waiter
+                self._queue.remove(waiter)
+                if was_head and self._queue:
+                    self._queue[0].turn.set()
+            RATE_LIMIT_WAITING.dec()
+            RATE_LIMIT_WAIT_SECONDS.observe(time.monotonic() - started)
+
+    def settle(self, reserved: int, requests: int, tokens: Optional[int]) -> None:
+        """Charge the real usage of an admitted call reserved at *reserved* tokens."""
+        with self._lock:
+            if self.requests is not None and requests > 1:
+                self.requests.take(requests - 1)
+            if self.tokens is not None and tokens:
+                self.tokens.take(tokens - reserved)
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        """Upstream said 429: drain the buckets and pause for *retry_after*."""
+        pause = retry_after if retry_after and retry_after > 0 else RATE_LIMIT_COOLDOWN_SEC
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + pause)
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.drain()
+        RATE_LIMIT_THROTTLES.inc()
+
+    def position(self, who: Any) -> int:
+        """1-based place of *who* in the admission line, or 0 if not waiting."""
+        with self._lock:
+            for index, waiter in enumerate(self._queue, start=1):
+                if waiter.owner is who:
+                    return index
+        return 0
+
+    def waiting(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+
+_lock = threading.Lock()
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def limiter_for(run_config: Any) -> RateLimiter:
+    """The process-wide limiter for the API key behind *run_config*.
+
+    Keys are told apart by the ``key_id`` that ``client_pool`` puts in the
+    run config's trace metadata; calls without one share a single limiter.
+    """
+    metadata = getattr(run_config, "trace_metadata", None) or {}
+    kid = str(metadata.get("key_id", ""))
+    with _lock:
+        limiter = _limiters.get(kid)
+        if limiter is None:
+            limiter = _limiters[kid] = RateLimiter()
+        return limiter
+
+
+def position(who: Any) -> int:
+    """*who*'s place in whichever admission line it is waiting in (0 if none)."""
+    with _lock:
+        limiters = list(_limiters.values())
+    for limiter in limiters:
+        place = limiter.position(who)
+        if place:
+            return place
+    return 0
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a 429 response's ``retry-after(-ms)`` header, if present."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
@@ -0,0 +1,182 @@
+"""Record and replay agent runs, for fast, deterministic, network-free runs.
+
+With ``REPLAY_MODE = "record"`` every agent run that goes through
+``model_api`` (director, persona, customer and end-monitor agents, streamed
+or not) appends its final output, usage and latency to ``REPLAY_PATH``. With
+``"replay"`` the same calls are answered from that file without touching
+the API: instantly, or with the recorded latency when
+``REPLAY_ORIGINAL_TIMING`` is set; a call without a recording fails with
+``ReplayMiss``. The environment variables ``AGENT_REPLAY`` (mode),
+``AGENT_REPLAY_PATH`` and ``AGENT_REPLAY_TIMING=original`` override the
+config, e.g. ``AGENT_REPLAY=replay streamlit run app.py``.
+
+Calls are keyed on a hash of the agent name, the input with whitespace
+normalized and the agent context without its per-session ids, so a replayed
+session has to send the same inputs as the recorded one (same name,
+difficulty and replies). A key recorded several times is replayed in
+recorded order, repeating the last recording once they are used up.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from config import REPLAY_MODE, REPLAY_ORIGINAL_TIMING, REPLAY_PATH
+from resilience import AgentCallFailed
+from usage_ledger import usage_of
+
+MODES = ("record", "replay")
+# Model label of replayed runs in the metrics and the usage ledger
+MODEL = "replay"
+# Ledger-only context keys; they differ between sessions with the same input
+_UNKEYED_CTX = ("session_id", "scenario_id")
+# Characters per text delta of a replayed stream
+_CHUNK_CHARS = 24
+
+
+class ReplayMiss(AgentCallFailed):
+    """Replay mode found no recording for an agent call."""
+
+
+def call_key(agent_name: str, agent_input: Any, ctx: Optional[Dict[str, str]]) -> str:
+    """Hash of the agent, the whitespace-normalized input and the keyed context."""
+    text = agent_input if isinstance(agent_input, str) else json.dumps(agent_input, ensure_ascii=False, default=str)
+    keyed = {k: v for k, v in sorted((ctx or {}).items()) if k not in _UNKEYED_CTX}
+    payload = json.dumps([agent_name, " ".join(text.split()), keyed], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    return value
+
+
+class ReplayedRun:
+    """A recorded run standing in for the SDK's run result.
+
+    Has what ``model_api`` reads from a result: ``final_output``, the usage
+    (``raw_responses``, ``context_wrapper.usage``) and, for streamed runs,
+    ``stream_events()``, which replays the output JSON as text deltas, and
+    ``cancel()``.
+    """
+
+    def __init__(self, entry: Dict[str, Any], timed: bool) -> None:
+        self.final_output = entry["output"]
+        self.seconds = float(entry.get("seconds", 0.0)) if timed else 0.0
+        usage = entry.get("usage") or {}
+        self.raw_responses = [None] * int(usage.get("responses", 1))
+        self.context_wrapper = SimpleNamespace(
+            usage=SimpleNamespace(
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+                input_tokens_details=SimpleNamespace(cached_tokens=usage.get("cached_tokens", 0)),
+            )
+        )
+
+    async def finished(self) -> "ReplayedRun":
+        if self.seconds:
+            await asyncio.sleep(self.seconds)
+        return self
+
+    async def stream_events(self) -> AsyncIterator[Any]:
+        output = self.final_output
+        text = output if isinstance(output, str) else json.dumps(output, ensure_ascii=False)
+        chunks = [text[i : i + _CHUNK_CHARS] for i in range(0, len(text), _CHUNK_CHARS)] or [""]
+        pause = self.seconds / len(chunks)
+        for chunk in chunks:
+            if pause:
+                await asyncio.sleep(pause)
+            yield SimpleNamespace(
+                type="raw_response_event", data=SimpleNamespace(type="response.output_text.delta", delta=chunk)
+            )
+
+    def cancel(self) -> None:
+        """Nothing to stop; here for ``resilience.RetryingStream``."""
+
+
+class ReplayStore:
+    """Recorded agent runs in a JSONL file (one run per line)."""
+
+    def __init__(self, path: str = REPLAY_PATH, mode: Optional[str] = REPLAY_MODE, timed: bool = REPLAY_ORIGINAL_TIMING):
+        if mode not in (None, *MODES):
+            raise ValueError(f"unknown replay mode: {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.timed = timed
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._served: Dict[str, int] = defaultdict(int)
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._entries is None:
+            entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as fh:
+                    for line in fh:
+                        if line.strip():
+                            entry = json.loads(line)
+                            entries[entry["key"]].append(entry)
+            self._entries = entries
+        return self._entries
+
+    def lookup(self, agent_name: str, agent_input: Any, ctx: Optional[Dict[str, str]]) -> Optional[ReplayedRun]:
+        """The recorded run for this call in replay mode, else None.
+
+        Raises ``ReplayMiss`` in replay mode when there is no recording.
+        """
+        if self.mode != "replay":
+            return None
+        key = call_key(agent_name, agent_input, ctx)
+        with self._lock:
+            recorded = self._load().get(key)
+            if not recorded:
+                raise ReplayMiss(agent_name, f"no recording for this input in {self.path} (key {key[:12]})")
+            served = self._served[key]
+            self._served[key] = served + 1
+        return ReplayedRun(recorded[min(served, len(recorded) - 1)], self.timed)
+
+    def record(
+        self, agent_name: str, agent_input: Any, ctx: Optional[Dict[str, str]], result: Any, seconds: float
+    ) -> None:
+        """Append a finished live run (record mode only)."""
+        if self.mode != "record":
+            return
+        responses, input_tokens, output_tokens, cached = usage_of(result)
+        entry = {
+            "key": call_key(agent_name, agent_input, ctx),
+            "agent": agent_name,
+            "output": _jsonable(result.final_output),
+            "seconds": round(seconds, 4),
+            "usage": {
+                "responses": responses,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cached_tokens": cached,
+            },
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+            if self._entries is not None:
+                self._entries[entry["key"]].append(entry)
+
+
+store = ReplayStore(
+    os.getenv("AGENT_REPLAY_PATH") or REPLAY_PATH,
+    os.getenv("AGENT_REPLAY") or REPLAY_MODE,
+    os.getenv("AGENT_REPLAY_TIMING", "original" if REPLAY_ORIGINAL_TIMING else "instant") == "original",
+)
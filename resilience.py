@@ -0,0 +1,264 @@
+import asyncio
+import contextvars
+import inspect
+import random
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, NamedTuple, Optional, TypeVar
+
+import openai
+
+from config import AGENT_CALL_POLICY, HEDGE_MIN_SAMPLES, HEDGE_QUANTILE, RETRY_BACKOFF_SEC
+from metrics import AGENT_CALL_FAILURES, AGENT_HEDGES, AGENT_RETRIES
+
+T = TypeVar("T")
+
+
+class CallPolicy(NamedTuple):
+    deadline: float
+    attempt_timeout: float
+    attempts: int
+    hedge: bool
+
+
+class AgentCallFailed(RuntimeError):
+    """An agent call failed on every attempt (cause chained as ``__cause__``)."""
+
+    def __init__(self, stage: str, message: str) -> None:
+        super().__init__(f"{stage}: {message}")
+        self.stage = stage
+
+
+class DeadlineExceeded(AgentCallFailed, TimeoutError):
+    """The stage ran out of time before any attempt succeeded."""
+
+
+def policy(stage: str) -> CallPolicy:
+    """Configured policy for *stage* (unknown stages use the director's)."""
+    values = AGENT_CALL_POLICY.get(stage) or AGENT_CALL_POLICY["director"]
+    return CallPolicy(
+        deadline=float(values["deadline"]),
+        attempt_timeout=float(values.get("attempt_timeout") or values["deadline"]),
+        attempts=max(1, int(values.get("attempts", 1))),
+        hedge=bool(values.get("hedge", False)),
+    )
+
+
+def retry_reason(exc: BaseException) -> Optional[str]:
+    """Short reason if *exc* is transient and worth retrying, else ``None``."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(exc, openai.APIConnectionError):
+        return "connection"
+    if isinstance(exc, openai.RateLimitError):
+        return "rate_limit"
+    if isinstance(exc, openai.APIStatusError) and (exc.status_code >= 500 or exc.status_code in (408, 409)):
+        return f"http_{exc.status_code}"
+    return None
+
+
+def backoff(attempt: int, base: float = RETRY_BACKOFF_SEC) -> float:
+    """Full-jitter exponential backoff before retry number *attempt* + 1."""
+    return random.uniform(0, base * (2**attempt))
+
+
+class Deadline:
+    """Time budget for one stage on the running event loop."""
+
+    def __init__(self, seconds: float) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.seconds = seconds
+        self.at = self._loop.time() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - self._loop.time())
+
+    def attempt_timeout(self, call_policy: CallPolicy) -> float:
+        return min(call_policy.attempt_timeout, self.remaining())
+
+
+class LatencyWindow:
+    """Recent successful call durations per stage, for hedge delays."""
+
+    def __init__(self, size: int = 200, min_samples: int = HEDGE_MIN_SAMPLES) -> None:
+        self.size = size
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.size)).append(seconds)
+
+    def quantile(self, stage: str, q: float = HEDGE_QUANTILE) -> Optional[float]:
+        """The *q* quantile, or ``None`` until ``min_samples`` are recorded."""
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if len(samples) < max(1, self.min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+latencies = LatencyWindow()
+
+
+class Attempt:
+    """One try of a call, visible to the factory as ``current_attempt``.
+
+    ``lost`` is set before a try is cancelled because its hedge twin won, so
+    the factory can book the discarded (but billed) request as a hedge loser
+    rather than a retry.
+    """
+
+    __slots__ = ("hedge", "lost")
+
+    def __init__(self, hedge: bool = False) -> None:
+        self.hedge = hedge
+        self.lost = False
+
+
+current_attempt: "contextvars.ContextVar[Optional[Attempt]]" = contextvars.ContextVar("current_attempt", default=None)
+
+
+async def _timed(stage: str, factory: Callable[[], Awaitable[T]], attempt: Optional[Attempt] = None) -> T:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    token = current_attempt.set(attempt or Attempt())
+    try:
+        result = await factory()
+    finally:
+        current_attempt.reset(token)
+    latencies.observe(stage, loop.time() - started)
+    return result
+
+
+async def _hedged(stage: str, factory: Callable[[], Awaitable[T]], delay: float) -> T:
+    """Run *factory*; after *delay* also start a duplicate and take the winner."""
+    attempts = [Attempt(), Attempt(hedge=True)]
+    primary = asyncio.ensure_future(_timed(stage, factory, attempts[0]))
+    tasks = [primary]
+    won = False
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return primary.result()
+        tasks.append(asyncio.ensure_future(_timed(stage, factory, attempts[1])))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    won = True
+                    AGENT_HEDGES.inc(stage=stage, winner="primary" if task is primary else "hedge")
+                    return task.result()
+        AGENT_HEDGES.inc(stage=stage, winner="none")
+        raise primary.exception()
+    finally:
+        for task, attempt in zip(tasks, attempts):
+            if not task.done():
+                attempt.lost = won
+                task.cancel()
+
+
+async def call(stage: str, factory: Callable[[], Awaitable[T]], call_policy: Optional[CallPolicy] = None) -> T:
+    """Await ``factory()`` under the stage's deadline, retries and hedging.
+
+    *factory* must start a fresh request on every call. Transient failures
+    (timeouts, connection errors, 429 and 5xx) are retried with jittered
+    backoff while the deadline allows; other errors (e.g. a triggered
+    guardrail) propagate unchanged. Raises ``DeadlineExceeded`` when time runs
+    out and ``AgentCallFailed`` when the attempts are used up.
+    """
+    call_policy = call_policy or policy(stage)
+    deadline = Deadline(call_policy.deadline)
+    last_reason, last_exc = "timeout", None
+    for attempt in range(call_policy.attempts):
+        timeout = deadline.attempt_timeout(call_policy)
+        if timeout <= 0:
+            break
+        hedge_delay = latencies.quantile(stage) if call_policy.hedge else None
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                return await asyncio.wait_for(_hedged(stage, factory, hedge_delay), timeout)
+            return await asyncio.wait_for(_timed(stage, factory), timeout)
+        except Exception as exc:
+            reason = retry_reason(exc)
+            if reason is None:
+                raise
+            last_reason, last_exc = reason, exc
+        if attempt + 1 < call_policy.attempts and deadline.remaining() > 0:
+            AGENT_RETRIES.inc(stage=stage, reason=last_reason)
+            await asyncio.sleep(min(backoff(attempt), deadline.remaining()))
+    raise _failure(stage, call_policy, deadline, last_reason) from last_exc
+
+
+def _failure(stage: str, call_policy: CallPolicy, deadline: Deadline, reason: str) -> AgentCallFailed:
+    AGENT_CALL_FAILURES.inc(stage=stage, reason=reason)
+    if reason == "timeout" or deadline.remaining() <= 0:
+        return DeadlineExceeded(stage, f"no answer within {call_policy.deadline:.0f} s")
+    return AgentCallFailed(stage, f"failed after {call_policy.attempts} attempts ({reason})")
+
+
+class RetryingStream:
+    """Stream events from ``start()`` under the stage's deadline and retries.
+
+    *start* returns a streamed run (``stream_events()`` and ``cancel()``, like
+    ``Runner.run_streamed``), or an awaitable of one. A transient failure or timeout is retried with
+    a fresh run only while no event has passed *is_output*; once output has
+    been shown it is not repeated, so the error is raised instead. Only the
+    overall deadline applies after the first output. ``result`` is the run
+    that produced the events.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        start: Callable[[], Any],
+        is_output: Callable[[Any], bool],
+        call_policy: Optional[CallPolicy] = None,
+    ) -> None:
+        self.stage = stage
+        self.policy = call_policy or policy(stage)
+        self._start = start
+        self._is_output = is_output
+        self.result: Any = None
+
+    async def events(self) -> AsyncIterator[Any]:
+        loop = asyncio.get_running_loop()
+        deadline = Deadline(self.policy.deadline)
+        last_reason, last_exc = "timeout", None
+        for attempt in range(self.policy.attempts):
+            timeout = deadline.attempt_timeout(self.policy)
+            if timeout <= 0:
+                break
+            attempt_end = loop.time() + timeout
+            result = self._start()
+            produced = False
+            try:
+                if inspect.isawaitable(result):
+                    result = await asyncio.wait_for(result, max(0.0, attempt_end - loop.time()))
+                self.result = result
+                stream = result.stream_events().__aiter__()
+                while True:
+                    limit = deadline.remaining() if produced else max(0.0, attempt_end - loop.time())
+                    try:
+                        event = await asyncio.wait_for(stream.__anext__(), limit)
+                    except StopAsyncIteration:
+                        return
+                    produced = produced or self._is_output(event)
+                    yield event
+            except Exception as exc:
+                if not inspect.isawaitable(result):
+                    result.cancel()
+                reason = retry_reason(exc)
+                if reason is None:
+                    raise
+                if produced:
+                    raise _failure(self.stage, self.policy, deadline, reason) from exc
+                last_reason, last_exc = reason, exc
+            if attempt + 1 < self.policy.attempts and deadline.remaining() > 0:
+                AGENT_RETRIES.inc(stage=self.stage, reason=last_reason)
+                await asyncio.sleep(min(backoff(attempt), deadline.remaining()))
+        raise _failure(self.stage, self.policy, deadline, last_reason) from last_exc
@@ -0,0 +1,33 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class Oppdrag(BaseModel):
+    beskrivelse: Optional[str] = Field(default=None, description="Kort oppsummering (maks fire setninger)")
+
+
+class ScenarioMessage(BaseModel):
+    name: str
+    role: Literal["system", "customer", "employee", "student", "bystander"]
+    content: str
+
+
+class ScenarioResult(BaseModel):
+    name: Literal["Scenarioresultat"]
+    role: Literal["system"]
+    content: str
+
+
+class ScenarioFeedback(BaseModel):
+    name: Literal["Tilbakemelding"]
+    role: Literal["system"]
+    content: str
+
+
+class ScenarioOutput(BaseModel):
+    oppdrag: Optional[Oppdrag] = None
+    sjekkliste: Optional[List[str]] = None
+    meldinger: List[ScenarioMessage]
+    scenarioresultat: Optional[ScenarioResult] = None
+    tilbakemelding: Optional[ScenarioFeedback] = None
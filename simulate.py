@@ -0,0 +1,245 @@
+"""Headless batch runs of full scenarios with a simulated trainee.
+
+Plays many scenarios concurrently without Streamlit: the opening, then one
+trainee reply and director turn per round until the director or the end
+monitor ends the scenario or ``--max-turns`` is reached. Each scenario is an
+``engine.ScenarioSession``, as on the chat page, so prompts, end handling and
+every agent call (rate limit, resilience policy, metrics and usage ledger)
+are the app's own.
+
+The trainee is either scripted (canned replies, no model calls) or an LLM
+agent (``--trainee llm``). Each scenario is written as one JSON line with its
+transcript, per-turn timings, how it ended and its token usage; a summary
+per difficulty (throughput, latency percentiles, tokens) is printed at the
+end, so configurations can be compared run against run (``--label``). LLM
+trainee calls run under their own resilience stage and are booked under the
+scenario's session id with a ``:trainee`` suffix, apart from the app's calls.
+
+Uses ``OPENAI_API_KEY`` (or ``SERVER_OPENAI_API_KEY``). To soak-test offline,
+start ``python -m benchmarks.fake_openai_server`` and set
+``OPENAI_BASE_URL=http://127.0.0.1:8765/v1``. Traces go to the local trace
+log as in the app (``TRACE_LOG_PATH``) and are never exported.
+
+Example: ``python simulate.py --scenarios 100 --concurrency 20 --mode fast``
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agents import Agent
+
+import tracing_local
+
+from agent_models import agent_options, effective_model
+from async_utils import run_async
+from client_pool import get_run_config
+from config import MAX_TURNS
+from engine import ScenarioSession
+from model_api import ORCHESTRATION_MODES, director_agent, get_orchestration_mode, run_agent
+from transcript import Transcript
+from usage_ledger import ledger
+
+DIFFICULTIES = ("Lett", "Medium", "Vanskelig")
+
+SCRIPTED_REPLIES = [
+    "Beklager så mye! Jeg lager en ny til deg med en gang.",
+    "Jeg forstår at du er irritert. Kan du fortelle meg hva du bestilte?",
+    "Det skal ikke skje. Jeg sjekker kvitteringen din nå.",
+    "Du får pengene tilbake, eller en ny drikk – hva passer best for deg?",
+    "Jeg hører deg. Jeg henter en kollega som kan hjelpe oss med kassen.",
+    "Kan du vente to minutter mens jeg ordner dette? Den er på huset.",
+    "Ok.",
+    "Det er ikke min feil, det var travelt.",
+]
+
+trainee_agent = Agent(
+    name="Simulert ansatt",
+    instructions=(
+        "Du er en ansatt på Sit Kafe i en øvelse i konflikthåndtering. Svar kunden i 1–3 setninger på norsk "
+        "(Bokmål), som en vanlig ansatt ville gjort: noen ganger godt (lytter, beklager, tilbyr løsning), "
+        "noen ganger mindre godt. Skriv kun replikken, uten navn, anførselstegn eller metatekst."
+    ),
+    **agent_options("trainee"),
+)
+
+
+class ScriptedTrainee:
+    """Canned replies, mostly constructive, picked with a per-scenario seed."""
+
+    def __init__(self, seed: str) -> None:
+        self._rng = random.Random(seed)
+
+    async def reply(self, history: Transcript, ctx: Dict[str, str], run_config) -> str:
+        return self._rng.choice(SCRIPTED_REPLIES)
+
+
+class LlmTrainee:
+    """Replies written by ``trainee_agent`` from the recent transcript."""
+
+    async def reply(self, history: Transcript, ctx: Dict[str, str], run_config) -> str:
+        recent = "\n".join(f"{m.name} ({m.role}): {m.content}" for m in history[-8:])
+        # Booked apart from the scenario, whose usage covers the app's calls only
+        ctx = {**ctx, "session_id": trainee_session(ctx["session_id"])}
+        prompt = f"Samtalen så langt:\n{recent}\n\nDitt svar:"
+        result = await run_agent(trainee_agent, prompt, ctx, run_config, stage="trainee")
+        return str(result.final_output).strip() or SCRIPTED_REPLIES[0]
+
+
+def trainee_session(session_id: str) -> str:
+    """Usage ledger session for the LLM trainee's calls in *session_id*."""
+    return f"{session_id}:trainee"
+
+
+async def run_scenario(
+    difficulty: str, index: int, args: argparse.Namespace, run_config, label: str
+) -> Dict[str, Any]:
+    session = ScenarioSession(
+        "Ola",
+        difficulty,
+        args.max_turns,
+        run_config=run_config,
+        mode=args.mode,
+        session_id=f"sim-{difficulty.lower()}-{index}",
+        scenario_id=uuid.uuid4().hex[:12],
+    )
+    trainee = LlmTrainee() if args.trainee == "llm" else ScriptedTrainee(seed=f"{args.seed}-{difficulty}-{index}")
+    turns: List[Dict[str, Any]] = []
+    record: Dict[str, Any] = {
+        "label": label,
+        "scenario_id": session.scenario_id,
+        "session_id": session.session_id,
+        "difficulty": difficulty,
+        "trainee": args.trainee,
+        "mode": args.mode,
+        "ended_by": None,
+        "error": None,
+        "turns": turns,
+    }
+    started = time.perf_counter()
+    try:
+        reply = None
+        t0 = time.perf_counter()
+        result = await session.start()
+        while True:
+            turns.append(
+                {
+                    "turn": session.turns,
+                    "reply": reply,
+                    "prompt_tokens": result.prompt_tokens,
+                    "messages": result.messages,
+                    "seconds": round(result.seconds, 4),
+                    "end_decision_seconds": round(time.perf_counter() - t0 - result.seconds, 4),
+                }
+            )
+            if result.ended:
+                record["ended_by"] = result.ended_by
+                if result.ended_by == "monitor":
+                    record["result"] = session.last_meta["scenarioresultat"]["content"]
+                    record["feedback"] = session.last_meta["tilbakemelding"]["content"]
+                break
+            reply = await trainee.reply(session.history, session.ctx(), run_config)
+            t0 = time.perf_counter()
+            result = await session.step(reply)
+    except Exception as exc:  # record and keep the batch going
+        record["error"] = f"{type(exc).__name__}: {exc}"
+    record["seconds"] = round(time.perf_counter() - started, 4)
+    record["usage"] = ledger.scenario(session.session_id, session.scenario_id).as_dict()
+    if args.trainee == "llm":
+        record["trainee_usage"] = ledger.scenario(trainee_session(session.session_id), session.scenario_id).as_dict()
+    return record
+
+
+async def run_batch(args: argparse.Namespace, out_path: Path) -> List[Dict[str, Any]]:
+    api_key = os.getenv("OPENAI_API_KEY") or os.getenv("SERVER_OPENAI_API_KEY")
+    run_config = get_run_config(api_key)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    records: List[Dict[str, Any]] = []
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with out_path.open("w", encoding="utf-8") as out:
+
+        async def _one(difficulty: str, index: int) -> None:
+            async with semaphore:
+                record = await run_scenario(difficulty, index, args, run_config, args.label)
+            records.append(record)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        await asyncio.gather(*(_one(d, i) for d in args.difficulty for i in range(args.scenarios)))
+    return records
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(records: List[Dict[str, Any]], wall: float) -> None:
+    total_turns = sum(len(r["turns"]) for r in records)
+    print(
+        f"{len(records)} scenarios, {total_turns} director turns in {wall:.1f} s -> "
+        f"{len(records) / wall:.2f} scenarios/s, {total_turns / wall:.2f} turns/s"
+    )
+    print(f"{'difficulty':<10} {'n':>4} {'err':>4} {'turns':>6} {'open p50':>9} {'turn p50':>9} "
+          f"{'p95':>7} {'p99':>7} {'tok/scen':>9}  ended by")
+    for difficulty in sorted({r["difficulty"] for r in records}, key=DIFFICULTIES.index):
+        group = [r for r in records if r["difficulty"] == difficulty]
+        openings = [t["seconds"] for r in group for t in r["turns"] if t["turn"] == 0]
+        replies = [t["seconds"] for r in group for t in r["turns"] if t["turn"] > 0]
+        tokens = [r["usage"]["input_tokens"] + r["usage"]["output_tokens"] for r in group]
+        ended = Counter(r["ended_by"] or "error" for r in group)
+        print(
+            f"{difficulty:<10} {len(group):>4} {sum(1 for r in group if r['error']):>4} "
+            f"{statistics.mean(len(r['turns']) for r in group) - 1:>6.1f} "
+            f"{percentile(openings, 50):>8.2f}s {percentile(replies, 50):>8.2f}s "
+            f"{percentile(replies, 95):>6.2f}s {percentile(replies, 99):>6.2f}s "
+            f"{statistics.mean(tokens):>9.0f}  {dict(ended)}"
+        )
+    errors = Counter(r["error"] for r in records if r["error"])
+    for error, count in errors.most_common(3):
+        print(f"  {count}× {error}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=10, help="scenarios per difficulty")
+    parser.add_argument("--difficulty", nargs="+", choices=DIFFICULTIES, default=list(DIFFICULTIES))
+    parser.add_argument("--concurrency", type=int, default=10, help="scenarios running at once")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS, help="trainee turns before a forced end")
+    parser.add_argument("--trainee", choices=("scripted", "llm"), default="scripted")
+    parser.add_argument("--mode", choices=ORCHESTRATION_MODES, default=None, help="director orchestration mode")
+    parser.add_argument("--seed", type=int, default=1, help="seed for scripted replies")
+    parser.add_argument("--label", default="", help="configuration name stored with every record")
+    parser.add_argument("--out", type=Path, default=None, help="JSONL output (default logs/simulations/<time>.jsonl)")
+    args = parser.parse_args(argv)
+    if not args.label:
+        mode = args.mode or get_orchestration_mode()
+        args.label = f"{mode}:{effective_model(director_agent(mode))}"
+    out_path = args.out or Path("logs/simulations") / time.strftime("sim-%Y%m%d-%H%M%S.jsonl")
+
+    # Traces stay local, as in the app; with local tracing off, none are made
+    if tracing_local.install() is None:
+        os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+    started = time.perf_counter()
+    # The shared loop owns the pooled clients, as in the app
+    records = run_async(run_batch(args, out_path))
+    summarize(records, time.perf_counter() - started)
+    print(f"transcripts: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
+import uuid
 from typing import Any, Dict
 
 import streamlit as st
 
-from config import MAX_TURNS
+from config import CHAT_PAGE_SIZE, MAX_TURNS
+from transcript import Transcript
 
 
 def build_defaults() -> Dict[str, Any]:
@@ -12,15 +14,30 @@ def build_defaults() -> Dict[str, Any]:
     preserve navigation and user preference across reruns.
     """
     return {
-        "history": [],
+        "history": Transcript(),
+        "history_views": [],
         "ended": False,
         "started": False,
         "authenticated": False,
+        # Admin page login (ADMIN_PASSWORD); kept across resets
+        "admin_authenticated": st.session_state.get("admin_authenticated", False),
+        # (API key, difficulty) the opening pool was last warmed for; kept across resets
+        "warmed_for": st.session_state.get("warmed_for"),
         "user_name": "",
         "api_key": st.session_state.get("api_key", ""),
         "turns": 0,
         "awaiting_user": False,
         "last_meta": {},
+        "pending_end": None,
+        "rolling_context": None,
+        "prompt_tokens": [],
+        "chat_window": CHAT_PAGE_SIZE,
+        "chat_static_len": 0,
+        "turn_error": "",
+        "turn_job": None,
+        "scenario_id": "",
+        # Stable per browser session (kept across resets); used for metrics
+        "session_id": st.session_state.get("session_id") or uuid.uuid4().hex[:12],
         "page": st.session_state.get("page", "start"),
         "difficulty": st.session_state.get("difficulty", "Medium"),
         "max_turns": st.session_state.get("max_turns", MAX_TURNS),
@@ -51,10 +68,20 @@ def reset_to_start(defaults: Dict[str, Any] | None = None) -> None:
 
 def restart_chat() -> None:
     """Start a fresh run while preserving user settings like name/difficulty."""
-    st.session_state.history = []
+    st.session_state.history = Transcript()
+    st.session_state.history_views = []
     st.session_state.ended = False
     st.session_state.turns = 0
     st.session_state.last_meta = {}
+    st.session_state.pending_end = None
+    st.session_state.rolling_context = None
+    st.session_state.prompt_tokens = []
+    st.session_state.chat_window = CHAT_PAGE_SIZE
+    st.session_state.chat_static_len = 0
+    st.session_state.turn_error = ""
+    st.session_state.turn_job = None
+    # Groups this run's turn traces together
+    st.session_state.scenario_id = uuid.uuid4().hex[:12]
     st.session_state.started = True
     st.session_state.awaiting_user = True
     st.session_state.page = "chat"
@@ -0,0 +1,222 @@
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# Keys of a single message object inside the structured output
+_MESSAGE_FIELDS = ("name", "role", "content")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", '"': '"', "\\": "\\", "/": "/"}
+
+
+class MessageDelta(NamedTuple):
+    """One incremental event for a message being streamed.
+
+    ``kind`` is ``"start"`` when the message content begins, ``"delta"`` for
+    each new piece of content and ``"end"`` when the content string closes.
+    """
+
+    kind: str
+    index: int
+    name: str = ""
+    role: str = ""
+    text: str = ""
+
+
+class MessageStreamExtractor:
+    """Pull ``meldinger[i].content`` out of partial structured output.
+
+    The model emits the ``ScenarioOutput`` JSON token by token. This parser
+    keeps just enough state (container stack, current key, string buffer) to
+    follow the document incrementally, so each ``feed`` is O(len(chunk)).
+    Content of message objects found under ``meldinger``, in a top-level list
+    or as a single top-level message object is reported as ``MessageDelta``
+    events. Output that is not JSON at all is treated as the content of one
+    message named ``default_name``.
+    """
+
+    def __init__(self, default_name: str = "Kunde", default_role: str = "customer") -> None:
+        self.default_name = default_name
+        self.default_role = default_role
+        self._mode: Optional[str] = None  # None (undecided), "json", "text"
+        self._lead = ""
+        self._stack: List[list] = []  # [kind, key_or_index, expecting_key]
+        self._in_string = False
+        self._string_is_key = False
+        self._string_path: Tuple[Union[str, int], ...] = ()
+        self._buf: List[str] = []
+        self._escape: Optional[str] = None
+        self._pending_high: Optional[int] = None
+        self._fields: dict = {}
+        self._started: dict = {}
+        self._count = 0
+
+    # -- public API -----------------------------------------------------
+    def feed(self, chunk: str) -> List[MessageDelta]:
+        events: List[MessageDelta] = []
+        if not chunk:
+            return events
+        if self._mode is None:
+            chunk = self._decide_mode(chunk, events)
+            if self._mode is None:
+                return events
+        if self._mode == "text":
+            events.append(MessageDelta("delta", 0, self.default_name, self.default_role, chunk))
+            return events
+        for ch in chunk:
+            self._step(ch, events)
+        return events
+
+    def close(self) -> List[MessageDelta]:
+        """Flush pending state once the model output is complete."""
+        events: List[MessageDelta] = []
+        if self._mode is None and self._lead.strip() and not self._lead.lstrip().startswith("```"):
+            self._mode = "text"
+            self._start_text(self._lead.strip(), events)
+        if self._mode == "text" and self._started:
+            events.append(MessageDelta("end", 0, self.default_name, self.default_role))
+        elif self._in_string and self._is_content_path(self._string_path):
+            msg_key = self._string_path[:-1]
+            if msg_key in self._started:
+                events.append(MessageDelta("end", self._started[msg_key], *self._speaker(msg_key)))
+        return events
+
+    # -- internals ------------------------------------------------------
+    def _decide_mode(self, chunk: str, events: List[MessageDelta]) -> str:
+        self._lead += chunk
+        text = self._lead.lstrip()
+        if text.startswith("`"):
+            # Skip a leading code fence line such as ```json
+            if "\n" not in text:
+                return ""
+            text = text.split("\n", 1)[1].lstrip()
+        if not text:
+            return ""
+        if text[0] in "{[":
+            self._mode = "json"
+            return text
+        self._mode = "text"
+        self._start_text("", events)
+        return text
+
+    def _start_text(self, text: str, events: List[MessageDelta]) -> None:
+        self._started[()] = 0
+        self._count = 1
+        events.append(MessageDelta("start", 0, self.default_name, self.default_role))
+        if text:
+            events.append(MessageDelta("delta", 0, self.default_name, self.default_role, text))
+
+    def _path(self) -> Tuple[Union[str, int], ...]:
+        return tuple(frame[1] for frame in self._stack)
+
+    def _is_content_path(self, path: Tuple[Union[str, int], ...]) -> bool:
+        if not path or path[-1] != "content":
+            return False
+        prefix = path[:-1]
+        if prefix == ():
+            return True
+        if len(prefix) == 1 and isinstance(prefix[0], int):
+            return True
+        return len(prefix) >= 2 and prefix[-2] == "meldinger" and isinstance(prefix[-1], int)
+
+    def _speaker(self, msg_key: tuple) -> Tuple[str, str]:
+        fields = self._fields.get(msg_key, {})
+        return fields.get("name") or self.default_name, fields.get("role") or self.default_role
+
+    def _step(self, ch: str, events: List[MessageDelta]) -> None:
+        if self._in_string:
+            self._string_char(ch, events)
+            return
+        if ch == '"':
+            top = self._stack[-1] if self._stack else None
+            self._in_string = True
+            self._string_is_key = bool(top and top[0] == "obj" and top[2])
+            self._buf = []
+            if not self._string_is_key:
+                self._string_path = self._path()
+                if self._is_content_path(self._string_path):
+                    msg_key = self._string_path[:-1]
+                    if msg_key not in self._started:
+                        self._started[msg_key] = self._count
+                        self._count += 1
+                        events.append(MessageDelta("start", self._started[msg_key], *self._speaker(msg_key)))
+            return
+        if ch == "{":
+            self._stack.append(["obj", None, True])
+        elif ch == "[":
+            self._stack.append(["arr", 0, False])
+        elif ch in "}]":
+            if self._stack:
+                self._stack.pop()
+        elif ch == ":":
+            if self._stack and self._stack[-1][0] == "obj":
+                self._stack[-1][2] = False
+        elif ch == ",":
+            if self._stack:
+                top = self._stack[-1]
+                if top[0] == "arr":
+                    top[1] += 1
+                else:
+                    top[2] = True
+
+    def _string_char(self, ch: str, events: List[MessageDelta]) -> None:
+        if self._escape is not None:
+            if self._escape == "":
+                if ch == "u":
+                    self._escape = "u"
+                    return
+                self._escape = None
+                self._emit(_ESCAPES.get(ch, ch), events)
+                return
+            self._escape += ch
+            if len(self._escape) == 5:
+                code = int(self._escape[1:], 16) if all(c in "0123456789abcdefABCDEF" for c in self._escape[1:]) else 0xFFFD
+                self._escape = None
+                if 0xD800 <= code < 0xDC00:
+                    self._pending_high = code
+                    return
+                if 0xDC00 <= code < 0xE000 and self._pending_high is not None:
+                    code = 0x10000 + ((self._pending_high - 0xD800) << 10) + (code - 0xDC00)
+                self._pending_high = None
+                self._emit(chr(code), events)
+            return
+        if ch == "\\":
+            self._escape = ""
+            return
+        if ch == '"':
+            self._in_string = False
+            self._finish_string(events)
+            return
+        self._emit(ch, events)
+
+    def _emit(self, text: str, events: List[MessageDelta]) -> None:
+        self._buf.append(text)
+        if self._string_is_key:
+            return
+        if self._is_content_path(self._string_path):
+            msg_key = self._string_path[:-1]
+            name, role = self._speaker(msg_key)
+            if events and events[-1].kind == "delta" and events[-1].index == self._started[msg_key]:
+                last = events.pop()
+                text = last.text + text
+            events.append(MessageDelta("delta", self._started[msg_key], name, role, text))
+
+    def _finish_string(self, events: List[MessageDelta]) -> None:
+        value = "".join(self._buf)
+        self._buf = []
+        if self._string_is_key:
+            if self._stack:
+                self._stack[-1][1] = value
+            return
+        path = self._string_path
+        if path and path[-1] in _MESSAGE_FIELDS:
+            msg_key = path[:-1]
+            if path[-1] == "content":
+                if self._is_content_path(path) and msg_key in self._started:
+                    events.append(MessageDelta("end", self._started[msg_key], *self._speaker(msg_key)))
+            else:
+                self._fields.setdefault(msg_key, {})[path[-1]] = value
+
+
+def iter_message_deltas(chunks: Iterator[str], **kwargs) -> Iterator[MessageDelta]:
+    """Convenience generator feeding *chunks* through one extractor."""
+    extractor = MessageStreamExtractor(**kwargs)
+    for chunk in chunks:
+        yield from extractor.feed(chunk)
+    yield from extractor.close()
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import model_api
+
+APP_PATH = str(Path(__file__).resolve().parents[1] / "app.py")
+
+
+@pytest.fixture
+def admin_app(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("AUTH_PASSWORD", raising=False)
+    monkeypatch.delenv("ADMIN_PASSWORD", raising=False)
+
+    def _open():
+        at = AppTest.from_file(APP_PATH, default_timeout=30)
+        at.query_params["page"] = "admin"
+        return at.run()
+
+    return _open
+
+
+def _log_in(at, password):
+    at.text_input[0].input(password)
+    next(b for b in at.button if b.label == "Logg inn").click().run()
+
+
+def _mode_radio(at):
+    return [r for r in at.radio if r.label.startswith("Modus for scenarieleder")]
+
+
+def test_admin_page_is_hidden_without_admin_password(admin_app):
+    at = admin_app()
+    assert not _mode_radio(at)
+    assert at.session_state["page"] == "start"
+
+
+def test_mode_switch_requires_admin_password(admin_app, monkeypatch):
+    monkeypatch.setenv("ADMIN_PASSWORD", "hemmelig")
+    # The trainees' class password does not open the admin page
+    at = admin_app()
+    at.session_state["authenticated"] = True
+    at.run()
+    assert not _mode_radio(at)
+
+    _log_in(at, "feil")
+    assert not _mode_radio(at)
+
+    _log_in(at, "hemmelig")
+    radio = _mode_radio(at)[0]
+    try:
+        radio.set_value("fast").run()
+        assert model_api.get_orchestration_mode() == "fast"
+    finally:
+        model_api.set_orchestration_mode("handoffs")
@@ -0,0 +1,38 @@
+import pytest
+from agents import Agent, RunConfig
+from agents.models import get_default_model, get_default_model_settings
+
+import config
+from agent_models import agent_options, effective_model, resolve
+
+
+def test_resolve_uses_config_when_no_override(monkeypatch):
+    tier = {"model": "gpt-4.1-mini", "max_tokens": 200, "temperature": None}
+    monkeypatch.setitem(config.AGENT_MODELS, "end_monitor", tier)
+    tier = resolve("end_monitor")
+    assert (tier.model, tier.max_tokens, tier.temperature) == ("gpt-4.1-mini", 200, None)
+
+
+def test_env_overrides_config(monkeypatch):
+    monkeypatch.setenv("AGENT_MODEL_CUSTOMER", "gpt-4.1-nano")
+    monkeypatch.setenv("AGENT_MAX_TOKENS_CUSTOMER", "300")
+    monkeypatch.setenv("AGENT_TEMPERATURE_CUSTOMER", "0.4")
+    tier = resolve("customer")
+    assert (tier.model, tier.max_tokens, tier.temperature) == ("gpt-4.1-nano", 300, 0.4)
+
+    monkeypatch.setenv("AGENT_MAX_TOKENS_CUSTOMER", "mange")
+    with pytest.raises(ValueError, match="AGENT_MAX_TOKENS_CUSTOMER"):
+        resolve("customer")
+
+
+def test_agent_options_keep_sdk_defaults_for_unset_values():
+    options = agent_options("director")
+    assert options["model"] is None
+    assert options["model_settings"] == get_default_model_settings()
+
+
+def test_effective_model_prefers_run_config_then_agent():
+    agent = Agent(name="a", model="gpt-4.1-mini")
+    assert effective_model(agent) == "gpt-4.1-mini"
+    assert effective_model(agent, RunConfig(model="gpt-4.1")) == "gpt-4.1"
+    assert effective_model(Agent(name="b")) == get_default_model()
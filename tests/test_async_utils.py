@@ -1,6 +1,8 @@
 import asyncio
 
-from async_utils import run_async
+import pytest
+
+from async_utils import get_loop, iter_async, run_async, shutdown, submit_async
 
 
 async def sample_coro():
@@ -20,3 +22,61 @@ def test_run_async_with_existing_loop():
 
     asyncio.run(runner())
     assert results == ["done"]
+
+
+def test_iter_async_yields_items_and_propagates_errors():
+    async def agen():
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield i
+
+    assert list(iter_async(agen())) == [0, 1, 2]
+
+    async def failing():
+        yield 1
+        raise ValueError("boom")
+
+    items = []
+    try:
+        for item in iter_async(failing()):
+            items.append(item)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+    assert items == [1]
+
+
+def test_submit_async_returns_future():
+    future = submit_async(sample_coro())
+    assert future.result(timeout=5) == "done"
+
+
+def test_run_async_reuses_one_background_loop():
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    assert run_async(current_loop()) is run_async(current_loop())
+
+
+def test_run_async_timeout_cancels_coroutine():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(TimeoutError):
+        run_async(slow(), timeout=0.05)
+    assert cancelled == [True]
+
+
+def test_shutdown_restarts_lazily():
+    first = get_loop()
+    shutdown()
+    assert first.is_closed()
+    assert run_async(sample_coro()) == "done"
+    assert get_loop() is not first
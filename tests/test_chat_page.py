@@ -0,0 +1,89 @@
+import time
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import metrics
+import model_api
+import views.chat_page as chat_page
+from benchmarks.fake_backend import MONITOR, FakeRunner, default_output
+
+APP_PATH = str(Path(__file__).resolve().parents[1] / "app.py")
+
+
+def _ending_monitor(agent_name, agent_input, context):
+    if agent_name == MONITOR:
+        return model_api.EndDecision(should_end=True, result="Kunden er fornøyd.", feedback="Godt jobbet.")
+    return default_output(agent_name, agent_input, context, "full")
+
+
+@pytest.fixture(autouse=True)
+def _drain_monitor_calls():
+    # Stale end-monitor calls keep running after a test; let them finish
+    yield
+    deadline = time.monotonic() + 10
+    while metrics.MODEL_CALLS_IN_FLIGHT.total() and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+
+def _start(monkeypatch, background: bool) -> AppTest:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("AUTH_PASSWORD", raising=False)
+    monkeypatch.setattr(chat_page, "BACKGROUND_TURNS", background)
+    at = AppTest.from_file(APP_PATH, default_timeout=30).run()
+    at.text_input[0].input("Ola")
+    next(b for b in at.button if b.label == "Start scenario").click().run()
+    return at
+
+
+def _poll(at: AppTest, until, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        time.sleep(0.2)
+        at.run()
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_input_is_back_before_the_end_monitor_decides(monkeypatch, background):
+    with FakeRunner(latency={MONITOR: 2.0}).installed():
+        at = _start(monkeypatch, background)
+        at.chat_input[0].set_value("Beklager, jeg lager en ny").run()
+        _poll(at, lambda: at.session_state["awaiting_user"], timeout=5)
+        # The reply is in and the trainee can answer while the monitor runs
+        assert at.session_state["turns"] == 1 and at.session_state["pending_end"]
+        assert at.chat_input and not at.session_state["ended"]
+
+        _poll(at, lambda: not at.session_state["pending_end"])
+    assert not at.session_state["ended"] and at.chat_input
+
+
+def test_late_end_decision_is_applied(monkeypatch):
+    with FakeRunner(latency={MONITOR: 1.0}, output=_ending_monitor).installed():
+        at = _start(monkeypatch, background=False)
+        at.chat_input[0].set_value("Beklager, jeg lager en ny").run()
+        assert at.session_state["awaiting_user"] and at.session_state["pending_end"]
+
+        _poll(at, lambda: at.session_state["ended"])
+    assert at.session_state["last_meta"]["scenarioresultat"]["content"] == "Kunden er fornøyd."
+
+
+def test_new_turn_drops_a_stale_end_decision(monkeypatch):
+    with FakeRunner(latency={MONITOR: 1.0}, output=_ending_monitor).installed():
+        at = _start(monkeypatch, background=False)
+        at.chat_input[0].set_value("Beklager, jeg lager en ny").run()
+        at.chat_input[0].set_value("Vil du ha pengene tilbake?").run()
+        # The first reply's decision no longer applies
+        assert at.session_state["turns"] == 2 and not at.session_state["ended"]
+
+
+def test_chat_area_polls_only_while_something_is_pending(monkeypatch):
+    with FakeRunner(latency={MONITOR: 0.5}).installed():
+        at = _start(monkeypatch, background=True)
+        at.chat_input[0].set_value("Beklager, jeg lager en ny").run()
+        _poll(at, lambda: at.session_state["awaiting_user"] and not at.session_state["pending_end"])
+
+        polled = []
+        monkeypatch.setattr(chat_page, "_polling_chat_area", lambda: polled.append(True))
+        at.run()
+    assert not polled and at.chat_input
@@ -0,0 +1,32 @@
+import client_pool
+
+
+def test_same_key_shares_client_and_run_config():
+    client_pool.close_all()
+    a = client_pool.get_run_config("sk-test-a")
+    assert a is client_pool.get_run_config("sk-test-a")
+    assert client_pool.get_client("sk-test-a") is client_pool.get_client("sk-test-a")
+    assert client_pool.get_run_config("sk-test-b") is not a
+    assert client_pool.pool_size() == 2
+    client_pool.close_all()
+
+
+def test_missing_key_keeps_sdk_defaults():
+    assert client_pool.get_run_config("") is None
+    assert client_pool.get_run_config(None) is None
+
+
+def test_pool_evicts_least_recently_used_key(monkeypatch):
+    client_pool.close_all()
+    monkeypatch.setattr(client_pool, "CLIENT_POOL_MAX_KEYS", 2)
+    first = client_pool.get_run_config("sk-1")
+    client_pool.get_run_config("sk-2")
+    client_pool.get_run_config("sk-3")
+    assert client_pool.pool_size() == 2
+    assert client_pool.get_run_config("sk-1") is not first
+    client_pool.close_all()
+
+
+def test_key_id_does_not_leak_key():
+    kid = client_pool.key_id("sk-secret")
+    assert "secret" not in kid and len(kid) == 12
@@ -0,0 +1,69 @@
+from context_window import RollingContext
+
+
+def _history(n):
+    msgs = [
+        {"name": "Scene", "role": "system", "content": "Det er lang kø ved kassa. Kaffen er kald."},
+        {"name": "Kari", "role": "customer", "content": "Jeg fikk feil bestilling! Jeg ba om havremelk."},
+    ]
+    for i in range(n):
+        msgs.append({"name": "Ola", "role": "employee", "content": f"Svar nummer {i}. Mer tekst."})
+        msgs.append({"name": "Kari", "role": "customer", "content": f"Kunde svarer {i}. Fortsatt sint."})
+    return msgs
+
+
+def test_short_history_is_kept_verbatim_without_summary():
+    ctx = RollingContext(window=24)
+    history = _history(3)
+    assert ctx.recent(history) == history
+    assert ctx.summary() == ""
+
+
+def test_window_slide_folds_old_messages_and_keeps_anchors():
+    ctx = RollingContext(window=4, max_chars=10_000)
+    history = _history(4)
+    recent = ctx.recent(history)
+    assert recent == history[-4:]
+    summary = ctx.summary()
+    assert summary.startswith("Scene: Det er lang kø ved kassa.")
+    assert "Klage fra Kari: Jeg fikk feil bestilling!" in summary
+    assert "- Ola (kollega): Svar nummer 0." in summary
+    assert "Mer tekst" not in summary
+
+
+def test_summary_only_changes_when_window_slides():
+    ctx = RollingContext(window=4)
+    history = _history(4)
+    assert ctx.update(history) is True
+    before = ctx.summary()
+    assert ctx.update(history) is False
+    assert ctx.summary() == before
+
+
+def test_summary_stays_bounded_on_long_sessions():
+    ctx = RollingContext(window=6, max_chars=400, line_chars=60)
+    history = _history(200)
+    ctx.update(history)
+    summary = ctx.summary()
+    assert len(summary) <= 400
+    assert "Klage fra Kari" in summary
+    assert ctx.omitted > 0
+
+
+def test_reset_history_restarts_summary():
+    ctx = RollingContext(window=2)
+    ctx.update(_history(5))
+    assert ctx.summary()
+    assert ctx.recent(_history(0)) == _history(0)
+    assert ctx.summary() == ""
+
+
+def test_fold_step_keeps_the_window_start_for_several_turns():
+    ctx = RollingContext(window=6, fold_step=4)
+    history = _history(3)  # 8 messages
+    ctx.update(history)
+    assert ctx.summarized == 5  # folded 4 beyond the overflow, 3 kept
+    assert ctx.update(_history(4)) is False  # 5 recent messages still fit
+    assert ctx.summarized == 5
+    assert ctx.update(_history(5)) is True
+    assert ctx.summarized == 9
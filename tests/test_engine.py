@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+import async_utils
+import engine
+from engine import ScenarioSession
+from model_api import TurnOutcome
+from resilience import AgentCallFailed
+
+
+def _director(meta=None, fail_on=None):
+    async def director_turn(prompt, ctx, is_initial, run_config=None, mode=None):
+        if fail_on is not None and ctx["turn_count"] == fail_on:
+            raise AgentCallFailed("director", "timeout")
+        message = {"name": "Kari", "role": "customer", "content": f"Svar {ctx['turn_count']}"}
+        return TurnOutcome([message], {} if is_initial else dict(meta or {}), None)
+
+    return director_turn
+
+
+def test_start_and_step_own_history_turns_and_prompt_sizes(monkeypatch):
+    monkeypatch.setattr(engine, "director_turn", _director())
+    session = ScenarioSession("Ola", "Lett", max_turns=2)
+
+    opening = asyncio.run(session.start())
+    assert not opening.ended and session.turns == 0
+    first = asyncio.run(session.step("Beklager!"))
+    assert (first.ended, session.turns) == (False, 1)
+    second = asyncio.run(session.step("Du får en ny."))
+    assert (second.ended, second.ended_by) == (True, "max_turns") and session.ended
+    assert [m["role"] for m in session.history] == ["customer", "employee", "customer", "employee", "customer"]
+    assert [p["turn"] for p in session.state["prompt_tokens"]] == [0, 1, 2]
+
+
+def test_director_end_and_end_command(monkeypatch):
+    meta = {"scenarioresultat": {"content": "Løst"}, "tilbakemelding": {"content": "Bra"}}
+    monkeypatch.setattr(engine, "director_turn", _director(meta=meta))
+    session = ScenarioSession(max_turns=5)
+    opening = asyncio.run(session.start(opening=[{"name": "Scene", "role": "system", "content": "Kafé"}]))
+    assert opening.prompt_tokens == 0 and session.state["prompt_tokens"] == []
+    assert asyncio.run(session.step("Beklager")).ended_by == "director"
+
+    quitting = ScenarioSession(state={})
+    result = asyncio.run(quitting.step("Avslutt scenario"))
+    assert (result.ended, result.ended_by, quitting.turns) == (True, "trainee", 0)
+    assert quitting.last_meta["scenarioresultat"]["content"] == "Scenarioet ble avsluttet av brukeren."
+
+
+def test_failed_director_call_undoes_the_turn(monkeypatch):
+    monkeypatch.setattr(engine, "director_turn", _director(fail_on="2"))
+    state = {}
+    session = ScenarioSession(state=state)
+    asyncio.run(session.start())
+    asyncio.run(session.step("Hei"))
+    with pytest.raises(AgentCallFailed):
+        asyncio.run(session.step("Hallo?"))
+    assert session.turns == 1 and len(state["history"]) == 3 and len(state["prompt_tokens"]) == 2
+
+
+def test_director_runs_on_the_shared_loop_whatever_loop_awaits_it(monkeypatch):
+    loops = []
+
+    async def director_turn(prompt, ctx, is_initial, run_config=None, mode=None):
+        loops.append(asyncio.get_running_loop())
+        return TurnOutcome([{"name": "Kari", "role": "customer", "content": "Hei"}], {}, None)
+
+    monkeypatch.setattr(engine, "director_turn", director_turn)
+    session = ScenarioSession("Ola", "Lett")
+    asyncio.run(session.start())
+    asyncio.run(session.step("Beklager!"))
+    assert loops == [async_utils.get_loop()] * 2
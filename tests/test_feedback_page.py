@@ -0,0 +1,29 @@
+import concurrent.futures
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from model_api import EndDecision
+
+APP_PATH = str(Path(__file__).resolve().parents[1] / "app.py")
+
+
+def test_pending_end_decision_does_not_block_the_page(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("AUTH_PASSWORD", raising=False)
+    future = concurrent.futures.Future()
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["page"] = "feedback"
+    at.session_state["ended"] = True
+    at.session_state["pending_end"] = {"future": future, "oppdrag": None, "sjekkliste": []}
+
+    started = time.perf_counter()
+    at.run()
+    assert time.perf_counter() - started < 5
+    assert [i.value for i in at.info] == ["Vurderer scenarioet – resultat og tilbakemelding kommer straks…"]
+
+    future.set_result(EndDecision(should_end=True, result="Løst", feedback="Bra lyttet"))
+    at.run()
+    assert [s.value for s in at.success] == ["Scenarioresultat\n\nLøst"]
+    assert at.session_state["pending_end"] is None
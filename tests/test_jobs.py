@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+from jobs import JobQueue
+
+
+def test_jobs_run_with_bounded_concurrency_in_fifo_order():
+    queue = JobQueue(concurrency=1)
+    release = threading.Event()
+    order = []
+
+    def work(tag):
+        async def _work(job):
+            job.start_message("Kari", "customer")
+            job.add_text(tag)
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+            order.append(tag)
+            return tag
+
+        return _work
+
+    first = queue.submit("turn", work("a"))
+    second = queue.submit("turn", work("b"))
+    third = queue.submit("turn", work("c"))
+    assert not first.wait(0.1)
+    assert first.status == "running" and first.progress() == [{"name": "Kari", "role": "customer", "content": "a"}]
+    assert [queue.position(j) for j in (first, second, third)] == [0, 1, 2]
+
+    release.set()
+    assert third.wait(2)
+    assert order == ["a", "b", "c"]
+    assert [j.result() for j in (first, second, third)] == ["a", "b", "c"]
+    assert queue.waiting() == 0
+
+
+def test_job_failure_is_reraised_by_result():
+    queue = JobQueue(concurrency=2)
+
+    async def _fail(job):
+        raise RuntimeError("nope")
+
+    job = queue.submit("turn", _fail)
+    assert job.wait(2)
+    assert job.status == "failed"
+    try:
+        job.result()
+    except RuntimeError as exc:
+        assert str(exc) == "nope"
+    else:  # pragma: no cover
+        raise AssertionError("expected the job's exception")
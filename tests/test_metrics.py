@@ -0,0 +1,64 @@
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, Histogram, _Metric, _Sessions
+
+
+def test_counter_renders_labelled_samples():
+    c = Counter("krise_test_total", "Test counter.", ["path"])
+    c.inc(path="fenced")
+    c.inc(2, path="fenced")
+    c.inc(path="plain_text")
+    text = c.render()
+    assert "# TYPE krise_test_total counter" in text
+    assert 'krise_test_total{path="fenced"} 3' in text
+    assert 'krise_test_total{path="plain_text"} 1' in text
+
+
+def test_unlabelled_counter_renders_zero_before_first_inc():
+    assert Counter("krise_zero_total", "Zero.").render().endswith("krise_zero_total 0")
+
+
+def test_gauge_track_counts_work_in_progress():
+    g = Gauge("krise_in_flight", "In flight.", ["agent"])
+    with g.track(agent="Scenarioleder"):
+        with g.track(agent="Scenarioleder"):
+            assert g.value(agent="Scenarioleder") == 2
+        assert g.total() == 1
+    assert g.value(agent="Scenarioleder") == 0
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("krise_latency_seconds", "Latency.", ["mode"], buckets=(0.5, 1.0))
+    for value in (0.2, 0.5, 0.7, 3.0):
+        h.observe(value, mode="call")
+    lines = h.render().splitlines()
+    assert 'krise_latency_seconds_bucket{mode="call",le="0.5"} 2' in lines
+    assert 'krise_latency_seconds_bucket{mode="call",le="1"} 3' in lines
+    assert 'krise_latency_seconds_bucket{mode="call",le="+Inf"} 4' in lines
+    assert 'krise_latency_seconds_count{mode="call"} 4' in lines
+    assert 'krise_latency_seconds_sum{mode="call"} 4.4' in lines
+
+
+def test_sessions_expire_after_window():
+    sessions = _Sessions(window=0)
+    sessions.touch("a")
+    assert sessions.active() == 0
+    sessions = _Sessions(window=60)
+    sessions.touch("a")
+    sessions.touch("b")
+    sessions.touch("a")
+    assert sessions.active() == 2
+
+
+def test_metric_base_requires_samples():
+    with pytest.raises(TypeError):
+        _Metric("krise_base", "Base.")
+
+
+def test_endpoint_is_off_unless_a_port_is_set(monkeypatch):
+    monkeypatch.delenv("METRICS_PORT", raising=False)
+    assert metrics.metrics_port() is None
+    assert metrics.serve() is None
+    monkeypatch.setenv("METRICS_PORT", "9464")
+    assert metrics.metrics_port() == 9464
@@ -1,11 +1,42 @@
 import asyncio
+import concurrent.futures
 import json
+import time
+from types import SimpleNamespace
 
 import pytest
 import streamlit as st
-from agents import Agent, InputGuardrail, InputGuardrailTripwireTriggered, RunContextWrapper
-
-from model_api import coerce_scenario_output, ScenarioOutput, check_training_context
+from agents import (
+    Agent,
+    InputGuardrail,
+    InputGuardrailTripwireTriggered,
+    OpenAIProvider,
+    RunConfig,
+    RunContextWrapper,
+    set_trace_processors,
+)
+from openai import AsyncOpenAI
+
+import metrics
+import model_api
+import resilience
+import tracing_local
+from async_utils import run_async
+from benchmarks.fake_backend import CUSTOMER, DIRECTOR, FAST_DIRECTOR, HANDOFF, FakeRunner
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from model_api import (
+    EndDecision,
+    ScenarioOutput,
+    call_model,
+    check_training_context,
+    coerce_scenario_output,
+    fast_scenario_agent,
+    resolve_end_decision,
+    scenario_agent,
+    set_orchestration_mode,
+)
+from tracing_local import read_traces
+from usage_ledger import UsageLedger
 
 
 def test_coerce_output_from_dict():
@@ -82,3 +113,113 @@ def test_check_training_context_allows_valid_input():
 def test_check_training_context_blocks_invalid_input():
     with pytest.raises(InputGuardrailTripwireTriggered):
         asyncio.run(_run_guardrail("this is forbidden"))
+
+
+def test_resolve_end_decision_applies_background_result():
+    st.session_state.clear()
+    future = concurrent.futures.Future()
+    st.session_state.pending_end = {"future": future, "oppdrag": None, "sjekkliste": ["punkt"]}
+
+    assert resolve_end_decision(timeout=0) is False  # still pending
+    future.set_result(EndDecision(should_end=True, result="Løst", feedback="Bra"))
+    assert resolve_end_decision(timeout=0) is True
+    assert st.session_state.pending_end is None
+    assert st.session_state.last_meta["scenarioresultat"]["content"] == "Løst"
+    assert st.session_state.last_meta["sjekkliste"] == ["punkt"]
+
+
+def test_call_model_bootstrap_fills_in_missing_customer():
+    st.session_state.clear()
+    st.session_state.update({"history": [], "turns": 0, "difficulty": "Lett", "user_name": "Ola"})
+    runner = FakeRunner(latency={DIRECTOR: 0, CUSTOMER: 0}, shape="scene_only")
+    fallbacks = metrics.BOOTSTRAP_FALLBACKS.value()
+    with runner.installed():
+        messages = call_model("Runde: 0/6 | Vanskelighetsgrad: Lett. Start scenen.")
+
+    assert [m["role"] for m in messages] == ["system", "customer"]
+    assert [c.agent for c in runner.calls] == [DIRECTOR, CUSTOMER]
+    assert metrics.BOOTSTRAP_FALLBACKS.value() == fallbacks + 1
+    assert metrics.MODEL_CALLS_IN_FLIGHT.total() == 0
+
+
+def test_fast_mode_director_writes_messages_without_handoffs():
+    assert scenario_agent.handoffs and not fast_scenario_agent.handoffs
+    assert "Ikke løs situasjonen" in fast_scenario_agent.instructions  # persona rules compiled in
+    st.session_state.clear()
+    st.session_state.update({"history": [], "turns": 0, "difficulty": "Lett", "user_name": "Ola"})
+    runner = FakeRunner(latency={DIRECTOR: 0, FAST_DIRECTOR: 0, HANDOFF: 0}, handoffs=1)
+    prompt = "Runde: 0/6 | Vanskelighetsgrad: Lett. Start scenen."
+    try:
+        with runner.installed():
+            call_model(prompt)
+            set_orchestration_mode("fast")
+            st.session_state.history = []
+            messages = call_model(prompt)
+    finally:
+        set_orchestration_mode("handoffs")
+
+    assert [m["role"] for m in messages] == ["system", "customer"]
+    assert [c.agent for c in runner.calls] == [DIRECTOR, HANDOFF, FAST_DIRECTOR]
+    with pytest.raises(ValueError):
+        set_orchestration_mode("turbo")
+
+
+class _SlowThenFastRunner:
+    """``Runner`` stand-in: the first try hangs, later tries answer at once."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def run(self, agent, agent_input, context=None, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            await asyncio.sleep(5)
+        usage = SimpleNamespace(input_tokens=100, output_tokens=10, input_tokens_details=SimpleNamespace(cached_tokens=0))
+        return SimpleNamespace(final_output="Hei", raw_responses=[None], context_wrapper=SimpleNamespace(usage=usage))
+
+
+@pytest.mark.parametrize("hedge, kind", [(False, "retries"), (True, "hedge_losers")])
+def test_discarded_tries_are_booked_in_the_ledger(monkeypatch, hedge, kind):
+    book = UsageLedger()
+    monkeypatch.setattr(model_api, "ledger", book)
+    monkeypatch.setattr(model_api, "Runner", _SlowThenFastRunner())
+    monkeypatch.setattr(resilience, "backoff", lambda attempt: 0.0)
+    monkeypatch.setattr(resilience, "latencies", resilience.LatencyWindow(min_samples=1))
+    resilience.latencies.observe("customer", 0.01)
+    attempt_timeout = 2.0 if hedge else 0.1
+    monkeypatch.setattr(resilience, "policy", lambda stage: resilience.CallPolicy(3.0, attempt_timeout, 2, hedge))
+
+    ctx = {"session_id": "s", "scenario_id": "a"}
+    run_async(model_api._run_agent(model_api.customer_agent, "Scenen som er satt", ctx, None))
+
+    totals = book.scenario("s", "a")
+    assert (totals.calls, getattr(totals, kind), totals.responses) == (1, 1, 2)
+    # The discarded try is billed with its estimated prompt
+    assert totals.input_tokens > 100 and totals.output_tokens == 10
+
+
+def test_background_turn_writes_its_agent_spans_to_the_trace(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    tracing_local.install(path)
+    monkeypatch.setattr(model_api, "_session_ctx", lambda: model_api.scenario_ctx("Lett", "Ola", 1, 6, "s1", "sc1"))
+    monkeypatch.setattr(model_api, "_is_initial_turn", lambda: False)
+    monkeypatch.setattr(model_api, "get_orchestration_mode", lambda: "fast")
+    try:
+        with FakeOpenAIServer(latency=0.05, ttft=0.02) as server:
+            client = AsyncOpenAI(api_key="test", base_url=server.base_url)
+            run_config = RunConfig(model_provider=OpenAIProvider(openai_client=client))
+            monkeypatch.setattr(model_api, "_session_run_config", lambda: run_config)
+            job = model_api.submit_turn("Runde 1: Hei", stream=True, prompt_tokens=42)
+            assert job.wait(10) and job.result().messages
+            deadline = time.monotonic() + 5
+            while not read_traces(path) and time.monotonic() < deadline:
+                time.sleep(0.05)
+    finally:
+        tracing_local._processor = None
+        set_trace_processors([])
+
+    (record,) = read_traces(path)
+    assert (record["workflow"], record["group_id"]) == ("Kriseøvelse tur", "sc1")
+    assert record["metadata"] == {"turn": "1", "orchestration": "fast", "prompt_tokens": "42"}
+    labels = json.dumps(record["spans"], ensure_ascii=False)
+    assert f"agent {fast_scenario_agent.name}" in labels
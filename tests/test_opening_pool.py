@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from opening_pool import OpeningPool
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    assert predicate()
+
+
+def _opening(difficulty):
+    return [
+        {"name": "Scene", "role": "system", "content": f"Scene {difficulty}"},
+        {"name": "Kari", "role": "customer", "content": "Hei"},
+    ]
+
+
+def test_take_is_a_miss_until_refilled_then_a_hit():
+    calls = []
+
+    async def generate(api_key, difficulty, session_id):
+        calls.append(difficulty)
+        await asyncio.sleep(0)
+        return _opening(difficulty)
+
+    pool = OpeningPool(generate, size=2)
+    assert pool.take("sk-a", "Lett") is None
+    _wait_for(lambda: pool.stats("sk-a")["ready"]["Lett"] == 2)
+
+    opening = pool.take("sk-a", "Lett")
+    assert opening[0]["content"] == "Scene Lett"
+    _wait_for(lambda: pool.stats("sk-a")["ready"]["Lett"] == 2)
+    stats = pool.stats("sk-a")
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert calls.count("Lett") == 3
+
+
+def test_openings_are_not_shared_between_keys():
+    async def generate(api_key, difficulty, session_id):
+        return _opening(difficulty)
+
+    pool = OpeningPool(generate, size=1)
+    pool.warm("sk-a", ["Medium"])
+    _wait_for(lambda: pool.stats("sk-a")["ready"]["Medium"] == 1)
+    assert pool.take("sk-b", "Medium") is None
+    assert pool.take("sk-a", "Medium") is not None
+    # Hits and misses are counted per key; stats() sums them
+    assert (pool.stats("sk-a")["hits"], pool.stats("sk-a")["misses"]) == (1, 0)
+    assert (pool.stats("sk-b")["hits"], pool.stats("sk-b")["misses"]) == (0, 1)
+    assert pool.stats()["hit_rate"] == 0.5
+
+
+def test_generation_is_booked_under_the_requesting_session():
+    sessions = []
+
+    async def generate(api_key, difficulty, session_id):
+        sessions.append((difficulty, session_id))
+        return _opening(difficulty)
+
+    pool = OpeningPool(generate, size=1)
+    pool.warm("sk-a", ["Lett"], session_id="s1")
+    _wait_for(lambda: pool.stats("sk-a")["ready"]["Lett"] == 1)
+    pool.take("sk-a", "Lett", session_id="s2")
+    _wait_for(lambda: len(sessions) == 2)
+    assert sessions == [("Lett", "s1"), ("Lett", "s2")]
+
+
+def test_failed_generation_is_counted():
+    async def generate(api_key, difficulty, session_id):
+        raise RuntimeError("upstream")
+
+    pool = OpeningPool(generate, size=1)
+    pool.warm("sk-a", ["Vanskelig"])
+    _wait_for(lambda: pool.stats()["failures"] == 1)
+    assert pool.stats()["ready"]["Vanskelig"] == 0
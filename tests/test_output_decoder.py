@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from output_decoder import decode_scenario_output
+from schemas import ScenarioOutput
+
+_DOC = {"meldinger": [{"name": "Kari", "role": "customer", "content": "Feil kaffe!"}]}
+
+
+@pytest.mark.parametrize(
+    "raw, path",
+    [
+        (json.dumps(_DOC), "json"),
+        (_DOC, "dict"),
+        ("```json\n" + json.dumps(_DOC) + "\n```", "fenced"),
+        (json.dumps(_DOC) + "\nHåper dette hjelper!", "garbage"),
+        ("Svar:\n" + json.dumps(_DOC), "garbage"),
+        (str(_DOC), "python_literal"),
+        (json.dumps(_DOC["meldinger"][0]), "single_message"),
+        (json.dumps(_DOC["meldinger"]), "message_list"),
+    ],
+)
+def test_recovers_structured_output_and_reports_path(raw, path):
+    result = decode_scenario_output(raw)
+    assert result.path == path
+    assert isinstance(result.output, ScenarioOutput)
+    assert [m.content for m in result.output.meldinger] == ["Feil kaffe!"]
+
+
+def test_plain_text_uses_fallback_speaker():
+    result = decode_scenario_output("Jeg har ventet lenge.", "Scene", "system")
+    assert result.path == "plain_text"
+    msg = result.output.meldinger[0]
+    assert (msg.name, msg.role, msg.content) == ("Scene", "system", "Jeg har ventet lenge.")
+
+
+@pytest.mark.parametrize("text", ["Jeg bestilte [2] kaffe og fikk feil!", 'Kunden sier: {"a": 1} ok'])
+def test_prose_with_brackets_stays_plain_text(text):
+    result = decode_scenario_output(text)
+    assert result.path == "plain_text"
+    assert [(m.name, m.content) for m in result.output.meldinger] == [("Kunde", text)]
+
+
+def test_invalid_and_empty_outputs_never_raise():
+    bad = json.dumps({"meldinger": [{"name": "Kari", "role": "kunde", "content": "x"}]})
+    assert decode_scenario_output(bad).path == "invalid"
+    assert decode_scenario_output(bad).output.meldinger == []
+    assert decode_scenario_output("").path == "empty"
+    assert decode_scenario_output(None).path == "empty"
+
+
+def test_model_instance_passes_through():
+    out = ScenarioOutput(meldinger=[])
+    assert decode_scenario_output(out) == (out, "model")
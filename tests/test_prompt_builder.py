@@ -0,0 +1,74 @@
+from context_window import RollingContext
+from prompt_builder import build_prompt, estimate_tokens
+
+
+def _history(n, content="Kort svar."):
+    msgs = [{"name": "Scene", "role": "system", "content": "Lang kø ved kassa."}]
+    for i in range(n):
+        msgs.append({"name": "Kari", "role": "customer", "content": f"Klage {i}. {content}"})
+        msgs.append({"name": "Ola", "role": "employee", "content": f"Svar {i}. {content}"})
+    return msgs
+
+
+def _build(user_text, history, rolling, budget):
+    return build_prompt(
+        user_text,
+        history,
+        rolling,
+        user_name="Ola",
+        difficulty="Medium",
+        turns=3,
+        max_turns=6,
+        budget=budget,
+    )
+
+
+def test_estimate_tokens_is_positive_and_monotonic():
+    assert estimate_tokens("") == 0
+    assert 0 < estimate_tokens("hei") <= estimate_tokens("hei på deg, kunde")
+
+
+def test_bootstrap_prompt_without_history():
+    prompt, tokens = _build("Start", [], RollingContext(), 3000)
+    # No trainee name, so it matches the pre-warmed openings' prompt
+    assert prompt == "Runde: 0/6 | Vanskelighetsgrad: Medium. Start scenen."
+    assert tokens == estimate_tokens(prompt)
+
+
+def test_prompt_within_budget_keeps_history_verbatim():
+    history = _history(3)
+    prompt, tokens = _build("Beklager", history, RollingContext(window=24), 3000)
+    assert "Svar 2. Kort svar." in prompt
+    assert "Sammendrag" not in prompt
+    assert prompt.endswith("Brukerens siste svar: Beklager")
+    assert tokens <= 3000
+
+
+def test_long_history_is_folded_to_fit_budget():
+    history = _history(6, content="Dette er en lang melding. " * 40)
+    prompt, tokens = _build("Beklager", history, RollingContext(window=24), 800)
+    assert tokens <= 800
+    assert "Sammendrag av tidligere historikk" in prompt
+    assert "Runde: 3/6" in prompt
+    # The newest message is always kept verbatim
+    assert history[-1]["content"] in prompt
+
+
+def test_oversized_user_reply_is_truncated():
+    history = _history(1)
+    prompt, tokens = _build("x" * 20000, history, RollingContext(window=24), 500)
+    assert tokens <= 500
+    assert prompt.endswith("…")
+
+
+def test_next_turn_prompt_extends_the_previous_prefix():
+    history = _history(2)
+    rolling = RollingContext(window=24)
+    first, _ = _build("Beklager", history, rolling, None)
+    history += [{"name": "Ola", "role": "employee", "content": "Beklager"}, {"name": "Kari", "role": "customer", "content": "Greit."}]
+    second, _ = build_prompt(
+        "Ny kaffe?", history, rolling, user_name="Ola", difficulty="Medium", turns=4, max_turns=6, budget=None
+    )
+    stable = first[: first.index("Runde: 3/6")].rstrip().rstrip("]")
+    assert second.startswith(stable)
+    assert second.endswith("Runde: 4/6. Brukerens siste svar: Ny kaffe?")
@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+from rate_limit import RateLimiter, TokenBucket, limiter_for, retry_after
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_refills_per_minute():
+    clock = _Clock()
+    bucket = TokenBucket(60, clock)
+    bucket.take(60)
+    assert bucket.wait_time(1) == 1.0
+    clock.now = 30.0
+    assert bucket.wait_time(30) == 0.0
+    bucket.take(40)  # more than reserved: a debt to refill first
+    assert bucket.wait_time(1) == 11.0
+
+
+def test_waiters_are_admitted_in_fifo_order_with_positions():
+    limiter = RateLimiter(requests_per_min=120, tokens_per_min=None)
+    limiter.requests.level = 0  # next request in 0.5 s
+    admitted = []
+
+    async def _run():
+        async def _take(tag):
+            await limiter.acquire(10, who=tag)
+            admitted.append(tag)
+
+        tasks = [asyncio.ensure_future(_take(tag)) for tag in "abc"]
+        await asyncio.sleep(0.05)
+        positions = [limiter.position(tag) for tag in "abc"]
+        await asyncio.gather(*tasks)
+        return positions
+
+    assert asyncio.run(_run()) == [1, 2, 3]
+    assert admitted == ["a", "b", "c"]
+    assert limiter.waiting() == 0
+
+
+def test_throttle_pauses_admission_and_drains_budgets():
+    clock = _Clock()
+    limiter = RateLimiter(requests_per_min=600, tokens_per_min=60_000, clock=clock)
+    limiter.throttle(retry_after=5.0)
+    assert limiter._delay(100) == 5.0
+    clock.now = 5.0
+    assert limiter._delay(100) == 0.0
+    assert retry_after(SimpleNamespace(response=SimpleNamespace(headers={"retry-after-ms": "1500"}))) == 1.5
+    assert retry_after(RuntimeError()) is None
+
+
+def test_settle_charges_real_usage():
+    clock = _Clock()
+    limiter = RateLimiter(requests_per_min=60, tokens_per_min=6000, clock=clock)
+    asyncio.run(limiter.acquire(1000))
+    limiter.settle(reserved=1000, requests=3, tokens=4000)
+    assert limiter.requests.level == 57
+    assert limiter.tokens.level == 2000
+
+
+def test_limiters_are_per_api_key():
+    first = SimpleNamespace(trace_metadata={"key_id": "abc"})
+    assert limiter_for(first) is limiter_for(SimpleNamespace(trace_metadata={"key_id": "abc"}))
+    assert limiter_for(first) is not limiter_for(None)
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+import model_api
+import replay
+from async_utils import run_async
+from benchmarks.fake_backend import DIRECTOR, FakeRunner
+from model_api import ModelStream, _run_agent, fast_scenario_agent
+from replay import ReplayMiss, ReplayStore, call_key
+
+CTX = {"difficulty": "Lett", "user_name": "Ola", "turn_count": "1", "max_turns": "6"}
+
+
+def test_call_key_normalizes_whitespace_and_ignores_session_ids():
+    key = call_key("Scenarioleder", "Hei  der\n", {**CTX, "session_id": "a", "scenario_id": "x"})
+    assert key == call_key("Scenarioleder", "Hei der", {**CTX, "session_id": "b", "scenario_id": "y"})
+    assert key != call_key("Scenarioleder", "Hei der", {**CTX, "turn_count": "2"})
+    assert key != call_key("Kunde", "Hei der", CTX)
+
+
+def test_recorded_runs_replay_without_the_runner(tmp_path, monkeypatch):
+    path = str(tmp_path / "replay.jsonl")
+    runner = FakeRunner(latency={DIRECTOR: 0})
+    monkeypatch.setattr(replay, "store", ReplayStore(path, "record"))
+    with runner.installed():
+        live = run_async(_run_agent(fast_scenario_agent, "Runde 1", CTX, None))
+
+    monkeypatch.setattr(replay, "store", ReplayStore(path, "replay"))
+    runner.reset()
+    with runner.installed():
+        replayed = run_async(_run_agent(fast_scenario_agent, "Runde  1", {**CTX, "session_id": "s2"}, None))
+        with pytest.raises(ReplayMiss):
+            run_async(_run_agent(fast_scenario_agent, "Runde 2", CTX, None))
+    assert runner.calls == []
+    assert model_api.coerce_scenario_output(replayed.final_output, initial=False) == (
+        model_api.coerce_scenario_output(live.final_output, initial=False)
+    )
+
+
+def test_streamed_replay_paces_the_recorded_output(tmp_path, monkeypatch):
+    path = str(tmp_path / "replay.jsonl")
+    output = {"meldinger": [{"name": "Kari", "role": "customer", "content": "Dette er feil!"}]}
+    store = ReplayStore(path, "record")
+    store.record(fast_scenario_agent.name, "Runde 1", CTX, type("R", (), {"final_output": output})(), 0.2)
+
+    monkeypatch.setattr(replay, "store", ReplayStore(path, "replay", timed=True))
+    monkeypatch.setattr(model_api, "_session_ctx", lambda: CTX)
+    monkeypatch.setattr(model_api, "_is_initial_turn", lambda: False)
+    monkeypatch.setattr(model_api, "_session_run_config", lambda: None)
+    monkeypatch.setattr(model_api, "apply_turn", lambda outcome: outcome.messages)
+    monkeypatch.setattr(model_api, "get_orchestration_mode", lambda: "fast")
+
+    started = time.perf_counter()
+    stream = ModelStream("Runde 1")
+    streamed = [(msg.name, "".join(msg.chunks)) for msg in stream]
+    assert time.perf_counter() - started >= 0.2
+    assert streamed == [("Kari", "Dette er feil!")]
+    assert [m["content"] for m in stream.messages] == ["Dette er feil!"]
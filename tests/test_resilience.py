@@ -0,0 +1,134 @@
+import asyncio
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+import resilience
+from resilience import AgentCallFailed, CallPolicy, DeadlineExceeded, LatencyWindow, RetryingStream, call
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff", lambda attempt: 0.0)
+    monkeypatch.setattr(resilience, "latencies", LatencyWindow(min_samples=3))
+
+
+def _policy(deadline=1.0, attempt_timeout=1.0, attempts=2, hedge=False) -> CallPolicy:
+    return CallPolicy(deadline, attempt_timeout, attempts, hedge)
+
+
+class _ServerError(openai.InternalServerError):
+    def __init__(self) -> None:  # no HTTP response needed
+        Exception.__init__(self, "boom")
+        self.status_code = 500
+
+
+def _server_error() -> openai.InternalServerError:
+    return _ServerError()
+
+
+def test_retries_transient_error_then_succeeds():
+    attempts = []
+
+    async def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise _server_error()
+        return "ok"
+
+    assert asyncio.run(call("director", factory, _policy())) == "ok"
+    assert len(attempts) == 2
+
+
+def test_hung_call_raises_deadline_exceeded():
+    async def factory():
+        await asyncio.sleep(10)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(call("director", factory, _policy(deadline=0.2, attempt_timeout=0.1)))
+
+
+def test_non_transient_error_is_not_retried():
+    attempts = []
+
+    async def factory():
+        attempts.append(1)
+        raise ValueError("guardrail")
+
+    with pytest.raises(ValueError):
+        asyncio.run(call("director", factory, _policy(attempts=3)))
+    assert len(attempts) == 1
+
+
+def test_exhausted_attempts_raise_agent_call_failed():
+    async def factory():
+        raise _server_error()
+
+    with pytest.raises(AgentCallFailed) as info:
+        asyncio.run(call("director", factory, _policy(attempts=2)))
+    assert not isinstance(info.value, DeadlineExceeded)
+    assert isinstance(info.value.__cause__, openai.InternalServerError)
+
+
+def test_slow_primary_is_hedged():
+    for _ in range(3):
+        resilience.latencies.observe("customer", 0.02)
+    delays = iter([1.0, 0.0])
+
+    async def factory():
+        delay = next(delays)
+        await asyncio.sleep(delay)
+        return delay
+
+    result = asyncio.run(call("customer", factory, _policy(deadline=2.0, attempt_timeout=2.0, hedge=True)))
+    assert result == 0.0  # the duplicate answered first
+
+
+class _Run:
+    def __init__(self, events, fail_after=None):
+        self.events = events
+        self.fail_after = fail_after
+        self.final_output = "".join(e.text for e in events if e.text)
+        self.cancelled = False
+
+    async def stream_events(self):
+        for i, event in enumerate(self.events):
+            if i == self.fail_after:
+                raise _server_error()
+            yield event
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def _ev(text=""):
+    return SimpleNamespace(text=text)
+
+
+def _collect(stream):
+    async def _run():
+        return [e.text async for e in stream.events()]
+
+    return asyncio.run(_run())
+
+
+def test_stream_retries_only_before_output():
+    runs = iter([_Run([_ev(), _ev("a")], fail_after=1), _Run([_ev(), _ev("a"), _ev("b")])])
+    first = []
+
+    def start():
+        run = next(runs)
+        first.append(run)
+        return run
+
+    stream = RetryingStream("director", start, is_output=lambda e: bool(e.text), call_policy=_policy())
+    assert _collect(stream) == ["", "", "a", "b"]
+    assert first[0].cancelled and stream.result is first[1]
+
+    late = RetryingStream(
+        "director", lambda: _Run([_ev("a"), _ev("b")], fail_after=1), is_output=lambda e: bool(e.text),
+        call_policy=_policy(),
+    )
+    with pytest.raises(AgentCallFailed):
+        _collect(late)
@@ -0,0 +1,76 @@
+import asyncio
+import concurrent.futures
+from argparse import Namespace
+
+import engine
+import simulate
+from model_api import EndDecision, TurnOutcome
+
+
+def _args(**overrides):
+    args = Namespace(trainee="scripted", mode="fast", max_turns=3, seed=1, label="test")
+    vars(args).update(overrides)
+    return args
+
+
+def _fake_director(calls, should_end=False):
+    async def director_turn(prompt, ctx, is_initial, run_config=None, mode=None):
+        calls.append((ctx["turn_count"], is_initial, prompt))
+        message = {"name": "Kari", "role": "customer", "content": f"Svar {ctx['turn_count']}"}
+        if is_initial:
+            return TurnOutcome([message], {}, None)
+        future = concurrent.futures.Future()
+        future.set_result(EndDecision(should_end=should_end, result="Løst", feedback="Bra"))
+        return TurnOutcome([message], {}, {"future": future})
+
+    return director_turn
+
+
+def test_scenario_runs_until_max_turns_and_records_each_turn(monkeypatch):
+    calls = []
+    monkeypatch.setattr(engine, "director_turn", _fake_director(calls))
+    record = asyncio.run(simulate.run_scenario("Medium", 0, _args(), None, "test"))
+
+    assert record["error"] is None and record["ended_by"] == "max_turns"
+    assert [c[:2] for c in calls] == [("0", True), ("1", False), ("2", False), ("3", False)]
+    assert [t["turn"] for t in record["turns"]] == [0, 1, 2, 3]
+    assert record["turns"][0]["reply"] is None
+    assert record["turns"][1]["reply"] in simulate.SCRIPTED_REPLIES
+    # The trainee's reply is part of the next prompt's history
+    assert record["turns"][1]["reply"] in calls[2][2]
+
+
+def test_scenario_stops_on_monitor_decision_and_records_errors(monkeypatch):
+    monkeypatch.setattr(engine, "director_turn", _fake_director([], should_end=True))
+    record = asyncio.run(simulate.run_scenario("Lett", 1, _args(), None, "test"))
+    assert (record["ended_by"], record["result"], len(record["turns"])) == ("monitor", "Løst", 2)
+
+    async def failing(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(engine, "director_turn", failing)
+    record = asyncio.run(simulate.run_scenario("Lett", 2, _args(), None, "test"))
+    assert record["error"] == "RuntimeError: boom" and record["ended_by"] is None
+
+
+def test_scripted_trainee_is_reproducible():
+    first = simulate.ScriptedTrainee("1-Lett-0")
+    second = simulate.ScriptedTrainee("1-Lett-0")
+    replies = [asyncio.run(first.reply([], {}, None)) for _ in range(5)]
+    assert replies == [asyncio.run(second.reply([], {}, None)) for _ in range(5)]
+
+
+def test_llm_trainee_runs_under_its_own_stage_and_session(monkeypatch):
+    calls = []
+
+    async def run_agent(agent, prompt, ctx, run_config=None, stage=None):
+        calls.append((agent, ctx, stage))
+        return Namespace(final_output=" Beklager! ")
+
+    monkeypatch.setattr(simulate, "run_agent", run_agent)
+    ctx = {"session_id": "sim-lett-0", "scenario_id": "abc"}
+    assert asyncio.run(simulate.LlmTrainee().reply([], ctx, None)) == "Beklager!"
+    agent, trainee_ctx, stage = calls[0]
+    assert agent is simulate.trainee_agent and stage == "trainee"
+    assert trainee_ctx == {"session_id": "sim-lett-0:trainee", "scenario_id": "abc"}
+    assert ctx["session_id"] == "sim-lett-0"
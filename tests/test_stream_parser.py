@@ -0,0 +1,53 @@
+import json
+
+from stream_parser import MessageStreamExtractor, iter_message_deltas
+
+
+def _collect(chunks, **kwargs):
+    texts = {}
+    kinds = []
+    for ev in iter_message_deltas(iter(chunks), **kwargs):
+        kinds.append(ev.kind)
+        if ev.kind == "delta":
+            name, role, text = texts.get(ev.index, (ev.name, ev.role, ""))
+            texts[ev.index] = (name, role, text + ev.text)
+    return kinds, texts
+
+
+def _split(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_extracts_meldinger_content_across_chunk_boundaries():
+    doc = {
+        "oppdrag": None,
+        "meldinger": [
+            {"name": "Scene", "role": "system", "content": "Lang kø.\nLukt av \"kaffe\" ☕"},
+            {"name": "Kari", "role": "customer", "content": "Hei!"},
+        ],
+        "scenarioresultat": {"name": "Scenarioresultat", "role": "system", "content": "ikke strømmet"},
+    }
+    for size in (1, 4, 50):
+        kinds, texts = _collect(_split(json.dumps(doc), size))
+        assert [k for k in kinds if k != "delta"] == ["start", "end", "start", "end"]
+        assert texts[0] == ("Scene", "system", "Lang kø.\nLukt av \"kaffe\" ☕")
+        assert texts[1] == ("Kari", "customer", "Hei!")
+
+
+def test_single_message_object_in_code_fence():
+    raw = "```json\n" + json.dumps({"name": "Ola", "role": "customer", "content": "Feil kaffe"}) + "\n```"
+    _, texts = _collect(_split(raw, 3))
+    assert texts == {0: ("Ola", "customer", "Feil kaffe")}
+
+
+def test_plain_text_uses_default_speaker():
+    kinds, texts = _collect(["Jeg har ", "ventet lenge."], default_name="Scene", default_role="system")
+    assert kinds[0] == "start" and kinds[-1] == "end"
+    assert texts == {0: ("Scene", "system", "Jeg har ventet lenge.")}
+
+
+def test_feed_reports_partial_content_before_string_closes():
+    extractor = MessageStreamExtractor()
+    events = extractor.feed('{"meldinger": [{"name": "Kari", "role": "customer", "content": "Hei, je')
+    assert [e.kind for e in events] == ["start", "delta"]
+    assert events[-1].text == "Hei, je"
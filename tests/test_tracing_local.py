@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from agents import custom_span, set_trace_processors
+
+import tracing_local
+from tracing_local import build_tree, read_traces, span, span_label, turn_trace
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    tracing_local.install(path)
+    yield path
+    tracing_local._processor = None
+    set_trace_processors([])
+
+
+def test_span_label_formats_sdk_span_types():
+    assert span_label({"type": "agent", "name": "Scenarioleder"}) == "agent Scenarioleder"
+    assert span_label({"type": "handoff", "from_agent": "Scenarioleder", "to_agent": "Kunde Agent"}) == (
+        "handoff Scenarioleder → Kunde Agent"
+    )
+    assert span_label({"type": "custom", "name": "build_input"}) == "build_input"
+    assert span_label({"type": "response"}) == "response"
+
+
+def test_build_tree_nests_children_by_parent_and_drops_payloads():
+    spans = [
+        {"id": "b", "parent_id": "a", "started_at": "2025-01-01T00:00:00.200000",
+         "ended_at": "2025-01-01T00:00:00.300000", "span_data": {"type": "response", "input": "x"}},
+        {"id": "a", "parent_id": None, "started_at": "2025-01-01T00:00:00.100000",
+         "ended_at": "2025-01-01T00:00:00.900000", "span_data": {"type": "agent", "name": "Scenarioleder"}},
+    ]
+    roots = build_tree(spans)
+    assert [n["label"] for n in roots] == ["agent Scenarioleder"]
+    child = roots[0]["children"][0]
+    assert child["label"] == "response"
+    assert child["duration_ms"] == pytest.approx(100.0, abs=0.5)
+    assert "input" not in child["data"]
+
+
+def test_span_is_noop_outside_a_trace():
+    with span("build_input") as info:
+        assert info is None
+
+
+def test_turn_trace_writes_one_line_with_nested_spans(trace_file):
+    with turn_trace("Kriseøvelse tur", "abc123", turn=2):
+        with span("build_input", history=3) as info:
+            info["tokens"] = 42
+            with custom_span("inner"):
+                pass
+
+    (record,) = read_traces(trace_file)
+    assert record["workflow"] == "Kriseøvelse tur"
+    assert record["group_id"] == "abc123"
+    assert record["metadata"] == {"turn": "2"}
+    (root,) = record["spans"]
+    assert root["label"] == "build_input"
+    assert root["data"]["data"] == {"history": 3, "tokens": 42}
+    assert [c["label"] for c in root["children"]] == ["inner"]
+
+
+def test_trace_waits_for_spans_that_outlive_it(trace_file):
+    with turn_trace("Kriseøvelse tur") as current:
+        late = custom_span("end_monitor", parent=current)
+        late.start()
+    assert read_traces(trace_file) == []  # still waiting for the monitor
+
+    late.finish()
+    (record,) = read_traces(trace_file)
+    assert [n["label"] for n in record["spans"]] == ["end_monitor"]
+    with open(trace_file, encoding="utf-8") as fh:
+        assert len([json.loads(line) for line in fh]) == 1
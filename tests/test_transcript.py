@@ -0,0 +1,40 @@
+import json
+
+from transcript import Message, Transcript, messages_json
+
+
+def _msgs(n):
+    return [{"name": "Kari", "role": "customer", "content": f"Melding {i} – «kald kaffe»"} for i in range(n)]
+
+
+def test_transcript_converts_dicts_and_reads_like_them():
+    history = Transcript(_msgs(1))
+    history.append({"name": "Ola", "role": "employee", "content": "Beklager"})
+    history.extend(_msgs(2))
+    assert all(isinstance(m, Message) for m in history)
+    assert history[1]["name"] == "Ola" and history[1].get("role") == "employee"
+    assert history[1].get("missing", "x") == "x"
+    assert history[0] == _msgs(1)[0]
+    assert isinstance(history[1:], list) and len(history[1:]) == 3
+
+
+def test_role_and_name_are_shared_strings():
+    a, b = Transcript(json.loads(json.dumps(_msgs(2))))
+    assert a.role is b.role and a.name is b.name
+
+
+def test_messages_json_matches_json_dumps():
+    history = _msgs(3)
+    transcript = Transcript(history)
+    assert messages_json(transcript) == json.dumps(history, ensure_ascii=False)
+    assert messages_json(history[:1]) == json.dumps(history[:1], ensure_ascii=False)
+    assert messages_json([]) == "[]"
+
+
+def test_release_json_drops_cache_of_summarized_messages():
+    transcript = Transcript(_msgs(3))
+    messages_json(transcript)
+    transcript.release_json(2)
+    assert [m._json is None for m in transcript] == [True, True, False]
+    transcript.release_json(-5)  # never clears from the end
+    assert transcript[2]._json is not None
@@ -1,4 +1,7 @@
+import state
 import ui_components
+import views.chat_page as chat_page
+from config import CHAT_PAGE_SIZE
 
 
 class Dummy:
@@ -55,3 +58,89 @@ def test_external_badge_renders_link(monkeypatch):
     assert "https://example.com" in captured["text"]
     assert captured["unsafe"]
 
+
+
+def test_sanitize_name_strips_role_wrappers():
+    assert ui_components.sanitize_name("Kunde (Kari)", "customer") == "Kari"
+    assert ui_components.sanitize_name("Kari (kunde)", "customer") == "Kari"
+    assert ui_components.sanitize_name("Ola (Kollega)", "employee") == "Ola"
+    assert ui_components.sanitize_name("Nora", "customer") == "Nora"
+
+
+def test_build_message_view_resolves_once_per_message():
+    st = ui_components.st
+    st.session_state.clear()
+    st.session_state.user_name = "Ola"
+
+    scene = ui_components.build_message_view("system", "Scene")
+    assert scene.box_kind == "scene"
+
+    own = ui_components.build_message_view("employee", "Ola")
+    assert own.streamlit_role == "user" and own.header_text == "Ola"
+
+    customer = ui_components.build_message_view("customer", "Kari")
+    assert customer.streamlit_role == "assistant"
+    assert customer.header_text == "Kari (kunde)"
+    # The first customer name is pinned for the rest of the session
+    assert ui_components.build_message_view("customer", "Kunde").header_text == "Kari (kunde)"
+
+
+def test_history_views_catch_up_with_history():
+    st = ui_components.st
+    st.session_state.clear()
+    st.session_state.history = [{"name": "Scene", "role": "system", "content": "x"}]
+    views = ui_components.history_views()
+    assert len(views) == 1
+    st.session_state.history.append({"name": "Kari", "role": "customer", "content": "y"})
+    assert ui_components.history_views()[-1].header_text == "Kari (kunde)"
+    st.session_state.history = []
+    assert ui_components.history_views() == []
+
+
+def _windowed_history(monkeypatch, messages, window, clicked=False):
+    """Run the chat page's static history render; returns what it rendered."""
+    st = ui_components.st
+    st.session_state.clear()
+    st.session_state.user_name = "Ola"
+    st.session_state.history = [
+        {"name": "Kari", "role": "customer", "content": f"Melding {i}"} for i in range(messages)
+    ]
+    st.session_state.chat_window = window
+    rendered, buttons, reruns = [], [], []
+    monkeypatch.setattr(chat_page, "CHAT_PAGE_SIZE", 2)
+    monkeypatch.setattr(
+        ui_components, "render_chat_message", lambda role, name, content, view=None: rendered.append(content)
+    )
+    monkeypatch.setattr(st, "button", lambda label, **kwargs: buttons.append(label) or clicked)
+    monkeypatch.setattr(st, "rerun", lambda: reruns.append(True))
+    chat_page._render_static_history()
+    return rendered, buttons, reruns
+
+
+def test_history_window_renders_only_the_newest_messages(monkeypatch):
+    rendered, buttons, reruns = _windowed_history(monkeypatch, messages=5, window=2)
+    assert rendered == ["Melding 3", "Melding 4"]
+    assert buttons == ["Vis eldre meldinger (3)"] and not reruns
+    assert ui_components.st.session_state.chat_static_len == 5
+
+    rendered, buttons, _ = _windowed_history(monkeypatch, messages=2, window=2)
+    assert rendered == ["Melding 0", "Melding 1"] and buttons == []
+
+
+def test_show_older_messages_grows_the_window_by_a_page(monkeypatch):
+    _, _, reruns = _windowed_history(monkeypatch, messages=5, window=2, clicked=True)
+    assert ui_components.st.session_state.chat_window == 4 and reruns
+
+    rendered, buttons, _ = _windowed_history(monkeypatch, messages=5, window=4)
+    assert rendered == [f"Melding {i}" for i in range(1, 5)]
+    assert buttons == ["Vis eldre meldinger (1)"]
+
+
+def test_new_scenario_resets_the_history_window():
+    st = ui_components.st
+    st.session_state.clear()
+    st.session_state.chat_window = CHAT_PAGE_SIZE * 3
+    st.session_state.chat_static_len = 90
+    state.restart_chat()
+    assert st.session_state.chat_window == CHAT_PAGE_SIZE
+    assert st.session_state.chat_static_len == 0
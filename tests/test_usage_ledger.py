@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from usage_ledger import UsageLedger, usage_of
+
+
+def _result(input_tokens, output_tokens, cached=0, responses=1):
+    usage = SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        input_tokens_details=SimpleNamespace(cached_tokens=cached),
+    )
+    return SimpleNamespace(raw_responses=[None] * responses, context_wrapper=SimpleNamespace(usage=usage))
+
+
+def test_usage_of_reads_run_usage_and_tolerates_missing_usage():
+    assert usage_of(_result(100, 20, cached=64, responses=2)) == (2, 100, 20, 64)
+    assert usage_of(SimpleNamespace(final_output="x")) == (1, 0, 0, 0)
+
+
+def test_ledger_books_calls_per_session_scenario_and_agent():
+    ledger = UsageLedger()
+    ledger.record("s1", "a", "Scenarioleder", "gpt", _result(1000, 200, cached=512, responses=2), 1.5)
+    ledger.record("s1", "a", "Avslutningsvakt", "mini", _result(300, 30), 0.5)
+    ledger.record("s1", "b", "Scenarioleder", "gpt", _result(1100, 150), 1.0)
+
+    scenario = ledger.scenario("s1", "a")
+    assert (scenario.calls, scenario.responses, scenario.input_tokens, scenario.cached_tokens) == (2, 3, 1300, 512)
+    assert scenario.seconds == 2.0
+    assert ledger.scenario("s1", "missing").calls == 0
+    session = ledger.session("s1")
+    assert session.total.tokens == 2780 and set(session.scenarios) == {"a", "b"}
+    assert ledger.by_agent()[("Scenarioleder", "gpt")].calls == 2
+    assert ledger.totals().output_tokens == 380
+
+
+def test_heaviest_sessions_first_and_old_sessions_dropped():
+    ledger = UsageLedger(max_sessions=2)
+    ledger.record("small", "x", "a", "m", _result(10, 1), 0.1)
+    ledger.record("big", "x", "a", "m", _result(5000, 100), 0.1)
+    ledger.record("mid", "x", "a", "m", _result(500, 10), 0.1)
+    assert [e.session_id for e in ledger.heaviest()] == ["big", "mid"]
+    assert ledger.session("small") is None
+    assert ledger.totals().calls == 3  # process-wide totals keep dropped sessions
@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from agents import custom_span, get_current_trace, set_trace_processors, trace
+from agents.tracing import Span, Trace, TracingProcessor
+
+from config import TRACE_LOG_PATH
+
+# Prompts and completions stay out of the log; span timing and structure is
+# what the viewer needs, and it keeps lines small.
+_DROPPED_KEYS = ("input", "output")
+
+
+def _parse_ts(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def span_label(data: Dict[str, Any]) -> str:
+    """Short human-readable name for an exported span."""
+    kind = data.get("type", "span")
+    if kind == "handoff":
+        return f"handoff {data.get('from_agent')} → {data.get('to_agent')}"
+    if kind == "guardrail":
+        return f"guardrail {data.get('name')}" + (" (utløst)" if data.get("triggered") else "")
+    if kind == "generation":
+        return f"generation {data.get('model') or ''}".strip()
+    if kind == "custom":
+        return str(data.get("name", kind))
+    return f"{kind} {data['name']}" if data.get("name") else kind
+
+
+def build_tree(spans: List[Dict[str, Any]], trace_start: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Nest exported spans by ``parent_id``; children sorted by start time."""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for raw in spans:
+        data = {k: v for k, v in (raw.get("span_data") or {}).items() if k not in _DROPPED_KEYS}
+        start, end = _parse_ts(raw.get("started_at")), _parse_ts(raw.get("ended_at"))
+        nodes[raw["id"]] = {
+            "id": raw["id"],
+            "parent_id": raw.get("parent_id"),
+            "label": span_label(data),
+            "type": data.get("type"),
+            "data": data,
+            "start": start,
+            "offset_ms": round((start - trace_start) * 1000, 1) if start and trace_start else None,
+            "duration_ms": round((end - start) * 1000, 1) if start and end else None,
+            "error": raw.get("error"),
+            "children": [],
+        }
+    roots: List[Dict[str, Any]] = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_id"] or "")
+        (parent["children"] if parent else roots).append(node)
+    by_start = lambda n: n["start"] or 0  # noqa: E731
+    roots.sort(key=by_start)
+    for node in nodes.values():
+        node["children"].sort(key=by_start)
+    for node in nodes.values():
+        node.pop("start")
+        node.pop("parent_id")
+    return roots
+
+
+class _PendingTrace:
+    __slots__ = ("export", "started", "ended", "spans", "open")
+
+    def __init__(self, export: Dict[str, Any]) -> None:
+        self.export = export
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.open = 0
+
+
+class JsonlTraceProcessor(TracingProcessor):
+    """Write each finished trace as one JSON line with its span tree.
+
+    A trace is written once it has ended and all of its spans have ended, so
+    spans that outlive the turn (the background end monitor) are still
+    included. Nothing is sent anywhere; the file is only appended to.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _PendingTrace] = {}
+
+    def on_trace_start(self, trace: Trace) -> None:
+        with self._lock:
+            self._pending[trace.trace_id] = _PendingTrace(trace.export() or {})
+
+    def on_trace_end(self, trace: Trace) -> None:
+        with self._lock:
+            pending = self._pending.get(trace.trace_id)
+            if pending is None:
+                return
+            pending.ended = time.time()
+            done = self._pop_if_done(trace.trace_id)
+        if done:
+            self._write(done)
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        with self._lock:
+            pending = self._pending.get(span.trace_id)
+            if pending is not None:
+                pending.open += 1
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        exported = span.export()
+        with self._lock:
+            pending = self._pending.get(span.trace_id)
+            if pending is None or exported is None:
+                return
+            pending.spans.append(exported)
+            pending.open -= 1
+            done = self._pop_if_done(span.trace_id)
+        if done:
+            self._write(done)
+
+    def shutdown(self) -> None:
+        self.force_flush()
+
+    def force_flush(self) -> None:
+        """Write every trace that has ended, even with spans still open."""
+        with self._lock:
+            ended = [tid for tid, p in self._pending.items() if p.ended is not None]
+            done = [self._pending.pop(tid) for tid in ended]
+        for pending in done:
+            self._write(pending)
+
+    def _pop_if_done(self, trace_id: str) -> Optional[_PendingTrace]:
+        pending = self._pending[trace_id]
+        if pending.ended is None or pending.open > 0:
+            return None
+        return self._pending.pop(trace_id)
+
+    def _write(self, pending: _PendingTrace) -> None:
+        ended = max([pending.ended or 0.0] + [_parse_ts(s.get("ended_at")) or 0.0 for s in pending.spans])
+        record = {
+            "trace_id": pending.export.get("id"),
+            "workflow": pending.export.get("workflow_name"),
+            "group_id": pending.export.get("group_id"),
+            "metadata": pending.export.get("metadata") or {},
+            "started_at": datetime.fromtimestamp(pending.started).isoformat(),
+            "duration_ms": round((ended - pending.started) * 1000, 1),
+            "spans": build_tree(pending.spans, pending.started),
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+        except OSError:
+            pass  # tracing must never break a turn
+
+
+_install_lock = threading.Lock()
+_processor: Optional[JsonlTraceProcessor] = None
+
+
+def install(path: Optional[str] = TRACE_LOG_PATH) -> Optional[JsonlTraceProcessor]:
+    """Route SDK traces to the local JSONL file (idempotent).
+
+    Replaces the SDK's default exporter, so no trace data leaves the process.
+    With *path* ``None`` local tracing is off and the SDK is left untouched.
+    """
+    global _processor
+    if not path:
+        return None
+    with _install_lock:
+        if _processor is None or _processor.path != path:
+            _processor = JsonlTraceProcessor(path)
+            set_trace_processors([_processor])
+        return _processor
+
+
+@contextmanager
+def turn_trace(workflow: str, group_id: Optional[str] = None, **metadata: Any) -> Iterator[Optional[Trace]]:
+    """Group every agent run and render step inside the block into one trace."""
+    if _processor is None:
+        yield None
+        return
+    meta = {k: str(v) for k, v in metadata.items()}
+    with trace(workflow, group_id=group_id or None, metadata=meta) as current:
+        yield current
+
+
+@contextmanager
+def span(name: str, **data: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """Time the block as a custom span when a trace is active.
+
+    Yields the span's data dict (or ``None`` outside a trace) so callers can
+    attach results, e.g. ``info["path"] = ...``.
+    """
+    if get_current_trace() is None:
+        yield None
+        return
+    with custom_span(name, data=dict(data)) as current:
+        yield current.span_data.data
+
+
+def read_traces(path: Optional[str] = TRACE_LOG_PATH, limit: int = 50) -> List[Dict[str, Any]]:
+    """Return the last *limit* traces from *path*, newest first."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fh:
+        lines = fh.readlines()[-limit:]
+    traces = []
+    for line in reversed(lines):
+        try:
+            traces.append(json.loads(line))
+        except ValueError:
+            continue
+    return traces
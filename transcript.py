@@ -0,0 +1,97 @@
+import json
+import sys
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+_FIELDS = ("name", "role", "content")
+
+
+class Message:
+    """One transcript message; reads like the ``{"name", "role", "content"}`` dict.
+
+    Role and name come from a handful of values and are interned, so every
+    message shares the same string objects. The JSON form used in prompts is
+    built once on first use.
+    """
+
+    __slots__ = ("name", "role", "content", "_json")
+
+    def __init__(self, name: str, role: str, content: str) -> None:
+        self.name = sys.intern(str(name or ""))
+        self.role = sys.intern(str(role or ""))
+        self.content = str(content or "")
+        self._json: Optional[str] = None
+
+    @classmethod
+    def of(cls, msg: Union["Message", Dict[str, Any]]) -> "Message":
+        if isinstance(msg, Message):
+            return msg
+        return cls(msg.get("name", ""), msg.get("role", ""), msg.get("content", ""))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in _FIELDS else default
+
+    def __getitem__(self, key: str) -> str:
+        if key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Message, dict)):
+            return all(self.get(k) == other.get(k) for k in _FIELDS) and (
+                not isinstance(other, dict) or len(other) == len(_FIELDS)
+            )
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Message({self.name!r}, {self.role!r}, {self.content!r})"
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"name": self.name, "role": self.role, "content": self.content}
+
+    def json(self) -> str:
+        if self._json is None:
+            self._json = json.dumps(self.to_dict(), ensure_ascii=False)
+        return self._json
+
+
+class Transcript(list):
+    """Session history as a list of ``Message`` (dicts are converted on add).
+
+    Also holds what used to be scattered over session keys: the persona
+    names pinned for this scenario (``names``) and one shared view-model per
+    distinct role and name (``views``), so the per-message view list only
+    holds references.
+    """
+
+    __slots__ = ("names", "views", "_released")
+
+    def __init__(self, messages: Iterable[Union[Message, Dict[str, Any]]] = ()) -> None:
+        super().__init__(Message.of(m) for m in messages)
+        self.names: Dict[str, str] = {}
+        self.views: Dict[Tuple[str, str], Any] = {}
+        self._released = 0
+
+    def release_json(self, before: int) -> None:
+        """Drop the cached JSON of messages before *before* (out of the prompt window)."""
+        before = min(max(0, before), len(self))
+        for msg in self[self._released : before]:
+            msg._json = None
+        self._released = max(self._released, before)
+
+    def append(self, msg: Union[Message, Dict[str, Any]]) -> None:
+        super().append(Message.of(msg))
+
+    def extend(self, messages: Iterable[Union[Message, Dict[str, Any]]]) -> None:
+        super().extend(Message.of(m) for m in messages)
+
+    def insert(self, index: int, msg: Union[Message, Dict[str, Any]]) -> None:
+        super().insert(index, Message.of(msg))
+
+
+def messages_json(messages: Sequence[Union[Message, Dict[str, Any]]]) -> str:
+    """``json.dumps(messages, ensure_ascii=False)``, reusing cached message JSON."""
+    return "[" + ", ".join(
+        m.json() if isinstance(m, Message) else json.dumps(m, ensure_ascii=False) for m in messages
+    ) + "]"
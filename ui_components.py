@@ -1,9 +1,11 @@
 import random
-from typing import Dict
+import re
+from typing import Dict, Iterable, List, MutableMapping, NamedTuple, Optional, Union
 
 import streamlit as st
 
 from config import PERSONA_THEME, ROLE_TO_FALLBACK_NAME, ROLE_LABEL_NB
+from tracing_local import span
 
 
 def inject_css():
@@ -144,19 +146,17 @@ def role_label(role: str) -> str:
     return ROLE_LABEL_NB.get(role, role)
 
 
+_WRAPPED_NAME = re.compile(r"^(Kunde|Student|Kollega|Bystander|Scene|Forteller)\s*\(([^)]+)\)$")
+_ROLE_SUFFIX = re.compile(r"(?:\s*\((?:kunde|student|kollega|bystander)\))+$", re.IGNORECASE)
+
+
 def sanitize_name(display_name: str, role: str) -> str:
     if not display_name:
         return display_name
-    import re
-
-    m = re.match(r"^(Kunde|Student|Kollega|Bystander|Scene|Forteller)\s*\(([^)]+)\)$", display_name)
+    m = _WRAPPED_NAME.match(display_name)
     if m:
         return m.group(2).strip()
-    display_name = re.sub(r"\s*\(kunde\)$", "", display_name, flags=re.IGNORECASE)
-    display_name = re.sub(r"\s*\(student\)$", "", display_name, flags=re.IGNORECASE)
-    display_name = re.sub(r"\s*\(kollega\)$", "", display_name, flags=re.IGNORECASE)
-    display_name = re.sub(r"\s*\(bystander\)$", "", display_name, flags=re.IGNORECASE)
-    return display_name
+    return _ROLE_SUFFIX.sub("", display_name)
 
 
 # Simple Norwegian name pool used when models return generic role names
@@ -167,86 +167,143 @@ _NB_NAMES = [
 ]
 
 
+def _persona_names() -> MutableMapping[str, str]:
+    """Names pinned for this scenario: on the transcript, else in session state."""
+    names = getattr(st.session_state.get("history"), "names", None)
+    return st.session_state if names is None else names
+
+
 def _get_or_create_role_random_name(role: str) -> str:
+    names = _persona_names()
     key = "_rand_name_" + (role or "")
-    if key not in st.session_state:
-        st.session_state[key] = random.choice(_NB_NAMES)
-    return st.session_state[key]
+    if key not in names:
+        names[key] = random.choice(_NB_NAMES)
+    return names[key]
+
+
+_GENERIC_NAMES = frozenset({
+    "kunde", "customer", "kollega", "employee", "medarbeider", "bystander",
+    "forbipasserende", "student", "scene", "forteller", "system", "user",
+    "ditt svar", "ansatt",
+})
 
 
 def _is_generic_name(name: str, role: str) -> bool:
     if not name:
         return True
     n = str(name).strip().lower()
-    generic = {
-        "kunde", "customer", "kollega", "employee", "medarbeider", "bystander",
-        "forbipasserende", "student", "scene", "forteller", "system", "user",
-        "ditt svar", "ansatt",
-    }
     fallback = ROLE_TO_FALLBACK_NAME.get(role, "").strip().lower()
     if role == "customer" and "kunde" in n:
         return True
-    return n in generic or (fallback and n == fallback.lower())
+    return n in _GENERIC_NAMES or (fallback and n == fallback.lower())
 
 
-def render_center_box(kind: str, content: str) -> None:
-    _, mid, _ = st.columns([1, 2, 1])
-    with mid:
-        if kind == "scene":
-            st.info(content)
-        elif kind == "result":
-            st.success(content)
-        elif kind == "feedback":
-            st.warning(content)
-        else:
-            st.info(content)
+_ROLE_THEME_KEY = {
+    "customer": "Kunde",
+    "student": "Student",
+    "employee": "Kollega",
+    "bystander": "Bystander",
+    "system": "Scene",
+}
+
+_BOX_KIND = {
+    "Scene": "scene",
+    "Forteller": "scene",
+    "Scenario-resultat": "result",
+    "Scenarioresultat": "result",
+    "Tilbakemelding": "feedback",
+}
+
+
+class MessageView(NamedTuple):
+    """Everything a renderer needs besides the content, resolved once.
+
+    ``box_kind`` is set for system messages shown as a center box; otherwise
+    the message is a chat bubble with ``streamlit_role``, ``avatar`` and
+    ``header_text``.
+    """
 
+    box_kind: Optional[str]
+    streamlit_role: str = "assistant"
+    avatar: str = ""
+    header_text: str = ""
 
-def render_chat_message(role: str, name: str, content: str) -> None:
+
+def build_message_view(role: str, name: str) -> MessageView:
+    """Resolve display name, avatar, chat role and box kind for a message.
+
+    Call this once when a message is appended to history: it pins persona
+    names for the session (``_fixed_name_*``), so renderers can reuse the
+    result on every rerun without any string processing.
+    """
     user_name = st.session_state.get("user_name", "")
     persona_name = (name or ROLE_TO_FALLBACK_NAME.get(role, "")).strip() or "_default"
-    role_theme_key = {
-        "customer": "Kunde",
-        "student": "Student",
-        "employee": "Kollega",
-        "bystander": "Bystander",
-        "system": "Scene",
-    }.get(role, "_default")
-    theme = PERSONA_THEME.get(role_theme_key, PERSONA_THEME["_default"])
+    if role == "system" and persona_name in _BOX_KIND:
+        return MessageView(_BOX_KIND[persona_name])
+
+    theme = PERSONA_THEME.get(_ROLE_THEME_KEY.get(role, "_default"), PERSONA_THEME["_default"])
     if user_name and persona_name == user_name and role == "employee":
         theme = PERSONA_THEME["_you"]
 
     display_name = sanitize_name(persona_name, role)
-
-    if role == "system" and persona_name in ("Scene", "Forteller"):
-        render_center_box("scene", content)
-        return
-    if role == "system" and persona_name in ("Scenario-resultat", "Scenarioresultat"):
-        render_center_box("result", content)
-        return
-    if role == "system" and persona_name == "Tilbakemelding":
-        render_center_box("feedback", content)
-        return
-
     streamlit_role = _role_to_streamlit(role, persona_name, user_name)
     is_self = streamlit_role == "user"
 
     # Stabilize persona names across the session to avoid mid-run renaming.
     if not is_self:
+        names = _persona_names()
         fixed_key = f"_fixed_name_{role}"
-        fixed = st.session_state.get(fixed_key)
+        fixed = names.get(fixed_key)
         if fixed:
             display_name = fixed
         else:
             if _is_generic_name(display_name, role):
                 display_name = _get_or_create_role_random_name(role)
             # Persist the first seen non-generic or chosen fallback as the fixed name
-            st.session_state[fixed_key] = display_name
+            names[fixed_key] = display_name
     header_text = display_name if is_self else f"{display_name} ({role_label(role)})"
+    return MessageView(None, streamlit_role, theme["avatar"], header_text)
+
+
+def _center_box(target, kind: str, content: str) -> None:
+    if kind == "result":
+        target.success(content)
+    elif kind == "feedback":
+        target.warning(content)
+    else:
+        target.info(content)
+
+
+def render_center_box(kind: str, content: str) -> None:
+    _, mid, _ = st.columns([1, 2, 1])
+    with mid:
+        _center_box(st, kind, content)
 
-    with st.chat_message(streamlit_role, avatar=theme["avatar"]):
+
+def stream_center_box(kind: str, chunks: Iterable[str]) -> str:
+    """Grow a center box in place as *chunks* arrive; returns the full text."""
+    _, mid, _ = st.columns([1, 2, 1])
+    text = ""
+    with mid:
+        box = st.empty()
+        for chunk in chunks:
+            text += chunk
+            _center_box(box, kind, text)
+    return text
+
+
+def render_chat_message(
+    role: str, name: str, content: str, view: Optional[MessageView] = None
+) -> None:
+    if view is None:
+        view = build_message_view(role, name)
+    if view.box_kind:
+        render_center_box(view.box_kind, content)
+        return
+
+    with st.chat_message(view.streamlit_role, avatar=view.avatar):
         # Subtle header then message body
-        st.markdown(f"<div class='msg-header'>{header_text}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='msg-header'>{view.header_text}</div>", unsafe_allow_html=True)
         st.markdown(content)
 
 
@@ -257,58 +314,64 @@ def _stream_chunks(text: str, chunk_size: int = 40):
         yield text[i : i + chunk_size]
 
 
-def stream_chat_message(role: str, name: str, content: str) -> None:
-    """Render a chat message using st.write_stream for progressive display."""
-    user_name = st.session_state.get("user_name", "")
-    persona_name = (name or ROLE_TO_FALLBACK_NAME.get(role, "")).strip() or "_default"
-    role_theme_key = {
-        "customer": "Kunde",
-        "student": "Student",
-        "employee": "Kollega",
-        "bystander": "Bystander",
-        "system": "Scene",
-    }.get(role, "_default")
-    theme = PERSONA_THEME.get(role_theme_key, PERSONA_THEME["_default"])
-    if user_name and persona_name == user_name and role == "employee":
-        theme = PERSONA_THEME["_you"]
-
-    display_name = sanitize_name(persona_name, role)
-
-    # System center boxes are not streamed; render directly
-    if role == "system" and persona_name in ("Scene", "Forteller"):
-        render_center_box("scene", content)
-        return
-    if role == "system" and persona_name in ("Scenario-resultat", "Scenarioresultat"):
-        render_center_box("result", content)
-        return
-    if role == "system" and persona_name == "Tilbakemelding":
-        render_center_box("feedback", content)
-        return
-
-    streamlit_role = _role_to_streamlit(role, persona_name, user_name)
-    is_self = streamlit_role == "user"
-
-    # Stabilize persona names across the session
-    if not is_self:
-        fixed_key = f"_fixed_name_{role}"
-        fixed = st.session_state.get(fixed_key)
-        if fixed:
-            display_name = fixed
-        else:
-            if _is_generic_name(display_name, role):
-                display_name = _get_or_create_role_random_name(role)
-            st.session_state[fixed_key] = display_name
-    header_text = display_name if is_self else f"{display_name} ({role_label(role)})"
-
-    with st.chat_message(streamlit_role, avatar=theme["avatar"]):
-        st.markdown(f"<div class='msg-header'>{header_text}</div>", unsafe_allow_html=True)
-        if hasattr(st, "write_stream"):
-            st.write_stream(_stream_chunks(content))
-        else:
-            st.markdown(content)
-
+def stream_chat_message(
+    role: str,
+    name: str,
+    content: Union[str, Iterable[str]],
+    view: Optional[MessageView] = None,
+) -> None:
+    """Render a chat message using st.write_stream for progressive display.
 
-def render_history(show_meta: bool = True) -> None:
+    *content* is either the full text (replayed in chunks) or an iterator of
+    live text chunks from the model, which are shown as they arrive.
+    """
+    chunks = _stream_chunks(content) if isinstance(content, str) else content
+    if view is None:
+        view = build_message_view(role, name)
+
+    # Live chunks include the model's generation time in this span
+    with span("render.stream_message", role=role, live=not isinstance(content, str)):
+        # System center boxes grow in place instead of using a chat bubble
+        if view.box_kind:
+            stream_center_box(view.box_kind, chunks)
+            return
+
+        with st.chat_message(view.streamlit_role, avatar=view.avatar):
+            st.markdown(f"<div class='msg-header'>{view.header_text}</div>", unsafe_allow_html=True)
+            if hasattr(st, "write_stream"):
+                st.write_stream(chunks)
+            else:
+                st.markdown("".join(chunks))
+
+
+def history_views() -> List[MessageView]:
+    """View-models for ``st.session_state.history``, built once per message.
+
+    Messages appended without a view (or a history that was replaced) are
+    caught up here, so the list always lines up with the history. A
+    ``Transcript`` history shares one view per role and name (the persona
+    name is pinned after its first message, so later views are identical).
+    """
+    history = st.session_state.get("history", [])
+    views = st.session_state.get("history_views")
+    if views is None or len(views) > len(history):
+        views = []
+        st.session_state.history_views = views
+    shared = getattr(history, "views", None)
+    for msg in history[len(views) :]:
+        role, name = msg.get("role", ""), msg.get("name", "")
+        if shared is None:
+            views.append(build_message_view(role, name))
+            continue
+        view = shared.get((role, name))
+        if view is None:
+            view = shared[(role, name)] = build_message_view(role, name)
+        views.append(view)
+    return views
+
+
+def render_history(show_meta: bool = True, start: int = 0) -> None:
+    """Render meta boxes and ``history[start:]`` (pass *start* to window)."""
     if show_meta:
         meta = st.session_state.get("last_meta")
         if meta:
@@ -330,12 +393,11 @@ def render_history(show_meta: bool = True) -> None:
                 m = meta["tilbakemelding"]
                 render_chat_message(m.get("role", "system"), m.get("name", "Tilbakemelding"), str(m.get("content", "")))
 
-    for msg in st.session_state.history:
-        render_chat_message(
-            msg.get("role", ""),
-            msg.get("name", ""),
-            msg.get("content", ""),
-        )
+    history = st.session_state.history
+    views = history_views()
+    with span("render.history", messages=max(0, len(history) - start)):
+        for msg, view in zip(history[start:], views[start:]):
+            render_chat_message(msg.get("role", ""), msg.get("name", ""), msg.get("content", ""), view)
 def render_turn_banner() -> None:
     """Display a banner indicating the user's turn."""
     st.markdown(
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import LEDGER_MAX_SESSIONS
+
+
+# Kinds of booked requests: an agent call's answer, a failed try that was
+# retried (or gave up) and a hedge that lost the race; the provider bills all
+KINDS = ("call", "retry", "hedge_loser")
+
+
+class Totals:
+    """Summed usage of a set of agent calls.
+
+    ``calls`` counts answered agent calls; ``retries`` and ``hedge_losers``
+    count extra requests whose results were discarded. Their (estimated)
+    tokens are included in the token sums, since they are billed too, but
+    ``seconds`` is the time of answered calls only.
+    """
+
+    __slots__ = (
+        "calls", "retries", "hedge_losers", "responses", "input_tokens", "output_tokens", "cached_tokens", "seconds",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.retries = 0
+        self.hedge_losers = 0
+        self.responses = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.seconds = 0.0
+
+    def add(
+        self,
+        responses: int,
+        input_tokens: int,
+        output_tokens: int,
+        cached_tokens: int,
+        seconds: float,
+        kind: str = "call",
+    ) -> None:
+        if kind == "call":
+            self.calls += 1
+            self.seconds += seconds
+        elif kind == "retry":
+            self.retries += 1
+        else:
+            self.hedge_losers += 1
+        self.responses += responses
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cached_tokens += cached_tokens
+
+    @property
+    def tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def copy(self) -> "Totals":
+        other = Totals()
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SessionUsage:
+    """One browser session's usage: overall, per scenario and per agent."""
+
+    __slots__ = ("session_id", "total", "scenarios", "agents", "last_seen")
+
+    def __init__(self, session_id: str) -> None:
+        self.session_id = session_id
+        self.total = Totals()
+        self.scenarios: Dict[str, Totals] = {}
+        self.agents: Dict[Tuple[str, str], Totals] = {}
+        self.last_seen = 0.0
+
+    def copy(self) -> "SessionUsage":
+        other = SessionUsage(self.session_id)
+        other.total = self.total.copy()
+        other.scenarios = {k: v.copy() for k, v in self.scenarios.items()}
+        other.agents = {k: v.copy() for k, v in self.agents.items()}
+        other.last_seen = self.last_seen
+        return other
+
+
+def usage_of(result: Any) -> Tuple[int, int, int, int]:
+    """(responses, input, output, cached tokens) of a finished agent run."""
+    responses = len(getattr(result, "raw_responses", None) or []) or 1
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    if usage is None:
+        return responses, 0, 0, 0
+    cached = getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", 0) or 0
+    return responses, usage.input_tokens or 0, usage.output_tokens or 0, cached
+
+
+class UsageLedger:
+    """Per-session and process-wide token usage and latency of agent calls.
+
+    Calls without a session (pre-generated openings) are booked under the
+    session id ``""``. The least recently active sessions are dropped past
+    *max_sessions*; the process-wide totals keep counting them.
+    """
+
+    def __init__(self, max_sessions: int = LEDGER_MAX_SESSIONS) -> None:
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, SessionUsage]" = OrderedDict()
+        self._total = Totals()
+        self._agents: Dict[Tuple[str, str], Totals] = {}
+
+    def record(
+        self, session_id: str, scenario_id: str, agent: str, model: str, result: Any, seconds: float
+    ) -> None:
+        self.record_usage(session_id, scenario_id, agent, model, usage_of(result), seconds)
+
+    def record_usage(
+        self,
+        session_id: str,
+        scenario_id: str,
+        agent: str,
+        model: str,
+        usage: Tuple[int, int, int, int],
+        seconds: float,
+        kind: str = "call",
+    ) -> None:
+        """Book one request's ``(responses, input, output, cached)`` usage as *kind*."""
+        if kind not in KINDS:
+            raise ValueError(f"unknown usage kind: {kind!r}")
+        values = (*usage, seconds, kind)
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = SessionUsage(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            entry.last_seen = time.time()
+            entry.total.add(*values)
+            entry.scenarios.setdefault(scenario_id, Totals()).add(*values)
+            entry.agents.setdefault((agent, model), Totals()).add(*values)
+            self._total.add(*values)
+            self._agents.setdefault((agent, model), Totals()).add(*values)
+
+    def session(self, session_id: str) -> Optional[SessionUsage]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry.copy() if entry is not None else None
+
+    def scenario(self, session_id: str, scenario_id: str) -> Totals:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            totals = entry.scenarios.get(scenario_id) if entry is not None else None
+            return totals.copy() if totals is not None else Totals()
+
+    def heaviest(self, limit: int = 10) -> List[SessionUsage]:
+        """Sessions with the most tokens, heaviest first."""
+        with self._lock:
+            entries = [entry.copy() for entry in self._sessions.values()]
+        entries.sort(key=lambda e: e.total.tokens, reverse=True)
+        return entries[:limit]
+
+    def totals(self) -> Totals:
+        with self._lock:
+            return self._total.copy()
+
+    def by_agent(self) -> Dict[Tuple[str, str], Totals]:
+        """Process-wide totals per (agent, model)."""
+        with self._lock:
+            return {k: v.copy() for k, v in self._agents.items()}
+
+
+ledger = UsageLedger()
@@ -0,0 +1,229 @@
+import hmac
+import json
+import os
+from typing import Any, Dict, List
+
+import streamlit as st
+from agents.models import get_default_model
+
+import metrics
+from agent_models import tiers
+from config import METRICS_HOST, TRACE_LOG_PATH
+from model_api import ORCHESTRATION_MODES, get_orchestration_mode, set_orchestration_mode
+from tracing_local import read_traces
+from ui_components import chip, page_header
+from usage_ledger import ledger
+
+
+def _details(data: Dict[str, Any]) -> str:
+    if data.get("type") == "custom":
+        return json.dumps(data.get("data") or {}, ensure_ascii=False)
+    if data.get("type") == "response" and data.get("usage"):
+        return json.dumps(data["usage"], ensure_ascii=False)
+    if data.get("type") == "agent" and data.get("output_type"):
+        return f"output: {data['output_type']}"
+    return ""
+
+
+def _flatten(nodes: List[Dict[str, Any]], depth: int = 0) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for node in nodes:
+        rows.append(
+            {
+                "Steg": " " * depth + node["label"],
+                "Start (ms)": node.get("offset_ms"),
+                "Varighet (ms)": node.get("duration_ms"),
+                "Detaljer": _details(node.get("data") or {}) + (" ⚠️ feil" if node.get("error") else ""),
+            }
+        )
+        rows.extend(_flatten(node.get("children") or [], depth + 1))
+    return rows
+
+
+def _trace_label(t: Dict[str, Any]) -> str:
+    meta = t.get("metadata") or {}
+    turn = f" · runde {meta['turn']}" if "turn" in meta else ""
+    return f"{(t.get('started_at') or '')[11:19]} · {t.get('workflow')}{turn} · {t.get('duration_ms', 0):.0f} ms"
+
+
+def _traces_section() -> None:
+    st.subheader("Spor per runde")
+    if not TRACE_LOG_PATH:
+        st.info("Lokal sporing er slått av (TRACE_LOG_PATH = None).")
+        return
+    limit = st.number_input("Antall siste spor", min_value=10, max_value=500, value=50, step=10)
+    traces = read_traces(TRACE_LOG_PATH, limit=int(limit))
+    if not traces:
+        st.info(f"Ingen spor registrert ennå i {TRACE_LOG_PATH}.")
+        return
+
+    idx = st.selectbox("Spor", range(len(traces)), format_func=lambda i: _trace_label(traces[i]))
+    selected = traces[idx]
+    chip("Varighet", f"{selected.get('duration_ms', 0):.0f} ms")
+    if selected.get("group_id"):
+        chip("Scenario", str(selected["group_id"]))
+    for key, value in (selected.get("metadata") or {}).items():
+        chip(key, str(value))
+    st.dataframe(_flatten(selected.get("spans") or []), hide_index=True, use_container_width=True)
+    with st.expander("Rådata (JSON)"):
+        st.json(selected)
+
+
+_MODE_LABELS = {
+    "handoffs": "Handoffs (én modellrunde per persona)",
+    "fast": "Rask (scenarieleder skriver alt i ett kall)",
+}
+
+
+def _orchestration_section() -> None:
+    st.subheader("Orkestrering og modeller")
+    current = get_orchestration_mode()
+    mode = st.radio(
+        "Modus for scenarieleder (gjelder alle økter fra neste runde)",
+        ORCHESTRATION_MODES,
+        index=ORCHESTRATION_MODES.index(current),
+        format_func=lambda m: _MODE_LABELS.get(m, m),
+        horizontal=True,
+    )
+    if mode != current:
+        set_orchestration_mode(mode)
+        st.toast(f"Orkestrering satt til {_MODE_LABELS.get(mode, mode).split(' (')[0].lower()}.")
+    st.dataframe(
+        [
+            {
+                "Rolle": role,
+                "Modell": tier.model or f"standard ({get_default_model()})",
+                "Maks tokens": tier.max_tokens,
+                "Temperatur": tier.temperature,
+            }
+            for role, tier in tiers().items()
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+def _metrics_section() -> None:
+    st.subheader("Metrikker (alle økter)")
+    server = metrics.serve()
+    port = metrics.metrics_port()
+    if server is not None:
+        st.caption(f"Prometheus: http://{METRICS_HOST}:{port}/metrics")
+    elif port is not None:
+        st.caption(f"Port {port} er opptatt; metrikkene vises bare her.")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Aktive økter", int(metrics.ACTIVE_SESSIONS.value()))
+    c2.metric("Modellkall nå", int(metrics.MODEL_CALLS_IN_FLIGHT.total()))
+    c3.metric("Runder startet", int(metrics.TURNS_STARTED.value()))
+    c4.metric("Runder fullført", int(metrics.TURNS_COMPLETED.value()))
+    input_tokens = metrics.MODEL_INPUT_TOKENS.total()
+    if input_tokens:
+        cached = metrics.MODEL_CACHED_INPUT_TOKENS.total()
+        st.caption(
+            f"Prompt-cache: {cached / input_tokens:.0%} av input-tokens hentet fra cache "
+            f"({int(cached):,} av {int(input_tokens):,})".replace(",", " ")
+        )
+    st.button("Oppdater", icon=":material/refresh:")  # any click reruns the page
+    with st.expander("Prometheus-tekst"):
+        st.code(metrics.render(), language="text")
+
+
+def _usage_section() -> None:
+    st.subheader("Tokenforbruk")
+    total = ledger.totals()
+    if not total.calls:
+        st.info("Ingen modellkall registrert ennå.")
+        return
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Input-tokens", f"{total.input_tokens:,}".replace(",", " "))
+    c2.metric("Output-tokens", f"{total.output_tokens:,}".replace(",", " "))
+    c3.metric("Fra cache", f"{total.cached_tokens / max(1, total.input_tokens):.0%}")
+    c4.metric("Snitt per kall", f"{total.seconds / total.calls:.1f} s")
+    if total.retries or total.hedge_losers:
+        st.caption(
+            f"Forkastede forespørsler (fakturert, med i tokensummene): {total.retries} omforsøk, "
+            f"{total.hedge_losers} tapte hedger"
+        )
+    st.dataframe(
+        [
+            {
+                "Agent": agent,
+                "Modell": model,
+                "Kall": t.calls,
+                "Omforsøk": t.retries,
+                "Tapte hedger": t.hedge_losers,
+                "Input": t.input_tokens,
+                "Output": t.output_tokens,
+                "Cache": t.cached_tokens,
+                "Snitt (s)": round(t.seconds / max(1, t.calls), 2),
+            }
+            for (agent, model), t in sorted(ledger.by_agent().items(), key=lambda kv: -kv[1].tokens)
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption("Tyngste økter")
+    st.dataframe(
+        [
+            {
+                "Økt": entry.session_id or "forhåndslagde åpninger",
+                "Scenarioer": len(entry.scenarios),
+                "Kall": entry.total.calls,
+                "Ekstra forespørsler": entry.total.retries + entry.total.hedge_losers,
+                "Input": entry.total.input_tokens,
+                "Output": entry.total.output_tokens,
+                "Cache": entry.total.cached_tokens,
+                "Modelltid (s)": round(entry.total.seconds, 1),
+            }
+            for entry in ledger.heaviest(10)
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+def admin_password() -> str:
+    """The admin secret (``ADMIN_PASSWORD``); empty hides the admin page."""
+    return (st.secrets.get("ADMIN_PASSWORD") if hasattr(st, "secrets") else None) or os.getenv("ADMIN_PASSWORD", "")
+
+
+def _admin_login(password: str) -> bool:
+    """Ask for the admin password; True once this session has entered it."""
+    if st.session_state.get("admin_authenticated"):
+        return True
+    with st.form("admin-login"):
+        entered = st.text_input("Adminpassord", type="password")
+        submitted = st.form_submit_button("Logg inn", type="primary", icon=":material/lock_open:")
+    if submitted:
+        if hmac.compare_digest(entered.encode(), password.encode()):
+            st.session_state.admin_authenticated = True
+            st.rerun()
+        st.warning("Feil passord.")
+    return False
+
+
+def show(defaults: dict):
+    page_header("Kriseøvelse – Admin", "Lokal innsikt i hvor tiden går i hver runde.")
+
+    if st.button("Til start", icon=":material/home:"):
+        st.query_params.clear()
+        st.session_state.page = "start"
+        st.rerun()
+    # The page switches orchestration for every session and shows all
+    # sessions' usage and traces, so it has its own secret, separate from
+    # the trainees' class password, and is off without one
+    password = admin_password()
+    if not password:
+        st.info("Adminsiden er ikke aktivert (ADMIN_PASSWORD er ikke satt).")
+        return
+    if not _admin_login(password):
+        return
+
+    _orchestration_section()
+    st.divider()
+    _metrics_section()
+    st.divider()
+    _usage_section()
+    st.divider()
+    _traces_section()
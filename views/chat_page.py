@@ -1,11 +1,29 @@
-import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 import streamlit as st
 
-from config import CONTEXT_MESSAGES, MAX_TURNS
-from model_api import call_model
+from config import (
+    BACKGROUND_TURNS,
+    CHAT_PAGE_SIZE,
+    JOB_POLL_SEC,
+    MAX_TURNS,
+    STREAM_MODEL_OUTPUT,
+)
+from engine import ScenarioSession
+from metrics import OPENINGS
+from jobs import turn_jobs
+import rate_limit
+from model_api import (
+    TurnOutcome,
+    call_model,
+    get_orchestration_mode,
+    stream_model,
+    submit_turn,
+)
+from resilience import AgentCallFailed
+from opening_pool import pool as opening_pool
 from ui_components import (
+    history_views,
     render_history,
     render_turn_banner,
     page_header,
@@ -14,34 +32,334 @@ from ui_components import (
     stream_chat_message,
 )
 from state import reset_to_start
+from tracing_local import span, turn_trace
 
+# Fragments (Streamlit >= 1.37) rerun only the chat area; older versions
+# fall back to plain functions and full reruns.
+_fragment = getattr(st, "fragment", None) or (lambda func: func)
+# While a turn job or an end decision is pending the chat area reruns every
+# JOB_POLL_SEC; a full rerun switches polling on and off. Without fragments
+# the script waits for the job instead.
+_polling_fragment = (
+    (lambda func: st.fragment(run_every=JOB_POLL_SEC)(func)) if hasattr(st, "fragment") else (lambda func: func)
+)
 
-def _build_input(user_text: str) -> str:
-    context = st.session_state.history[-CONTEXT_MESSAGES:]
-    history_json = json.dumps(context, ensure_ascii=False)
-    user_name = st.session_state.get("user_name", "Ansatt")
-    difficulty = st.session_state.get("difficulty", "")
-    if context:
-        return (
-            "Historikk (JSON-liste av meldinger med name/role/content):\n"
-            f"{history_json}\n\n"
-            f"Bruker: {user_name} | Runde: {st.session_state.turns}/{MAX_TURNS} | Vanskelighetsgrad: {difficulty}. "
-            "Ikke inkluder brukerens melding i output; kun system og andre aktører.\n"
-            f"Brukerens siste svar: {user_text.strip() or 'Start scenen.'}"
-        )
-    return f"Bruker: {user_name} | Runde: 0/{MAX_TURNS} | Vanskelighetsgrad: {difficulty}. Start scenen."
+
+def _scenario() -> ScenarioSession:
+    """The scenario engine over this browser session's state."""
+    return ScenarioSession(
+        st.session_state.get("user_name", ""),
+        st.session_state.get("difficulty", ""),
+        MAX_TURNS,
+        session_id=st.session_state.get("session_id", ""),
+        scenario_id=st.session_state.get("scenario_id", ""),
+        state=st.session_state,
+    )
+
+
+def _build_input(user_text: Optional[str]) -> str:
+    """Director input for *user_text*; ``None`` builds the opening's."""
+    scenario = _scenario()
+    with span("build_input", history=len(scenario.history)) as info:
+        # Also records the per-turn input size, so prompt growth is visible
+        prompt = scenario.opening_input() if user_text is None else scenario.build_input(user_text)
+        if info is not None:
+            info["tokens"] = st.session_state.prompt_tokens[-1]["tokens"]
+    return prompt
+
+
+def _typing_indicator():
+    typing = st.empty()
+    typing.markdown(
+        "<div class='typing-indicator'><span>Jobber</span> "
+        "<span class='typing-dots'><span></span><span></span><span></span></span>"
+        "</div>",
+        unsafe_allow_html=True,
+    )
+    return typing
+
+
+def _stream_turn(compiled: str) -> List[Dict]:
+    """Render model messages live as tokens arrive; return the cleaned list."""
+    typing = _typing_indicator()
+    stream = stream_model(compiled)
+    for msg in stream:
+        typing.empty()
+        stream_chat_message(msg.role, msg.name, msg.chunks)
+    typing.empty()
+    return stream.messages
+
+
+def _append_messages(messages: List[Dict]) -> None:
+    """Append to history and build each message's view-model once."""
+    st.session_state.history.extend(messages)
+    history_views()
+
+
+def _render_static_history() -> None:
+    """Render the transcript as of this full run, newest page(s) only."""
+    history = st.session_state.history
+    shown = st.session_state.get("chat_window", CHAT_PAGE_SIZE)
+    hidden = max(0, len(history) - shown)
+    if hidden:
+        if st.button(
+            f"Vis eldre meldinger ({hidden})",
+            icon=":material/expand_less:",
+            use_container_width=True,
+        ):
+            st.session_state.chat_window = shown + CHAT_PAGE_SIZE
+            st.rerun()
+    render_history(show_meta=False, start=hidden)
+    # Messages appended after this point are rendered by the chat fragment
+    st.session_state.chat_static_len = len(history)
+
+
+def _bootstrap_from_model(compiled: str) -> List[Dict]:
+    if STREAM_MODEL_OUTPUT:
+        return _stream_turn(compiled)
+    typing = _typing_indicator()
+    initial = call_model(compiled)
+    typing.empty()
+    # Stream initial messages
+    for m in initial:
+        # Stream non-system messages; render system (scene) normally
+        if m.get("role") == "system" and m.get("name") in ("Scene", "Forteller"):
+            render_chat_message(m["role"], m["name"], m["content"])
+        else:
+            stream_chat_message(m["role"], m["name"], m["content"])
+    return initial
+
+
+def _opening_failed() -> None:
+    st.session_state.prompt_tokens.clear()
+    st.session_state.turn_error = "Fikk ikke startet scenarioet: modellen svarte ikke i tide."
+
+
+def _abort_turn(user_text: str) -> None:
+    """Undo the trainee's turn after a failed model call so it can be resent."""
+    _scenario().undo_turn()
+    history_views()
+    st.session_state.turn_error = (
+        f"Fikk ikke svar fra modellen i tide, så svaret ditt ble ikke sendt: «{user_text}». Prøv igjen."
+    )
+    st.session_state.awaiting_user = True
+
+
+def _turn_trace():
+    # One trace per inline turn: prompt build, director (guardrail,
+    # handoffs), rendering and the end monitor. Background jobs open their
+    # own trace in submit_turn.
+    return turn_trace(
+        "Kriseøvelse tur",
+        st.session_state.get("scenario_id"),
+        turn=st.session_state.turns,
+        orchestration=get_orchestration_mode(),
+    )
 
 
-def _check_end(messages: List[Dict]) -> bool:
-    meta = st.session_state.get("last_meta")
-    if meta and meta.get("scenarioresultat") and meta.get("tilbakemelding"):
+def _complete_turn(ai_messages: List[Dict], by_monitor: bool = False) -> bool:
+    """Count the answered turn and update end state; True if it ended."""
+    if _scenario().finish_turn(ai_messages, by_monitor):
+        st.session_state.awaiting_user = False
         return True
-    names = {m.get("name", "") for m in messages}
-    return (
-        ("Scenario-resultat" in names)
-        or ("Scenarioresultat" in names)
-        or ("Tilbakemelding" in names)
+    st.session_state.awaiting_user = True
+    return False
+
+
+def _needs_polling() -> bool:
+    """True while a turn job or an end decision is pending."""
+    return bool(st.session_state.get("turn_job") or st.session_state.get("pending_end"))
+
+
+def _play_turn(user_text: str, polling: bool) -> None:
+    st.session_state.awaiting_user = False
+    # Adds the reply and counts the turn; "avslutt scenario" ends it instead
+    if not _scenario().begin_turn(user_text):
+        history_views()
+        st.rerun()
+    user_msg = st.session_state.history[-1]
+    # Immediate echo using the unified renderer
+    render_chat_message(user_msg["role"], user_msg["name"], user_msg["content"], history_views()[-1])
+
+    if BACKGROUND_TURNS:
+        compiled = _build_input(user_text)
+        job = submit_turn(compiled, prompt_tokens=st.session_state.prompt_tokens[-1]["tokens"])
+        st.session_state.turn_job = {"job": job, "user_text": user_text}
+        if not polling:
+            # Full rerun: the polling chat area picks the job up
+            st.rerun()
+        _show_job(st.session_state.turn_job)
+        return
+
+    with _turn_trace():
+        compiled = _build_input(user_text)
+        try:
+            if STREAM_MODEL_OUTPUT:
+                ai_messages = _stream_turn(compiled)
+            else:
+                typing = _typing_indicator()
+                ai_messages = call_model(compiled)
+                typing.empty()
+                # Stream AI messages as they arrive
+                for m in ai_messages:
+                    if m.get("role") == "system" and m.get("name") in ("Scenario-resultat", "Scenarioresultat", "Tilbakemelding"):
+                        render_chat_message(m["role"], m["name"], m["content"])
+                    else:
+                        stream_chat_message(m["role"], m["name"], m["content"])
+        except AgentCallFailed:
+            ai_messages = None
+            _abort_turn(user_text)
+        if ai_messages is not None:
+            _append_messages(ai_messages)
+    if ai_messages is None:
+        # Full rerun drops the partly streamed reply and shows the error
+        st.rerun()
+    # The trainee answers again right away; the end decision is applied by
+    # the polling chat area whenever it arrives
+    if _complete_turn(ai_messages, _scenario().resolve_end(timeout=0)):
+        # The page layout changes (finished banner), so rerun everything
+        st.rerun()
+    if not polling and _needs_polling():
+        st.rerun()
+    render_turn_banner()
+
+
+def _finish_job(pending: Dict) -> bool:
+    """Apply a finished turn job to the session (script thread only).
+
+    Returns True if the page layout changes (failed call or ended scenario).
+    """
+    st.session_state.turn_job = None
+    user_text = pending["user_text"]
+    try:
+        outcome = pending["job"].result()
+    except AgentCallFailed:
+        if user_text is None:
+            _opening_failed()
+        else:
+            _abort_turn(user_text)
+        return True
+    scenario = _scenario()
+    messages = scenario.apply(outcome)
+    history_views()
+    if user_text is None:
+        st.session_state.awaiting_user = True
+        return False
+    # The end decision is usually still pending; check_end applies it later
+    return _complete_turn(messages, scenario.resolve_end(timeout=0))
+
+
+def _show_job(pending: Dict) -> None:
+    """Show a pending job's messages so far (the next poll applies it)."""
+    job = pending["job"]
+    if not hasattr(st, "fragment"):
+        job.wait()
+        st.rerun()
+    for msg in job.progress():
+        render_chat_message(msg["role"], msg["name"], msg["content"] or "…")
+    position = turn_jobs.position(job)
+    if position:
+        st.caption(f"I kø: {position} foran deg.")
+    else:
+        place = rate_limit.position(job)
+        if place:
+            st.caption(f"Mange øver akkurat nå – du er nummer {place} i køen.")
+    _typing_indicator()
+
+
+def _chat_body(polling: bool = False) -> None:
+    """Progress, new messages and input (or the pending turn job).
+
+    Only messages added since the last full run are rendered here, so a turn
+    costs O(new messages) instead of re-rendering the whole transcript.
+    """
+    pending = st.session_state.get("turn_job")
+    if pending and pending["job"].done():
+        # Applied before rendering, so its messages show in this run
+        if _finish_job(pending):
+            st.rerun()
+        pending = None
+    if _scenario().check_end():
+        # The end monitor ended the scenario after the trainee got the input back
+        st.rerun()
+    if polling and not _needs_polling():
+        # Nothing left to wait for: a full rerun stops the polling
+        st.rerun()
+
+    if not st.session_state.get("ended"):
+        progress_turns(
+            st.session_state.get("turns", 0),
+            st.session_state.get("max_turns", MAX_TURNS),
+        )
+    render_history(show_meta=False, start=st.session_state.get("chat_static_len", 0))
+
+    if pending:
+        _show_job(pending)
+        return
+
+    if st.session_state.get("turn_error"):
+        st.warning(st.session_state.turn_error, icon=":material/schedule:")
+        st.session_state.turn_error = ""
+
+    if st.session_state.started and not st.session_state.ended:
+        placeholder = f"Skriv svaret ditt, {st.session_state.user_name or 'ansatt'}…"
+        user_text = st.chat_input(placeholder)
+        if user_text:
+            _play_turn(user_text, polling)
+        elif st.session_state.awaiting_user:
+            render_turn_banner()
+
+
+@_fragment
+def _chat_area() -> None:
+    """The chat area; reruns on its own per turn."""
+    _chat_body()
+
+
+@_polling_fragment
+def _polling_chat_area() -> None:
+    """The chat area while something is pending; polls every JOB_POLL_SEC."""
+    _chat_body(polling=True)
+
+
+def _start_opening() -> None:
+    initial = opening_pool.take(
+        st.session_state.get("active_api_key", ""),
+        st.session_state.get("difficulty", ""),
+        session_id=st.session_state.get("session_id", ""),
     )
+    pool_result = "hit" if initial else "miss"
+    OPENINGS.inc(source="pool" if initial else "model")
+    if not initial and BACKGROUND_TURNS:
+        compiled = _build_input(None)
+        job = submit_turn(
+            compiled, opening_pool=pool_result, prompt_tokens=st.session_state.prompt_tokens[-1]["tokens"]
+        )
+        st.session_state.turn_job = {"job": job, "user_text": None}
+        return
+    with turn_trace(
+        "Kriseøvelse åpning",
+        st.session_state.get("scenario_id"),
+        turn=0,
+        opening_pool=pool_result,
+        orchestration=get_orchestration_mode(),
+    ):
+        if initial:
+            # Pre-warmed opening: show it instantly (no prompt was sent)
+            for m in initial:
+                render_chat_message(m["role"], m["name"], m["content"])
+        else:
+            try:
+                initial = _bootstrap_from_model(_build_input(None))
+            except AgentCallFailed:
+                initial = None
+        if initial is None:
+            _opening_failed()
+        else:
+            _scenario().apply(TurnOutcome(initial, {}, None))
+            history_views()
+            st.session_state.awaiting_user = True
+    st.rerun()
 
 
 def show(defaults: dict):
@@ -77,93 +395,20 @@ def show(defaults: dict):
             ):
                 st.session_state.page = "feedback"
                 st.rerun()
-    else:
-        progress_turns(
-            st.session_state.get("turns", 0),
-            st.session_state.get("max_turns", MAX_TURNS),
-        )
 
     # Bootstrap initial scene (use typing indicator only)
-    if st.session_state.started and not st.session_state.history:
-        compiled = _build_input(f"Start scenen for {st.session_state.user_name}.")
-        typing = st.empty()
-        typing.markdown(
-            "<div class='typing-indicator'><span>Jobber</span> "
-            "<span class='typing-dots'><span></span><span></span><span></span></span>"
-            "</div>",
-            unsafe_allow_html=True,
-        )
-        initial = call_model(compiled)
-        typing.empty()
-        # Stream initial messages
-        for m in initial:
-            # Stream non-system messages; render system (scene) normally
-            if m.get("role") == "system" and m.get("name") in ("Scene", "Forteller"):
-                render_chat_message(m["role"], m["name"], m["content"])
-            else:
-                stream_chat_message(m["role"], m["name"], m["content"])
-            st.session_state.history.append(m)
-        st.session_state.awaiting_user = True
-        st.rerun()
-
-    # Render chat (hide meta on chat page)
-    render_history(show_meta=False)
-
-    if st.session_state.started and not st.session_state.ended:
-        if st.session_state.awaiting_user:
-            render_turn_banner()
-        placeholder = f"Skriv svaret ditt, {st.session_state.user_name or 'ansatt'}…"
-        user_text = st.chat_input(placeholder)
-        if user_text:
-            st.session_state.awaiting_user = False
-            user_msg = {
-                "name": st.session_state.user_name or "Ansatt",
-                "role": "employee",
-                "content": user_text,
-            }
-            st.session_state.history.append(user_msg)
-            # Immediate echo using the unified renderer
-            render_chat_message(user_msg["role"], user_msg["name"], user_msg["content"])
-
-            # Automatic end trigger: user types "end scenario" (or "avslutt scenario")
-            if user_text.strip().lower() in ("end scenario", "avslutt scenario"):
-                st.session_state.last_meta = {
-                    "scenarioresultat": {
-                        "name": "Scenarioresultat",
-                        "role": "system",
-                        "content": "Scenarioet ble avsluttet av brukeren.",
-                    },
-                    "tilbakemelding": {
-                        "name": "Tilbakemelding",
-                        "role": "system",
-                        "content": "Du avsluttet øvelsen manuelt. Reflekter kort over hva som fungerte og hva du vil forbedre neste gang.",
-                    },
-                }
-                st.session_state.ended = True
-                st.session_state.awaiting_user = False
+    if st.session_state.started and not st.session_state.history and not st.session_state.get("turn_job"):
+        if st.session_state.get("turn_error"):
+            st.error(st.session_state.turn_error, icon=":material/schedule:")
+            if st.button("Prøv igjen", icon=":material/refresh:", type="primary"):
+                st.session_state.turn_error = ""
                 st.rerun()
+            return
+        _start_opening()
 
-            st.session_state.turns += 1
-            compiled = _build_input(user_text)
-            typing = st.empty()
-            typing.markdown(
-                "<div class='typing-indicator'><span>Jobber</span> "
-                "<span class='typing-dots'><span></span><span></span><span></span></span>"
-                "</div>",
-                unsafe_allow_html=True,
-            )
-            ai_messages = call_model(compiled)
-            typing.empty()
-            # Stream AI messages as they arrive
-            for m in ai_messages:
-                if m.get("role") == "system" and m.get("name") in ("Scenario-resultat", "Scenarioresultat", "Tilbakemelding"):
-                    render_chat_message(m["role"], m["name"], m["content"])
-                else:
-                    stream_chat_message(m["role"], m["name"], m["content"])
-                st.session_state.history.append(m)
-            if _check_end(ai_messages) or st.session_state.turns >= MAX_TURNS:
-                st.session_state.ended = True
-                st.session_state.awaiting_user = False
-            else:
-                st.session_state.awaiting_user = True
-            st.rerun()
+    # Render chat (hide meta on chat page)
+    _render_static_history()
+    if _needs_polling() and not st.session_state.get("ended"):
+        _polling_chat_area()
+    else:
+        _chat_area()
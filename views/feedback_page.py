@@ -1,20 +1,49 @@
 import streamlit as st
+from config import END_DECISION_TIMEOUT_SEC, JOB_POLL_SEC
+from model_api import resolve_end_decision
 from state import reset_to_start, restart_chat
 from ui_components import page_header, chip
+from usage_ledger import ledger
+
+# Polls for a late end-monitor decision (Streamlit >= 1.37); older versions
+# wait for it once, up to END_DECISION_TIMEOUT_SEC.
+_can_poll = hasattr(st, "fragment")
+_polling_fragment = (lambda func: st.fragment(run_every=JOB_POLL_SEC)(func)) if _can_poll else (lambda func: func)
+
+
+@_polling_fragment
+def _await_end_decision() -> None:
+    """Stand in for the result until the end monitor has decided."""
+    resolve_end_decision(timeout=0)
+    if not st.session_state.get("pending_end"):
+        # The result and feedback appear in place of this notice
+        st.rerun()
+    st.info("Vurderer scenarioet – resultat og tilbakemelding kommer straks…", icon=":material/hourglass_top:")
 
 
 def show(defaults: dict):
     page_header("Kriseøvelse – Feedback")
+    # A late end-monitor decision may still carry the result and feedback
+    resolve_end_decision(timeout=0 if _can_poll else END_DECISION_TIMEOUT_SEC)
     meta = st.session_state.get("last_meta", {}) or {}
     turns = st.session_state.get("turns", 0)
     diff = st.session_state.get("difficulty", "")
 
     chip("Runder brukt", str(turns))
     chip("Vanskelighetsgrad", str(diff))
+    usage = ledger.scenario(st.session_state.get("session_id", ""), st.session_state.get("scenario_id", ""))
+    if usage.calls:
+        chip("Modellkall", str(usage.responses))
+        chip("Tokens", f"{usage.input_tokens} inn / {usage.output_tokens} ut")
+        if usage.input_tokens:
+            chip("Fra cache", f"{usage.cached_tokens / usage.input_tokens:.0%}")
+        chip("Modelltid", f"{usage.seconds:.1f} s")
 
     result = meta.get("scenarioresultat")
     feedback = meta.get("tilbakemelding")
-    if result and isinstance(result, dict) and result.get("content"):
+    if _can_poll and st.session_state.get("pending_end"):
+        _await_end_decision()
+    elif result and isinstance(result, dict) and result.get("content"):
         st.success(f"Scenarioresultat\n\n{result.get('content')}")
     else:
         st.info("Ingen scenarioresultat registrert ennå.")
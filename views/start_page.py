@@ -1,6 +1,7 @@
 import os
 import streamlit as st
 
+from opening_pool import pool as opening_pool
 from state import reset_to_start, restart_chat
 from ui_components import page_header
 
@@ -19,6 +20,15 @@ def show(defaults: dict):
         "Tren på å håndtere krevende kundedialoger i et trygt miljø.",
     )
 
+    # Prepare openings in the background while the trainee fills in the form:
+    # only for the selected difficulty, and once per key and difficulty, since
+    # each take() refills the pool after that
+    active_key = st.session_state.get("active_api_key", "")
+    difficulty = st.session_state.get("difficulty", "Medium")
+    if active_key and st.session_state.get("warmed_for") != (active_key, difficulty):
+        opening_pool.warm(active_key, [difficulty], session_id=st.session_state.get("session_id", ""))
+        st.session_state.warmed_for = (active_key, difficulty)
+
     with st.form("start-form", clear_on_submit=False):
         with st.container():
             c1, c2 = st.columns([1, 1])
@@ -78,6 +88,14 @@ def show(defaults: dict):
                     icon=":material/restart_alt:",
                 )
 
+    if active_key and opening_pool.size > 0:
+        stats = opening_pool.stats(active_key)
+        ready = " · ".join(f"{d} {n}" for d, n in stats["ready"].items())
+        st.caption(
+            f"Klare åpninger: {ready} (av {opening_pool.size}) · "
+            f"treffrate {stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})"
+        )
+
     if "reset" in locals() and reset:
         reset_to_start(defaults)
         st.success("Tilbakestilt.")